@@ -1,8 +1,10 @@
 import streamlit as st
-from common import build_pose_model, try_limit_opencv_threads
+from common import try_limit_opencv_threads
+from pose_pool import PosePool
 from sidebar_config import init_session_defaults, get_config
 from mode_lateral import render_lateral
 from mode_frontal import render_frontal
+from mode_dual import render_dual
 from history_view import render_history
 
 st.set_page_config(
@@ -18,8 +20,9 @@ try_limit_opencv_threads(2)
 init_session_defaults()
 
 @st.cache_resource(show_spinner=False)
-def load_pose():
-    return build_pose_model()
+def load_pose_pool():
+    # Compartido por todas las sesiones; cada stream toma su propio modelo
+    return PosePool()
 
 # Initialize theme
 if 'theme' not in st.session_state:
@@ -404,12 +407,51 @@ with st.sidebar:
         )
     
     with st.expander("⚡ **Rendimiento**", expanded=False):
+        dual_camera = st.checkbox(
+            "Ambas cámaras a la vez", value=False,
+            help="Frontal y lateral simultáneas: un solo presupuesto de inferencias repartido entre las dos y un puntaje de postura combinado"
+        )
+        adaptive_inference = st.checkbox(
+            "Frecuencia adaptativa", value=True,
+            help="Ajusta las inferencias por segundo según la latencia del modelo y la CPU libre del servidor"
+        )
+        target_infer_fps = st.slider(
+            "Objetivo de inferencias/s", 1, 15, 10, 1,
+            disabled=not adaptive_inference,
+            help="Con ambas cámaras es el total, repartido entre las dos"
+        )
+        cpu_budget_pct = st.slider(
+            "Presupuesto de CPU del servidor (%)", 30, 95, 75, 5,
+            disabled=not adaptive_inference,
+        )
         process_every_n = st.slider(
             "Procesar cada N frames",
             min_value=1, max_value=6, value=1, step=1,
-            help="Mayor número = menos CPU"
+            help="Mayor número = menos CPU (se usa cuando la frecuencia adaptativa está desactivada)",
+            disabled=adaptive_inference,
+        )
+        motion_gate = st.checkbox(
+            "Omitir inferencia si la escena está quieta", value=True,
+            help="Reutiliza la última detección mientras no haya movimiento (se refresca cada pocos segundos)"
+        )
+        roi_tracking = st.checkbox(
+            "Seguimiento por región (ROI)", value=True,
+            help="Infiere sólo sobre el recorte del torso detectado en el frame anterior; vuelve al frame completo si se pierde"
+        )
+        async_inference = st.checkbox(
+            "Inferencia asíncrona", value=True,
+            help="El video vuelve al navegador sin esperar al modelo; siempre se analiza el frame más reciente"
+        )
+        frame_pipeline = st.checkbox(
+            "Buffers de video reutilizables", value=True,
+            help="Decodifica cada frame una sola vez en buffers preasignados y dibuja el overlay en sitio"
         )
         debug_overlay = st.checkbox("Mostrar puntos de tracking", value=True)
+        overlay_interpolation = st.checkbox(
+            "Interpolar esqueleto entre inferencias", value=False,
+            disabled=not debug_overlay,
+            help="Movimiento más suave del overlay a cambio de un intervalo de inferencia de retraso"
+        )
     
     with st.expander("📏 **Umbrales de Postura**", expanded=False):
         st.markdown("##### 🧑‍💻 Vista Frontal")
@@ -470,6 +512,10 @@ with st.sidebar:
         st.session_state.sitting_time_threshold_min = st.slider(
             "Alerta después de (min)", 5, 120, 30, 5
         )
+        st.session_state.sitting_absence_sec = st.slider(
+            "Ausencia para contar como levantado (s)", 3, 60, 10, 1,
+            help="Detecciones perdidas más cortas no reinician el contador"
+        )
         
         if st.button("⏳ Resetear contador", use_container_width=True):
             import time
@@ -484,13 +530,29 @@ with st.sidebar:
             value=st.session_state.enable_history,
             help="Guarda un resumen por sesión (sin video)."
         )
+        st.session_state.history_series = st.checkbox(
+            "Guardar también la serie de la sesión",
+            value=st.session_state.history_series,
+            disabled=not st.session_state.enable_history,
+            help="Ángulo, brillo y presencia cada 2 s, comprimidos (unos pocos KB por hora)."
+        )
         st.session_state.history_db_path = st.text_input(
             "Archivo de base de datos",
             value=st.session_state.history_db_path,
             help="Ruta del archivo .db (por defecto: ergovision_sessions.db)."
         )
+        st.session_state.checkpoint_sec = st.slider(
+            "Guardar progreso cada (s)", 10, 120, st.session_state.checkpoint_sec, 10,
+            disabled=not st.session_state.enable_history,
+            help="La sesión en curso se guarda como abierta; si la app se cierra de golpe se recupera hasta el último guardado."
+        )
+        st.session_state.split_absence_min = st.slider(
+            "Nueva sesión tras ausencia de (min)", 0, 120, st.session_state.split_absence_min, 5,
+            disabled=not st.session_state.enable_history,
+            help="Sin pose durante este tiempo se cierra la sesión; al volver empieza otra. 0 = no dividir."
+        )
 
-POSE = load_pose()
+POSE_POOL = load_pose_pool()
 
 # Get configuration - Ahora con sistema compartido de hidratación
 cfg = get_config(
@@ -509,7 +571,21 @@ cfg = get_config(
     good_light_seconds=good_light_seconds,
     cooldown_seconds=cooldown_seconds,
     enable_desktop_notifications=enable_desktop_notifications,
-    enable_notification_sound=enable_notification_sound
+    enable_notification_sound=enable_notification_sound,
+    adaptive_inference=adaptive_inference,
+    target_infer_fps=target_infer_fps,
+    cpu_budget_pct=cpu_budget_pct,
+    motion_gate=motion_gate,
+    roi_tracking=roi_tracking,
+    async_inference=async_inference,
+    frame_pipeline=frame_pipeline,
+    overlay_interpolation=overlay_interpolation,
+    dual_camera=dual_camera,
+    enable_history=st.session_state.enable_history,
+    history_db_path=st.session_state.history_db_path,
+    history_series=st.session_state.history_series,
+    checkpoint_sec=st.session_state.checkpoint_sec,
+    split_absence_min=st.session_state.split_absence_min,
 )
 
 # Header
@@ -521,15 +597,21 @@ st.markdown(f"""
 """, unsafe_allow_html=True)
 
 # Main tabs
-tabs = st.tabs(["📷 Cámara lateral", "🧑‍💻 Cámara frontal", "📈 Historial"])
+if cfg["dual_camera"]:
+    # Un solo bucle para los dos paneles: el de una pestaña no bloquea a la otra
+    tabs = st.tabs(["🎥 Ambas cámaras", "📈 Historial"])
+    with tabs[0]:
+        render_dual(POSE_POOL=POSE_POOL, cfg=cfg)
+else:
+    tabs = st.tabs(["📷 Cámara lateral", "🧑‍💻 Cámara frontal", "📈 Historial"])
 
-with tabs[0]:
-    render_lateral(POSE=POSE, cfg=cfg)
+    with tabs[0]:
+        render_lateral(POSE_POOL=POSE_POOL, cfg=cfg)
 
-with tabs[1]:
-    render_frontal(POSE=POSE, cfg=cfg)
+    with tabs[1]:
+        render_frontal(POSE_POOL=POSE_POOL, cfg=cfg)
 
-with tabs[2]:
+with tabs[-1]:
     render_history(db_path=cfg.get("history_db_path","ergovision_sessions.db"))
 
 # Footer mejorado con la paleta
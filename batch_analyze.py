@@ -0,0 +1,318 @@
+"""
+Análisis offline de videos grabados (sin Streamlit/WebRTC).
+
+Decodifica con PyAV, aplica el mismo pipeline que la cámara en vivo
+(`common.analyze`, con `frame_geometry` y `lighting_category`) y guarda
+una fila por archivo con `session_logger.save_session`.
+
+Los archivos (o segmentos de un archivo largo) se reparten en un pool de
+procesos. El progreso se guarda en un archivo de estado JSONL, así que una
+ejecución interrumpida continúa donde quedó.
+
+Uso:
+    python batch_analyze.py videos/*.mp4 --mode side --workers 4
+    python batch_analyze.py jornada.mkv --segment-min 10 --db historial.db
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import av
+
+from common import (
+    EMA, analyze, build_pose_model, posture_category_for_panel, lighting_category, try_limit_opencv_threads,
+)
+from lighting import LightingEngine
+from session_logger import DEFAULT_DB_PATH, build_session_row, save_session
+from sidebar_config import get_config
+from session_accumulator import MAX_GAP_SEC, AlertTracker, SessionAccumulator
+from drink_gesture import DrinkDetector
+
+# Mismos valores por defecto que la barra lateral
+DEFAULT_CFG = get_config(
+    lighting_thresh=55, process_every_n=1, debug_overlay=False,
+    fr_good=163.0, fr_fair=159.0, lat_good=165.0, lat_fair=160.0,
+    enable_posture_alerts=True, posture_seconds=6, good_seconds=3,
+    enable_light_alerts=True, light_seconds=8, good_light_seconds=3,
+    cooldown_seconds=15, enable_desktop_notifications=False, enable_notification_sound=False,
+)
+
+# =========================
+# Sesión de un archivo (tiempo del video)
+# =========================
+class OfflineSession:
+    """Mismas reglas que el panel en vivo, avanzadas con el reloj del video."""
+
+    def __init__(self, mode, cfg, start_ts, max_gap=MAX_GAP_SEC):
+        self.mode = mode
+        self.cfg = cfg
+        self.acc = SessionAccumulator(start_ts, max_gap=max_gap)
+        self.alerts = {"posture": AlertTracker(), "light": AlertTracker()}
+        self.drinks = DrinkDetector(mode)
+
+    def _alert(self, kind, level, dt, now, need_sec, clear_sec):
+        if self.alerts[kind].feed(level, dt, now, need_sec, clear_sec, self.cfg["cooldown_seconds"]):
+            self.acc.count_alert(kind)
+
+    def update(self, now, media_ts, data):
+        cfg = self.cfg
+        nang = data["neck_angle_smooth"]
+        ang_now = nang if nang is not None else data["neck_angle_raw"]
+        _, p_level, _ = posture_category_for_panel(ang_now, self.mode, cfg["thr"])
+        lm = data.get("light_metrics")
+        _, l_level = lighting_category(data["brightness_smooth"], cfg["lighting_thresh"], lm)
+
+        dt = self.acc.advance(media_ts)
+        self.acc.end_ts = float(now)
+        self.acc.add(dt, p_level, l_level, lm)
+        if cfg["enable_posture_alerts"]:
+            self._alert("posture", p_level, dt, now, cfg["posture_seconds"], cfg["good_seconds"])
+        if cfg["enable_light_alerts"]:
+            self._alert("light", l_level, dt, now, cfg["light_seconds"], cfg["good_light_seconds"])
+        self.drinks.feed(data["wrist_mouth_dist"], media_ts, now)
+        for ev in self.drinks.drain():
+            self.acc.add_drink(ev.ts)
+
+
+def merge_partials(parts):
+    """Une los segmentos de un archivo en un único acumulador."""
+    return SessionAccumulator.merge([SessionAccumulator.from_dict(p) for p in parts])
+
+
+# =========================
+# Planificación de shards
+# =========================
+def _file_key(path):
+    st_ = os.stat(path)
+    return f"{os.path.abspath(path)}|{st_.st_size}|{int(st_.st_mtime)}"
+
+
+def probe(path):
+    """Duración (s) y timestamp de inicio de la grabación."""
+    with av.open(str(path)) as container:
+        duration = (container.duration / av.time_base) if container.duration else None
+        created = container.metadata.get("creation_time")
+    start = None
+    if created:
+        try:
+            from datetime import datetime
+            start = datetime.fromisoformat(created.replace("Z", "+00:00")).timestamp()
+        except Exception:
+            start = None
+    if start is None:
+        mtime = os.stat(path).st_mtime
+        start = mtime - (duration or 0.0)
+    return duration, start
+
+
+def plan_shards(paths, segment_sec=None):
+    shards = []
+    for path in paths:
+        duration, start = probe(path)
+        fkey = _file_key(path)
+        if segment_sec and duration and duration > segment_sec:
+            n = int(-(-duration // segment_sec))
+            bounds = [(i * segment_sec, min(duration, (i + 1) * segment_sec)) for i in range(n)]
+        else:
+            bounds = [(0.0, None)]
+        for i, (t0, t1) in enumerate(bounds):
+            shards.append({
+                "file_key": fkey, "key": f"{fkey}#{i}", "path": str(path), "n_segments": len(bounds),
+                "t0": t0, "t1": t1, "file_start_ts": start,
+            })
+    return shards
+
+
+# =========================
+# Trabajo por shard (proceso hijo)
+# =========================
+def _init_worker():
+    try_limit_opencv_threads(1)
+
+
+def _scaled_size(stream, width):
+    if not width or not stream.codec_context.width:
+        return None, None
+    w, h = stream.codec_context.width, stream.codec_context.height
+    if w <= width:
+        return None, None
+    return int(width), int(round(h * width / w / 2) * 2)
+
+
+def run_shard(shard, mode, cfg, sample_fps=None, width=640):
+    """Analiza un shard y devuelve su acumulador parcial + estadísticas."""
+    t_start = time.perf_counter()
+    cpu_start = time.process_time()  # CPU de este proceso (todos sus hilos)
+    POSE = build_pose_model()  # tracking nuevo por shard
+    neck_ema = EMA(alpha=0.35, initial=None)
+    bright_ema = EMA(alpha=0.25, initial=60.0)
+    lighting = LightingEngine()
+
+    t0, t1 = float(shard["t0"]), shard["t1"]
+    min_step = (1.0 / sample_fps) if sample_fps else 0.0
+    session = OfflineSession(mode, cfg, shard["file_start_ts"] + t0, max_gap=max(MAX_GAP_SEC, 2.0 * min_step))
+    decoded = analyzed = 0
+    last_t = last_data = None
+
+    with av.open(shard["path"]) as container:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        tb = float(stream.time_base)
+        sw, sh = _scaled_size(stream, width)
+        if t0 > 0:
+            container.seek(int(t0 / tb), stream=stream, backward=True)
+
+        for frame in container.decode(stream):
+            if frame.pts is None:
+                continue
+            t = frame.pts * tb
+            if t < t0:
+                continue
+            if t1 is not None and t >= t1:
+                break
+            decoded += 1
+            if last_t is not None and (t - last_t) < min_step:
+                continue
+
+            img = frame.to_ndarray(width=sw, height=sh, format="bgr24") if sw else frame.to_ndarray(format="bgr24")
+            light, Y = lighting.measure(frame)
+            _, data = analyze(
+                img_bgr=img, POSE=POSE, neck_ema_obj=neck_ema, bright_ema_obj=bright_ema,
+                mode_label=mode, thr=cfg["thr"], lighting_thresh=cfg["lighting_thresh"], compute_wrist_mouth=True,
+                luma_small=Y, light=light,
+            )
+            if last_t is None and t0 > 0:
+                session.acc.advance(t0)  # el segmento empieza en t0, no en su primer frame
+            session.update(shard["file_start_ts"] + t, t, data)
+            last_t, last_data = t, data
+            analyzed += 1
+
+        # Cerrar el hueco hasta el inicio del siguiente segmento
+        if t1 is not None and last_t is not None and t1 > last_t:
+            session.update(shard["file_start_ts"] + t1, t1, last_data)
+
+    POSE.close()
+    return {
+        "key": shard["key"],
+        "partial": session.acc.to_dict(),
+        "frames_decoded": decoded,
+        "frames_analyzed": analyzed,
+        "wall_sec": time.perf_counter() - t_start,
+        "cpu_sec": time.process_time() - cpu_start,
+    }
+
+
+# =========================
+# Estado (reanudación)
+# =========================
+def load_state(state_path):
+    done, saved = {}, set()
+    p = Path(state_path)
+    if not p.exists():
+        return done, saved
+    with p.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except Exception:
+                continue  # línea truncada por una interrupción
+            if "saved" in rec:
+                saved.add(rec["file_key"])
+            elif "key" in rec:
+                done[rec["key"]] = rec
+    return done, saved
+
+
+def _append_state(state_path, rec):
+    with open(state_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def run_batch(paths, *, mode, cfg=DEFAULT_CFG, db_path=DEFAULT_DB_PATH, workers=None, segment_sec=None,
+              sample_fps=None, width=640, state_path=None, log=print):
+    workers = int(workers or os.cpu_count() or 1)
+    state_path = state_path or f"{db_path}.batch.jsonl"
+    done, saved = load_state(state_path)
+
+    shards = [s for s in plan_shards(paths, segment_sec) if s["file_key"] not in saved]
+    by_file = {}
+    for s in shards:
+        by_file.setdefault(s["file_key"], []).append(s)
+    pending = [s for s in shards if s["key"] not in done]
+    log(f"{len(by_file)} archivo(s), {len(pending)} shard(s) pendientes "
+        f"({len(shards) - len(pending)} reanudados), {workers} proceso(s)")
+
+    def maybe_save(file_key):
+        group = by_file[file_key]
+        if not all(s["key"] in done for s in group):
+            return
+        sess = merge_partials([done[s["key"]]["partial"] for s in group])
+        row = build_session_row(sess, mode=mode)
+        row["metrics"]["source_file"] = group[0]["path"]
+        row_id = save_session(row, db_path=db_path)
+        _append_state(state_path, {"file_key": file_key, "saved": row_id})
+        log(f"✔ {group[0]['path']} → sesión #{row_id} ({row['duration_sec'] / 60.0:.1f} min)")
+
+    for fkey in list(by_file):
+        maybe_save(fkey)  # shards terminados en una ejecución anterior
+
+    t0 = time.perf_counter()
+    frames = cpu = 0.0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as ex:
+        futs = {ex.submit(run_shard, s, mode, cfg, sample_fps, width): s for s in pending}
+        for fut in as_completed(futs):
+            shard = futs[fut]
+            try:
+                res = fut.result()
+            except Exception as e:
+                log(f"✖ {shard['path']} [{shard['t0']:.0f}s]: {e}")
+                continue
+            done[res["key"]] = res
+            _append_state(state_path, res)
+            frames += res["frames_analyzed"]
+            cpu += res["cpu_sec"]
+            maybe_save(shard["file_key"])
+
+    wall = time.perf_counter() - t0
+    if frames:
+        log(f"{frames:.0f} frames analizados en {wall:.1f} s: {frames / wall:.1f} fps totales, "
+            f"{frames / wall / workers:.1f} fps/proceso, {frames / max(cpu, 1e-9):.1f} fps por segundo de CPU "
+            f"({cpu:.1f} s de CPU sumando los procesos)")
+    return {"frames": frames, "wall_sec": wall, "cpu_sec": cpu, "workers": workers}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="ErgoVision: análisis por lotes de videos grabados")
+    ap.add_argument("videos", nargs="+", help="Archivos de video")
+    ap.add_argument("--mode", choices=["front", "side"], default="side", help="Vista de la cámara")
+    ap.add_argument("--db", default=DEFAULT_DB_PATH, help="Base de datos SQLite de sesiones")
+    ap.add_argument("--workers", type=int, default=None, help="Procesos (por defecto: núcleos)")
+    ap.add_argument("--segment-min", type=float, default=None,
+                    help="Dividir archivos largos en segmentos de N minutos para repartirlos entre procesos")
+    ap.add_argument("--sample-fps", type=float, default=None, help="Analizar como máximo N frames por segundo de video")
+    ap.add_argument("--width", type=int, default=640, help="Reescalar al decodificar a este ancho (0 = original)")
+    ap.add_argument("--state", default=None, help="Archivo de estado para reanudar (por defecto: <db>.batch.jsonl)")
+    ap.add_argument("--lighting-thresh", type=float, default=DEFAULT_CFG["lighting_thresh"])
+    args = ap.parse_args(argv)
+
+    cfg = dict(DEFAULT_CFG, lighting_thresh=float(args.lighting_thresh))
+    missing = [v for v in args.videos if not os.path.exists(v)]
+    if missing:
+        ap.error(f"no existe: {', '.join(missing)}")
+
+    run_batch(
+        args.videos, mode=args.mode, cfg=cfg, db_path=args.db, workers=args.workers,
+        segment_sec=(args.segment_min * 60.0) if args.segment_min else None,
+        sample_fps=args.sample_fps, width=args.width, state_path=args.state,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
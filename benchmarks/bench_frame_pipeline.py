@@ -0,0 +1,99 @@
+"""
+Micro-benchmark: camino de video por frame, anterior (to_ndarray BGR + copias) vs. FramePipeline.
+
+    python benchmarks/bench_frame_pipeline.py [--frames 600] [--width 640 --height 360]
+
+Mide sólo el trabajo de video (decodificar, miniatura de brillo, RGB para MediaPipe y
+frame de salida), sin el modelo. Usa frames yuv420p sintéticos como los de aiortc y
+reporta los bytes de NumPy asignados por frame (tracemalloc) además del tiempo.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import av
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frame_pipeline import FramePipeline  # noqa: E402
+from lighting import LightingEngine  # noqa: E402
+
+
+def make_frames(rng, n, w, h):
+    base = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    out = []
+    for i in range(n):
+        img = np.roll(base, 4 * i, axis=1)
+        out.append(av.VideoFrame.from_ndarray(img, format="rgb24").reformat(format="yuv420p"))
+    return out
+
+
+# ---- Camino anterior (copia de common.analyze / make_callback) ----
+def old_path(frame):
+    img = frame.to_ndarray(format="bgr24")
+    small = cv2.resize(img, (96, 54), interpolation=cv2.INTER_AREA)
+    Y = (0.2126 * small[:, :, 2].astype(np.float32) +
+         0.7152 * small[:, :, 1].astype(np.float32) +
+         0.0722 * small[:, :, 0].astype(np.float32))
+    rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    return av.VideoFrame.from_ndarray(img, format="bgr24"), rgb, Y
+
+
+def new_path(pipeline, lighting):
+    def run(frame):
+        vf, rgb = pipeline.decode(frame)
+        light, Y = lighting.measure(frame)
+        pipeline.release(vf)  # sin encoder: nadie más lo retiene
+        return vf, rgb, Y
+    return run
+
+
+def bench(fn, frames):
+    fn(frames[0])  # calentamiento (el pipeline asigna sus buffers aquí)
+    tracemalloc.start()
+    allocated = 0
+    for f in frames:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        out = fn(f)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+        del out
+    tracemalloc.stop()
+    t0 = time.perf_counter()
+    for f in frames:
+        fn(f)
+    return (time.perf_counter() - t0) / len(frames) * 1e6, allocated / len(frames)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=600)
+    ap.add_argument("--width", type=int, default=640)
+    ap.add_argument("--height", type=int, default=360)
+    args = ap.parse_args()
+    cv2.setNumThreads(1)
+
+    frames = make_frames(np.random.default_rng(0), args.frames, args.width, args.height)
+    pipeline, lighting = FramePipeline(), LightingEngine()
+
+    # Mismo RGB y mismo brillo medio (la conversión YUV→RGB de OpenCV y FFmpeg difiere en ±2)
+    _, rgb_a, y_a = old_path(frames[1])
+    _, rgb_b, y_b = new_path(pipeline, lighting)(frames[1])
+    assert np.abs(rgb_a.astype(int) - rgb_b).mean() < 3.0
+    assert abs(float(y_a.mean()) - float(y_b.mean())) < 3.0
+
+    t_old, b_old = bench(old_path, frames)
+    t_new, b_new = bench(new_path(pipeline, lighting), frames)
+    warm = pipeline.stats()
+
+    print(f"anterior (to_ndarray + copias) : {t_old:8.1f} µs/frame  {b_old / 1e3:8.1f} KB NumPy/frame")
+    print(f"FramePipeline + LightingEngine : {t_new:8.1f} µs/frame  {b_new / 1e3:8.1f} KB NumPy/frame  ({t_old / t_new:.1f}x)")
+    print(f"buffers del pipeline: {warm['allocations']} asignaciones en {warm['frames']} frames"
+          f" · último frame: {warm['last_frame_allocs']} · anillo ocupado: {warm['ring_busy']}")
+
+
+if __name__ == "__main__":
+    main()
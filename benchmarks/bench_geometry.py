@@ -0,0 +1,113 @@
+"""
+Micro-benchmark: geometría por frame, versión escalar (anterior) vs. kernel vectorizado.
+
+    python benchmarks/bench_geometry.py [--frames 20000]
+
+Usa mensajes NormalizedLandmarkList reales de MediaPipe con valores aleatorios y verifica
+que ambos caminos den el mismo resultado antes de medir.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import (  # noqa: E402
+    NOSE, L_EAR, R_EAR, L_SH, R_SH, L_HIP, R_HIP, L_WRIST, R_WRIST,
+    calculate_angle, angle_with_vertical, landmarks_to_array, pose_geometry, frame_geometry,
+)
+
+
+# ---- Camino anterior (atributo a atributo + np.array por llamada) ----
+def _side_scalar(lmk, min_vis=0.3):
+    def side(e, s, h):
+        ve, vs, vh = lmk[e].visibility, lmk[s].visibility, lmk[h].visibility
+        p_e = (lmk[e].x, lmk[e].y)
+        p_s = (lmk[s].x, lmk[s].y)
+        if min(ve, vs, vh) >= min_vis:
+            return calculate_angle(p_e, p_s, (lmk[h].x, lmk[h].y))
+        if min(ve, vs) >= min_vis or min(ve, vs) >= 0.15:
+            return angle_with_vertical(p_s, p_e)
+        return None
+    aL, aR = side(L_EAR, L_SH, L_HIP), side(R_EAR, R_SH, R_HIP)
+    if aL is not None and aR is not None:
+        return max(aL, aR)
+    return aL if aL is not None else aR
+
+
+def _wrist_scalar(lmk):
+    nose = np.array([lmk[NOSE].x, lmk[NOSE].y], dtype=np.float32)
+    dists = []
+    for W in (L_WRIST, R_WRIST):
+        if lmk[W].visibility >= 0.15:
+            w = np.array([lmk[W].x, lmk[W].y], dtype=np.float32)
+            dists.append(float(np.linalg.norm(w - nose)))
+    return min(dists) if dists else None
+
+
+def scalar_frame(msg):
+    lmk = msg.landmark
+    return _side_scalar(lmk), _wrist_scalar(lmk)
+
+
+def kernel_frame(msg):
+    geo = frame_geometry(landmarks_to_array(msg))
+    return geo["neck_side"], geo["wrist_mouth_dist"]
+
+
+def _close(x, y):
+    # arccos en float32 pierde precisión cerca de 180°: tolerancia de 0.02°
+    return (x is None) == (y is None) and (x is None or abs(x - y) < 2e-2)
+
+
+def make_landmarks(rng, n):
+    out = []
+    for _ in range(n):
+        lst = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z, v in rng.random((33, 4)):
+            lst.landmark.add(x=x, y=y, z=z, visibility=v, presence=v)
+        out.append(lst)
+    return out
+
+
+def bench(fn, frames):
+    t0 = time.perf_counter()
+    for lmk in frames:
+        fn(lmk)
+    return (time.perf_counter() - t0) / len(frames) * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=20000)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = make_landmarks(rng, args.frames)
+
+    batch = np.stack([landmarks_to_array(m) for m in frames])
+    geo = pose_geometry(batch)
+    for i, msg in enumerate(frames[:2000]):
+        a, b = scalar_frame(msg), kernel_frame(msg)
+        c = tuple(None if np.isnan(geo[k][i]) else float(geo[k][i]) for k in ("neck_side", "wrist_mouth_dist"))
+        assert all(_close(x, y) for x, y in zip(a, b)), (a, b)
+        assert all(_close(x, y) for x, y in zip(a, c)), (a, c)
+
+    t_scalar = bench(scalar_frame, frames)
+    t_frame = bench(kernel_frame, frames)
+    t_conv = bench(landmarks_to_array, frames)
+    t0 = time.perf_counter()
+    pose_geometry(batch)
+    t_batch = (time.perf_counter() - t0) / len(frames) * 1e6
+
+    print(f"escalar (antes)              : {t_scalar:8.2f} µs/frame")
+    print(f"(33,4) + frame_geometry      : {t_frame:8.2f} µs/frame  ({t_scalar / t_frame:.1f}x)"
+          f"  [conversión {t_conv:.2f} µs]")
+    print(f"pose_geometry (N,33,4)       : {t_batch:8.2f} µs/frame  ({t_scalar / t_batch:.0f}x, N={len(frames)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Micro-benchmark: exportar e importar el historial en cada formato.
+
+    python benchmarks/bench_history_io.py [--rows 100000] [--chunk-rows 10000] [--dir /tmp]
+
+Llena una base temporal con `--rows` sesiones (una real de `build_session_row`
+con distinto inicio), exporta a CSV, JSON Lines y Parquet, importa cada archivo
+en una base vacía y lo vuelve a importar (todo duplicado: sólo la búsqueda).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import history_io  # noqa: E402
+import session_logger as sl  # noqa: E402
+from session_accumulator import SessionAccumulator  # noqa: E402
+
+
+def sample_rows(n):
+    acc = SessionAccumulator(time.time() - 3600)
+    for _ in range(60):
+        acc.add(60.0, "good", "regular")
+    acc.end_ts = time.time()
+    row = sl.build_session_row(acc, mode="side", device="bench:/dev/video0")
+    t0 = time.time() - n * 600.0
+    for i in range(n):
+        yield dict(row, start_ts=t0 + i * 600.0, end_ts=t0 + i * 600.0 + 3600.0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--chunk-rows", type=int, default=sl.EXPORT_CHUNK_ROWS)
+    ap.add_argument("--dir", default=None, help="Directorio de los archivos temporales (el disco importa)")
+    args = ap.parse_args()
+    quiet = lambda msg: None  # noqa: E731
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        src = os.path.join(tmp, "src.db")
+        for chunk in history_io._chunks(sample_rows(args.rows), args.chunk_rows):
+            sl.import_sessions(chunk, db_path=src)
+
+        print(f"{args.rows} sesiones, bloques de {args.chunk_rows} filas")
+        for fmt in ("csv", "jsonl", "parquet"):
+            path = os.path.join(tmp, f"historial.{fmt}")
+            dst = os.path.join(tmp, f"{fmt}.db")
+            exp = history_io.export_history(path, db_path=src, chunk_rows=args.chunk_rows, log=quiet)
+            imp = history_io.import_history(path, db_path=dst, chunk_rows=args.chunk_rows, log=quiet)
+            dup = history_io.import_history(path, db_path=dst, chunk_rows=args.chunk_rows, log=quiet)
+            assert imp["inserted"] == dup["skipped"] == args.rows
+            mb = os.path.getsize(path) / 1e6
+            print(f"{fmt:8s} {mb:7.1f} MB   exportar: {exp['rows'] / exp['sec']:8.0f} filas/s   "
+                  f"importar: {imp['rows'] / imp['sec']:8.0f} filas/s   "
+                  f"reimportar (duplicadas): {dup['rows'] / dup['sec']:8.0f} filas/s")
+        sl.close_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Micro-benchmark: overlay del esqueleto, `mp_drawing.draw_landmarks` (anterior) vs. PoseOverlay.
+
+    python benchmarks/bench_overlay.py [--frames 2000]
+
+Usa landmarks aleatorios con buena visibilidad sobre un frame 640x360.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import mp_drawing, mp_pose, landmarks_to_array  # noqa: E402
+from overlay import PoseOverlay  # noqa: E402
+
+
+def make_landmarks(rng, n):
+    out = []
+    for _ in range(n):
+        lst = landmark_pb2.NormalizedLandmarkList()
+        for x, y in 0.2 + 0.6 * rng.random((33, 2)):
+            lst.landmark.add(x=x, y=y, z=0.0, visibility=0.9, presence=0.9)
+        out.append(lst)
+    return out
+
+
+def draw_mp(img, lmk):
+    mp_drawing.draw_landmarks(
+        img, lmk, mp_pose.POSE_CONNECTIONS,
+        mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2),
+        mp_drawing.DrawingSpec(color=(0, 0, 255), thickness=2),
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=2000)
+    args = ap.parse_args()
+
+    lmks = make_landmarks(np.random.default_rng(0), args.frames)
+    arrs = [landmarks_to_array(m) for m in lmks]
+    img = np.zeros((360, 640, 3), np.uint8)
+
+    t0 = time.perf_counter()
+    for m in lmks:
+        draw_mp(img, m)
+    t_mp = (time.perf_counter() - t0) / len(lmks) * 1e6
+
+    ov = PoseOverlay()
+    t0 = time.perf_counter()
+    for a in arrs:
+        ov.update(a, 0.0)
+        ov.draw(img, now=0.0)
+    t_ov = (time.perf_counter() - t0) / len(arrs) * 1e6
+
+    ov = PoseOverlay(interpolate=True)
+    ov.update(arrs[0], 0.0)
+    t0 = time.perf_counter()
+    for i, a in enumerate(arrs[1:], 1):
+        ov.update(a, 0.1 * i)
+        ov.draw(img, now=0.1 * i + 0.05)
+    t_interp = (time.perf_counter() - t0) / (len(arrs) - 1) * 1e6
+
+    print(f"draw_landmarks (antes)  : {t_mp:8.1f} µs/frame")
+    print(f"PoseOverlay             : {t_ov:8.1f} µs/frame  ({t_mp / t_ov:.1f}x)")
+    print(f"PoseOverlay interpolado : {t_interp:8.1f} µs/frame  ({t_mp / t_interp:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
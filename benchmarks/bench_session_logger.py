@@ -0,0 +1,104 @@
+"""
+Micro-benchmark: acceso a SQLite del historial, anterior (ensure_db + conexión nueva por
+llamada) vs. conexiones por hilo con pragmas y sentencias preparadas.
+
+    python benchmarks/bench_session_logger.py [--inserts 2000] [--reads 300] [--dir /tmp]
+
+Cada camino escribe en su propia base temporal las mismas filas (las de una sesión real
+de `build_session_row`) y luego lee el historial como la pestaña (`fetch_sessions`, 200 filas).
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import session_logger as sl  # noqa: E402
+from session_accumulator import SessionAccumulator  # noqa: E402
+
+
+# ---- Camino anterior: esquema y conexión nueva en cada llamada ----
+def _old_ensure(path):
+    con = sqlite3.connect(path)
+    try:
+        con.execute("PRAGMA journal_mode=WAL;")
+        con.execute(sl.SCHEMA_SQL)
+        con.execute(sl.SERIES_SQL)
+        con.commit()
+    finally:
+        con.close()
+
+
+def old_save(row, path):
+    _old_ensure(path)
+    cols = sl._SESSION_COLS
+    vals = [row.get(c) for c in cols[:-5]] + [json.dumps(row["metrics"]), "closed", None, None, None]
+    con = sqlite3.connect(path)
+    try:
+        cur = con.execute(f"INSERT INTO sessions ({','.join(cols)}) VALUES ({','.join(['?'] * len(cols))})", vals)
+        con.commit()
+        return cur.lastrowid
+    finally:
+        con.close()
+
+
+def old_fetch(path, limit=200):
+    _old_ensure(path)
+    con = sqlite3.connect(path)
+    con.row_factory = sqlite3.Row
+    try:
+        out = []
+        for r in con.execute("SELECT * FROM sessions ORDER BY end_ts DESC LIMIT ?", (limit,)).fetchall():
+            d = dict(r)
+            d["metrics"] = json.loads(d.get("metrics_json") or "{}")
+            out.append(d)
+        return out
+    finally:
+        con.close()
+
+
+def sample_row():
+    acc = SessionAccumulator(time.time() - 3600)
+    for _ in range(3600):
+        acc.add(1.0, "good", "regular")
+    acc.add_drink(time.time() - 1800)
+    acc.end_ts = time.time()
+    return sl.build_session_row(acc, mode="side")
+
+
+def rate(fn, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--inserts", type=int, default=2000)
+    ap.add_argument("--reads", type=int, default=300)
+    ap.add_argument("--dir", default=None, help="Directorio de las bases temporales (el disco importa)")
+    args = ap.parse_args()
+    row = sample_row()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        old_db, new_db = os.path.join(tmp, "old.db"), os.path.join(tmp, "new.db")
+        sl.ensure_db(old_db)  # mismo esquema; el camino anterior sólo repite su costo
+        sl.ensure_db(new_db)
+
+        ins_old = rate(lambda: old_save(row, old_db), args.inserts)
+        ins_new = rate(lambda: sl.save_session(row, db_path=new_db), args.inserts)
+        assert len(old_fetch(old_db)) == len(sl.fetch_sessions(db_path=new_db)) == min(200, args.inserts)
+        rd_old = rate(lambda: old_fetch(old_db), args.reads)
+        rd_new = rate(lambda: sl.fetch_sessions(db_path=new_db), args.reads)
+        sl.close_connections()
+
+    print(f"inserciones  anterior: {ins_old:8.0f}/s   conexión por hilo: {ins_new:8.0f}/s  ({ins_new / ins_old:.1f}x)")
+    print(f"lecturas (200 filas)  anterior: {rd_old:8.0f}/s   conexión por hilo: {rd_new:8.0f}/s  ({rd_new / rd_old:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,13 @@
+import math
 import time
-import threading
+from collections import deque
 import numpy as np
 import cv2
 import mediapipe as mp
 import av
-import streamlit as st
 from streamlit_webrtc import RTCConfiguration
+from lighting import LightingEngine
+from overlay import PoseOverlay
 
 # =========================
 # MediaPipe
@@ -63,8 +65,6 @@ def angle_with_vertical(p_sh, p_ear):
     theta = np.degrees(np.arccos(np.clip(dot / (nv * na), -1.0, 1.0)))
     return 180.0 - theta
 
-pose_lock = threading.Lock()
-
 # =========================
 # MediaPipe Pose Model
 # =========================
@@ -91,6 +91,10 @@ def new_shared_state():
         "lighting_ok": True,
         "last_update_ts": 0.0,
         "wrist_mouth_dist": None,  # SOLO distancia 2D
+        "infer_ms": None,
+        "light_metrics": None,  # contraste, recortes, contraluz (LightingEngine)
+        "landmarks": None,
+        "media_ts": None,  # frame.pts * time_base del frame analizado
     }
 
 def reset_shared(shared, neck_ema_obj, bright_ema_obj):
@@ -101,55 +105,120 @@ def reset_shared(shared, neck_ema_obj, bright_ema_obj):
 # =========================
 # Neck Angle Calculations
 # =========================
+# Índices MediaPipe usados por el kernel
+NOSE = mp_pose.PoseLandmark.NOSE.value
+L_EAR = mp_pose.PoseLandmark.LEFT_EAR.value
+R_EAR = mp_pose.PoseLandmark.RIGHT_EAR.value
+L_SH = mp_pose.PoseLandmark.LEFT_SHOULDER.value
+R_SH = mp_pose.PoseLandmark.RIGHT_SHOULDER.value
+L_HIP = mp_pose.PoseLandmark.LEFT_HIP.value
+R_HIP = mp_pose.PoseLandmark.RIGHT_HIP.value
+L_WRIST = mp_pose.PoseLandmark.LEFT_WRIST.value
+R_WRIST = mp_pose.PoseLandmark.RIGHT_WRIST.value
+
+N_LANDMARKS = 33
+MIN_VIS_FALLBACK = 0.15
+WRIST_MIN_VIS = 0.15
+
+# Un solo gather por frame: [oreja L/R, hombro L/R, cadera L/R, muñeca L/R, nariz]
+_KERNEL_IDX = np.array([L_EAR, R_EAR, L_SH, R_SH, L_HIP, R_HIP, L_WRIST, R_WRIST, NOSE])
+
+def landmarks_to_array(lmk, out=None):
+    """
+    Convierte los 33 landmarks de MediaPipe a un array (33, 4) float32
+    con columnas x, y, z, visibility. Acepta `res.pose_landmarks` o la
+    lista `.landmark`; si ya es un array, lo devuelve tal cual.
+    """
+    if isinstance(lmk, np.ndarray):
+        return lmk
+    if hasattr(lmk, "landmark"):
+        lmk = lmk.landmark
+    # Atributos públicos del mensaje en un solo fromiter; el resto es vectorizado
+    view = np.fromiter(
+        (v for p in lmk for v in (p.x, p.y, p.z, p.visibility)),
+        dtype=np.float32, count=4 * N_LANDMARKS,
+    ).reshape(N_LANDMARKS, 4)
+    if out is None:
+        return view
+    out[...] = view
+    return out
+
+_R2D = np.float32(180.0 / np.pi)
+
+def pose_geometry(arr, min_vis=0.3):
+    """
+    Kernel vectorizado de geometría para lotes (replay offline).
+
+    `arr` es (N, 33, 4) o (33, 4) [x, y, z, visibility]. Devuelve un dict con
+    `neck_side`, `neck_front` y `wrist_mouth_dist` de forma (N,) o ();
+    NaN donde el valor no es calculable (None en `frame_geometry`).
+    Los puntos se tratan como complejos x+iy: cada ángulo es un solo arctan2.
+    """
+    c = np.ascontiguousarray(arr, dtype=np.float32).view(np.complex64)[..., _KERNEL_IDX, :]
+    z, vis = c[..., 0], c[..., 1].imag  # x+iy, visibilidad
+    sh = z[..., 2:4]
+    v = z[..., 0:2] - sh  # hombro→oreja
+    # [v rotado respecto a "arriba" (0,-1), cadera relativa a v] → ángulos en [0, 180]
+    w = np.concatenate([v * 1j, (z[..., 4:6] - sh) * np.conj(v)], axis=-1)
+    ang = np.abs(np.arctan2(w.imag, w.real)) * _R2D
+    vert, tri = 180.0 - ang[..., 0:2], ang[..., 2:4]
+
+    v_es = np.minimum(vis[..., 0:2], vis[..., 2:4])
+    ok_2pt = v_es >= min(min_vis, MIN_VIS_FALLBACK)
+    # Lateral: 3 puntos si la cadera es visible, si no vs. vertical
+    side = np.where(ok_2pt, np.where(np.minimum(v_es, vis[..., 4:6]) >= min_vis, tri, vert), np.nan)
+    front = np.where(ok_2pt, vert, np.nan)
+    d = np.where(vis[..., 6:8] >= WRIST_MIN_VIS, np.abs(z[..., 6:8] - z[..., 8:9]), np.nan)
+
+    return {
+        # fmax/fmin ignoran NaN: mejor lado disponible
+        "neck_side": np.fmax(side[..., 0], side[..., 1]),
+        "neck_front": np.fmax(front[..., 0], front[..., 1]),
+        "wrist_mouth_dist": np.fmin(d[..., 0], d[..., 1]),
+    }
+
+def frame_geometry(arr, min_vis=0.3):
+    """
+    Misma geometría que `pose_geometry` para un solo frame (33, 4).
+
+    Con un frame la sobrecarga por llamada de NumPy supera a la aritmética,
+    así que se hace un único gather y el resto con `math` sobre 9 puntos.
+    Devuelve floats o None.
+    """
+    rows = np.asarray(arr)[_KERNEL_IDX].tolist()
+    fb_vis = min(min_vis, MIN_VIS_FALLBACK)
+    side = front = None
+    for e, s, h in ((0, 2, 4), (1, 3, 5)):
+        ex, ey, _, ev = rows[e]
+        sx, sy, _, sv = rows[s]
+        hx, hy, _, hv = rows[h]
+        v_es = min(ev, sv)
+        if v_es < fb_vis:
+            continue
+        vx, vy = ex - sx, ey - sy
+        vert = 180.0 - math.degrees(math.acos(max(-1.0, min(1.0, -vy / (math.hypot(vx, vy) + 1e-9)))))
+        if min(v_es, hv) >= min_vis:
+            tri = abs(math.degrees(math.atan2(hy - sy, hx - sx) - math.atan2(vy, vx)))
+            a_side = 360.0 - tri if tri > 180.0 else tri
+        else:
+            a_side = vert
+        side = a_side if side is None else max(side, a_side)
+        front = vert if front is None else max(front, vert)
+
+    nx, ny = rows[8][0], rows[8][1]
+    wrist = None
+    for wx, wy, _, wv in rows[6:8]:
+        if wv >= WRIST_MIN_VIS:
+            dist = math.hypot(wx - nx, wy - ny)
+            wrist = dist if wrist is None else min(wrist, dist)
+
+    return {"neck_side": side, "neck_front": front, "wrist_mouth_dist": wrist}
+
 def neck_angle_side_best(lmk, min_vis=0.3):
-    L_EAR = mp_pose.PoseLandmark.LEFT_EAR.value
-    L_SH = mp_pose.PoseLandmark.LEFT_SHOULDER.value
-    L_HIP = mp_pose.PoseLandmark.LEFT_HIP.value
-    R_EAR = mp_pose.PoseLandmark.RIGHT_EAR.value
-    R_SH = mp_pose.PoseLandmark.RIGHT_SHOULDER.value
-    R_HIP = mp_pose.PoseLandmark.RIGHT_HIP.value
-
-    def side(e, s, h):
-        ve = lmk[e].visibility
-        vs = lmk[s].visibility
-        vh = lmk[h].visibility
-        p_e = (lmk[e].x, lmk[e].y)
-        p_s = (lmk[s].x, lmk[s].y)
-        if min(ve, vs, vh) >= min_vis:
-            p_h = (lmk[h].x, lmk[h].y)
-            return calculate_angle(p_e, p_s, p_h)
-        if min(ve, vs) >= min_vis:
-            return angle_with_vertical(p_s, p_e)
-        if min(ve, vs) >= 0.15:
-            return angle_with_vertical(p_s, p_e)
-        return None
-
-    aL = side(L_EAR, L_SH, L_HIP)
-    aR = side(R_EAR, R_SH, R_HIP)
-    if aL is not None and aR is not None:
-        return max(aL, aR)
-    return aL if aL is not None else aR
+    return frame_geometry(landmarks_to_array(lmk), min_vis)["neck_side"]
 
 def neck_angle_front_best(lmk, min_vis=0.3):
-    L_EAR = mp_pose.PoseLandmark.LEFT_EAR.value
-    L_SH = mp_pose.PoseLandmark.LEFT_SHOULDER.value
-    R_EAR = mp_pose.PoseLandmark.RIGHT_EAR.value
-    R_SH = mp_pose.PoseLandmark.RIGHT_SHOULDER.value
-
-    def side(e, s):
-        ve = lmk[e].visibility
-        vs = lmk[s].visibility
-        if min(ve, vs) < min_vis and min(ve, vs) < 0.15:
-            return None
-        p_e = (lmk[e].x, lmk[e].y)
-        p_s = (lmk[s].x, lmk[s].y)
-        return angle_with_vertical(p_s, p_e)
-
-    aL = side(L_EAR, L_SH)
-    aR = side(R_EAR, R_SH)
-    if aL is not None and aR is not None:
-        return max(aL, aR)
-    return aL if aL is not None else aR
+    return frame_geometry(landmarks_to_array(lmk), min_vis)["neck_front"]
 
 # =========================
 # Posture Classification
@@ -222,59 +291,188 @@ def posture_category_for_panel(angle_value, mode, thr):
 # =========================
 # Lighting Classification
 # =========================
-def lighting_category(bright_smooth, thr_lighting):
+def lighting_category(bright_smooth, thr_lighting, metrics=None):
     if bright_smooth is None:
         return ("Sin datos de luz", "none")
     good_min = thr_lighting + 15
     if bright_smooth < thr_lighting:
         return (f"Mala iluminación ({bright_smooth:.1f}/255)", "bad")
-    elif bright_smooth < good_min:
+    # Luz suficiente pero mal distribuida: nunca cuenta como buena
+    if metrics is not None and metrics.get("backlit"):
+        return (f"Contraluz: el rostro queda oscuro ({bright_smooth:.1f}/255)", "regular")
+    if metrics is not None and metrics.get("glare"):
+        return (f"Reflejos o sobreexposición ({100 * metrics['clip_high']:.0f}% saturado)", "regular")
+    if bright_smooth < good_min:
         return (f"Iluminación regular ({bright_smooth:.1f}/255)", "regular")
     else:
         return (f"Buena iluminación ({bright_smooth:.1f}/255)", "good")
 
+# =========================
+# ROI Tracking
+# =========================
+UPPER_BODY_IDX = np.arange(0, 25)  # cara, hombros, brazos y caderas
+
+class RoiTracker:
+    """
+    Recorta la región del torso superior a partir de los últimos landmarks
+    buenos y sólo pasa ese recorte a MediaPipe. La caja se mantiene mientras
+    el cuerpo siga dentro (histéresis) para no mover el recorte cada frame;
+    si se pierde el seguimiento se vuelve al frame completo.
+    """
+
+    def __init__(self, margin=0.25, min_size=0.35, max_side=384, min_vis=0.3):
+        self.margin = float(margin)
+        self.min_size = float(min_size)
+        self.max_side = int(max_side)
+        self.min_vis = float(min_vis)
+        self.enabled = True
+        self.box = None  # (x0, y0, x1, y1) normalizado al frame completo
+        self.roi_frames = 0
+        self.full_frames = 0
+        self.lost = 0
+
+    def reset(self):
+        self.box = None
+
+    def crop(self, img):
+        """Devuelve (imagen para inferir, caja en píxeles o None si es el frame completo)."""
+        if not self.enabled or self.box is None:
+            self.full_frames += 1
+            return img, None
+        H, W = img.shape[:2]
+        x0, y0, x1, y1 = self.box
+        px0, py0 = int(x0 * W), int(y0 * H)
+        px1, py1 = max(px0 + 2, int(np.ceil(x1 * W))), max(py0 + 2, int(np.ceil(y1 * H)))
+        roi = img[py0:py1, px0:px1]
+        side = max(roi.shape[:2])
+        if side > self.max_side:
+            f = self.max_side / side
+            roi = cv2.resize(roi, (max(2, int(roi.shape[1] * f)), max(2, int(roi.shape[0] * f))), interpolation=cv2.INTER_AREA)
+        self.roi_frames += 1
+        return roi, (px0, py0, px1, py1, W, H)
+
+    @staticmethod
+    def to_full(arr, box, landmarks=None):
+        """Pasa landmarks normalizados al recorte a coordenadas del frame completo."""
+        px0, py0, px1, py1, W, H = box
+        sx, sy = (px1 - px0) / W, (py1 - py0) / H
+        arr[:, 0] = px0 / W + arr[:, 0] * sx
+        arr[:, 1] = py0 / H + arr[:, 1] * sy
+        arr[:, 2] *= sx
+        if landmarks is not None:
+            # El overlay dibuja desde el proto: reescribirlo también
+            for p, (x, y, z) in zip(landmarks.landmark, arr[:, :3].tolist()):
+                p.x, p.y, p.z = x, y, z
+        return arr
+
+    def update(self, arr):
+        """Ajusta la caja para el siguiente frame con los landmarks (frame completo) o None."""
+        if not self.enabled:
+            return
+        if arr is None:
+            if self.box is not None:
+                self.lost += 1
+            self.box = None
+            return
+        pts = arr[UPPER_BODY_IDX]
+        pts = pts[pts[:, 3] >= self.min_vis]
+        if len(pts) < 4:
+            if self.box is not None:
+                self.lost += 1
+            self.box = None
+            return
+        bx0, by0 = pts[:, 0].min(), pts[:, 1].min()
+        bx1, by1 = pts[:, 0].max(), pts[:, 1].max()
+        if self.box is not None:
+            x0, y0, x1, y1 = self.box
+            inset_x, inset_y = 0.05 * (x1 - x0), 0.05 * (y1 - y0)
+            inside = bx0 >= x0 + inset_x and by0 >= y0 + inset_y and bx1 <= x1 - inset_x and by1 <= y1 - inset_y
+            area_ratio = ((bx1 - bx0) * (by1 - by0)) / max((x1 - x0) * (y1 - y0), 1e-9)
+            if inside and area_ratio >= 0.2:
+                return
+        w, h = bx1 - bx0, by1 - by0
+        cx, cy = (bx0 + bx1) / 2.0, (by0 + by1) / 2.0
+        w = max(w * (1.0 + 2.0 * self.margin), self.min_size)
+        h = max(h * (1.0 + 2.0 * self.margin), self.min_size)
+        self.box = (
+            float(max(0.0, cx - w / 2.0)), float(max(0.0, cy - h / 2.0)),
+            float(min(1.0, cx + w / 2.0)), float(min(1.0, cy + h / 2.0)),
+        )
+
+    def stats(self):
+        total = self.roi_frames + self.full_frames
+        area = None
+        if self.box is not None:
+            x0, y0, x1, y1 = self.box
+            area = (x1 - x0) * (y1 - y0)
+        return {
+            "tracking": self.box is not None,
+            "roi_ratio": (self.roi_frames / total) if total else 0.0,
+            "roi_area": area,
+            "lost": self.lost,
+        }
+
 # =========================
 # Frame Analysis
 # =========================
-def analyze(img_bgr, POSE, angle_fn, neck_ema_obj, bright_ema_obj, mode_label, thr, lighting_thresh, compute_wrist_mouth=False):
-    rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-    with pose_lock:
-        res = POSE.process(rgb)
-
-    neck_angle = None
-    wrist_mouth_dist = None
-
-    if res.pose_landmarks:
-        lmk = res.pose_landmarks.landmark
-        try:
-            neck_angle = angle_fn(lmk)
-        except Exception:
-            neck_angle = None
-
-        if compute_wrist_mouth:
-            try:
-                NOSE = mp_pose.PoseLandmark.NOSE.value
-                LW = mp_pose.PoseLandmark.LEFT_WRIST.value
-                RW = mp_pose.PoseLandmark.RIGHT_WRIST.value
-                nose = np.array([lmk[NOSE].x, lmk[NOSE].y], dtype=np.float32)
-
-                dists = []
-                for W in (LW, RW):
-                    if lmk[W].visibility >= 0.15:
-                        w = np.array([lmk[W].x, lmk[W].y], dtype=np.float32)
-                        dists.append(float(np.linalg.norm(w - nose)))
-                wrist_mouth_dist = min(dists) if dists else None
-            except Exception:
-                wrist_mouth_dist = None
+def analyze(img_bgr, POSE, neck_ema_obj, bright_ema_obj, mode_label, thr, lighting_thresh, compute_wrist_mouth=False, motion_gate=None, roi_tracker=None, rgb=None, luma_small=None, light=None):
+    """
+    `img_bgr` es el frame BGR de siempre. Con `FramePipeline` se pasa en su
+    lugar `rgb` (vista del frame ya decodificado). `luma_small` y `light`
+    vienen de `LightingEngine.measure` (plano Y); sin ellos se calcula el
+    brillo sobre una miniatura del BGR como antes.
+    """
+    # Miniatura de luminancia: sirve para el brillo y para la compuerta de movimiento
+    if luma_small is not None:
+        Y = luma_small
+    else:
+        small = cv2.resize(img_bgr, (96, 54), interpolation=cv2.INTER_AREA)
+        Y = (0.2126 * small[:, :, 2].astype(np.float32) +
+             0.7152 * small[:, :, 1].astype(np.float32) +
+             0.0722 * small[:, :, 0].astype(np.float32))
+
+    if motion_gate is not None and not motion_gate.needs_inference(Y):
+        # Escena quieta: reutilizar landmarks y ángulo del último frame inferido
+        motion_gate.mark_skipped()
+        res, neck_angle, wrist_mouth_dist, arr = motion_gate.last_result
+        infer_ms = None
+    else:
+        # Con seguimiento activo sólo se convierte e infiere el recorte del torso
+        base = rgb if rgb is not None else img_bgr
+        if roi_tracker is not None:
+            src, box = roi_tracker.crop(base)
+        else:
+            src, box = base, None
+        if rgb is None:
+            src = cv2.cvtColor(src, cv2.COLOR_BGR2RGB)
+        # POSE es un PoseLease del pool: serializa por modelo, no globalmente
+        t0 = time.perf_counter()
+        res = POSE.process(src)
+        infer_ms = 1000.0 * (time.perf_counter() - t0)
+
+        neck_angle = None
+        wrist_mouth_dist = None
+        arr = None
+
+        if res.pose_landmarks:
+            # Un solo paso: landmarks → (33, 4) → ángulos y distancias
+            arr = landmarks_to_array(res.pose_landmarks)
+            if box is not None:
+                arr = RoiTracker.to_full(arr, box, res.pose_landmarks)
+            geo = frame_geometry(arr)
+            neck_angle = geo["neck_side"] if mode_label == "side" else geo["neck_front"]
+            if compute_wrist_mouth:
+                wrist_mouth_dist = geo["wrist_mouth_dist"]
+
+        if roi_tracker is not None:
+            roi_tracker.update(arr)
+        if motion_gate is not None:
+            motion_gate.mark_inferred(Y, (res, neck_angle, wrist_mouth_dist, arr), infer_ms)
 
     neck_s = neck_ema_obj.update(neck_angle)
     posture_msg, posture_icon = classify_posture_by_mode(neck_s, mode_label, thr)
 
-    small = cv2.resize(img_bgr, (96, 54), interpolation=cv2.INTER_AREA)
-    Y = (0.2126 * small[:, :, 2].astype(np.float32) +
-         0.7152 * small[:, :, 1].astype(np.float32) +
-         0.0722 * small[:, :, 0].astype(np.float32))
-    bright = float(np.mean(Y))
+    bright = light["mean"] if light is not None else float(np.mean(Y))
     bright_s = bright_ema_obj.update(bright)
     lighting_ok = (bright_s is not None) and (bright_s >= lighting_thresh)
 
@@ -287,88 +485,159 @@ def analyze(img_bgr, POSE, angle_fn, neck_ema_obj, bright_ema_obj, mode_label, t
         "brightness_smooth": bright_s,
         "lighting_ok": lighting_ok,
         "wrist_mouth_dist": wrist_mouth_dist,
+        "infer_ms": infer_ms,
+        "light_metrics": light,
+        "landmarks": arr,  # (33, 4) en coordenadas del frame completo, o None
     }
 
 ORANGE = (0, 140, 255)
 
+# Frames de salida que streamlit-webrtc puede retener a la vez: su cola de
+# salida (hasta 2), el último reenviado cuando no hay uno nuevo y el que
+# aiortc está codificando. Pasados estos, el slot vuelve al anillo.
+OUT_FRAMES_IN_FLIGHT = 4
+
 # =========================
 # WebRTC Callback
 # =========================
-def make_callback(*, mode, shared, lock, frame_counter, neck_ema_obj, bright_ema_obj, POSE, thr, lighting_thresh, process_every_n, debug_overlay):
+def make_callback(*, mode, shared, lock, frame_counter, neck_ema_obj, bright_ema_obj, POSE, thr, lighting_thresh, process_every_n, debug_overlay, scheduler=None, motion_gate=None, roi_tracker=None, worker=None, pipeline=None, lighting=None, overlay=None, monitor=None, drink_detector=None, ring=None, clock=None):
     if mode == "side":
-        angle_fn = neck_angle_side_best
         title_msg = "Modo lateral"
         mode_label = "side"
         compute_wrist_mouth = True  # CHANGED: Now True for both modes
     else:
-        angle_fn = neck_angle_front_best
         title_msg = "Modo frontal"
         mode_label = "front"
         compute_wrist_mouth = True
+    if lighting is None:
+        lighting = LightingEngine()
+    if overlay is None:
+        overlay = PoseOverlay()
+    seen = {"result": None}
+    lent = deque()  # frames del anillo entregados a streamlit-webrtc
+
+    def sync_overlay(now):
+        # Async: el overlay toma cada resultado nuevo del worker al llegar
+        last = worker.latest()
+        if last is not seen["result"]:
+            seen["result"] = last
+            overlay.update(None if last is None else last[1]["landmarks"], now)
+
+    def after_inference(data, now):
+        if data["infer_ms"] is not None:
+            overlay.update(data["landmarks"], now)
+        else:
+            overlay.keep(now)  # compuerta de movimiento: mismos landmarks, no caducan
+
+    def run_analysis(img, rgb=None, luma_small=None, light=None, media_ts=None):
+        res, data = analyze(
+            img_bgr=img,
+            POSE=POSE,
+            neck_ema_obj=neck_ema_obj,
+            bright_ema_obj=bright_ema_obj,
+            mode_label=mode_label,
+            thr=thr,
+            lighting_thresh=lighting_thresh,
+            compute_wrist_mouth=compute_wrist_mouth,
+            motion_gate=motion_gate,
+            roi_tracker=roi_tracker,
+            rgb=rgb,
+            luma_small=luma_small,
+            light=light,
+        )
+        if scheduler is not None and data["infer_ms"] is not None:
+            scheduler.record(data["infer_ms"] / 1000.0)
+        data["media_ts"] = media_ts  # reloj del video para la contabilidad de la sesión
+        return res, data
+
+    def publish(result):
+        _, data = result
+        # `clock(media_ts)`: reloj de la sesión (headless sin pausar usa el del video)
+        now = time.time() if clock is None else clock(data["media_ts"])
+        with lock:
+            shared.update(data)
+            shared["last_update_ts"] = now
+        if ring is not None:
+            ring.append(data, now)
+        if drink_detector is not None:
+            # Cada resultado, no el refresco de la UI: los sorbos cortos cuentan
+            media_ts = data["media_ts"]
+            drink_detector.feed(data["wrist_mouth_dist"], now if media_ts is None else media_ts, now)
+        if monitor is not None:
+            monitor.update(data, now)
+
+    def run_slot(slot):
+        return run_analysis(None, rgb=slot.rgb, luma_small=slot.luma, light=slot.light, media_ts=slot.media_ts)
+
+    def run_payload(payload):
+        img, luma_small, light, media_ts = payload
+        return run_analysis(img, luma_small=luma_small, light=light, media_ts=media_ts)
+
+    def should_process_frame(media_ts):
+        frame_counter["n"] += 1
+        if scheduler is not None:
+            return scheduler.should_process(media_ts)
+        return frame_counter["n"] % int(process_every_n) == 0
+
+    def pipeline_callback(frame: av.VideoFrame):
+        # Una sola decodificación: el RGB vive en el frame que se devuelve
+        t_in = time.perf_counter()
+        vf, rgb = pipeline.decode(frame)
+        lent.append(vf)
+        if len(lent) > OUT_FRAMES_IN_FLIGHT:
+            pipeline.release(lent.popleft())
+        should_process = should_process_frame(frame.time)
+
+        if worker is not None:
+            if should_process:
+                light, Y = lighting.measure(frame)
+                slot = pipeline.acquire_infer_slot(rgb, Y, light, frame.time)
+                worker.submit(slot, run_slot, publish, now=t_in, on_done=pipeline.release_infer_slot)
+            sync_overlay(t_in)
+            if debug_overlay:
+                overlay.draw(rgb, now=t_in, rgb=True)
+            worker.record_video_latency(time.perf_counter() - t_in)
+            return vf
+
+        if should_process:
+            light, Y = lighting.measure(frame)
+            res, data = run_analysis(None, rgb=rgb, luma_small=Y, light=light, media_ts=frame.time)
+            after_inference(data, t_in)
+            publish((res, data))
+        if debug_overlay:
+            overlay.draw(rgb, now=t_in, rgb=True)
+        return vf
 
     def callback(frame: av.VideoFrame):
+        t_in = time.perf_counter()
         img = frame.to_ndarray(format="bgr24")
-        frame_counter["n"] += 1
-        should_process = (frame_counter["n"] % int(process_every_n) == 0)
+        should_process = should_process_frame(frame.time)
+
+        if worker is not None:
+            # Asíncrono: el video vuelve sin esperar a MediaPipe
+            if should_process:
+                light, Y = lighting.measure(frame)
+                # La miniatura es un buffer del motor: el worker necesita la suya
+                worker.submit((img, Y.copy(), light, frame.time), run_payload, publish, now=t_in)
+            out = img
+            sync_overlay(t_in)
+            if debug_overlay:
+                if should_process:
+                    out = img.copy()  # el worker todavía lee `img`
+                overlay.draw(out, now=t_in)
+            vf = av.VideoFrame.from_ndarray(out, format="bgr24")
+            worker.record_video_latency(time.perf_counter() - t_in)
+            return vf
 
         if should_process:
-            res, data = analyze(
-                img_bgr=img,
-                POSE=POSE,
-                angle_fn=angle_fn,
-                neck_ema_obj=neck_ema_obj,
-                bright_ema_obj=bright_ema_obj,
-                mode_label=mode_label,
-                thr=thr,
-                lighting_thresh=lighting_thresh,
-                compute_wrist_mouth=compute_wrist_mouth,
-            )
-
-            if debug_overlay and res.pose_landmarks:
-                mp_drawing.draw_landmarks(
-                    img, res.pose_landmarks, mp_pose.POSE_CONNECTIONS,
-                    mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2),
-                    mp_drawing.DrawingSpec(color=(0, 0, 255), thickness=2),
-                )
-
-            with lock:
-                shared.update(data)
-                shared["last_update_ts"] = time.time()
-
-            return av.VideoFrame.from_ndarray(img, format="bgr24")
-        else:
-            return av.VideoFrame.from_ndarray(img, format="bgr24")
+            light, Y = lighting.measure(frame)
+            res, data = run_analysis(img, luma_small=Y, light=light, media_ts=frame.time)
+            after_inference(data, t_in)
+            publish((res, data))
 
-    return callback
+        # En todos los frames, no sólo en los inferidos (sin parpadeo)
+        if debug_overlay:
+            overlay.draw(img, now=t_in)
+        return av.VideoFrame.from_ndarray(img, format="bgr24")
 
-# =========================
-# Sitting Time Tracker
-# =========================
-def update_sitting_time(dt, pose_detected):
-    """
-    Actualiza el tiempo sentado basándose en si se detecta pose.
-    Si hay pose = persona presente = sentado
-    """
-    if not st.session_state.get("enable_sitting_tracker", True):
-        return
-    
-    now = time.time()
-    
-    # Si detectamos pose, la persona está sentada
-    if pose_detected:
-        if not st.session_state.get("is_currently_sitting", False):
-            # Persona acaba de sentarse
-            st.session_state.is_currently_sitting = True
-            st.session_state.sitting_start_time = now
-        
-        # Acumular tiempo sentado
-        st.session_state.total_sitting_time = st.session_state.get("total_sitting_time", 0.0) + dt
-        
-    else:
-        # No hay pose = persona no está o se levantó
-        if st.session_state.get("is_currently_sitting", False):
-            # Persona se levantó - resetear
-            st.session_state.is_currently_sitting = False
-            st.session_state.sitting_start_time = None
-            st.session_state.total_sitting_time = 0.0
-            st.session_state.sitting_alert_sent = False
\ No newline at end of file
+    return pipeline_callback if pipeline is not None else callback
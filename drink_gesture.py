@@ -0,0 +1,88 @@
+import queue
+import threading
+from collections import namedtuple
+
+# =========================
+# Gesto de beber (distancia muñeca→nariz, normalizada)
+# =========================
+D_NEAR = 0.22  # entra en "cerca" por debajo
+D_FAR = 0.30   # sale por encima: la banda evita rebotes en el borde
+T_MIN = {"front": 1.3, "side": 2.0}  # el perfil tapa la mano: gesto más largo
+T_MAX = 3.0
+T_FACE = 4.0  # más tiempo cerca = mano en la cara, no bebiendo
+LOST_GRACE_SEC = 0.6  # la mano tapa la cara: detecciones perdidas cortas no cortan el gesto
+MIN_GAP_SEC = 60
+
+DrinkEvent = namedtuple("DrinkEvent", "ts media_ts duration")
+
+
+class DrinkDetector:
+    """
+    Detector del gesto de beber sobre cada frame inferido, con histéresis
+    (D_NEAR/D_FAR) y duraciones medidas con el timestamp del frame, no con
+    el refresco de la UI. Cada toma detectada se publica como `DrinkEvent`
+    en `events` (queue.Queue), que consume el monitor o la sesión.
+    """
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.t_min = T_MIN[mode]
+        self.enabled = True
+        self.events = queue.Queue()
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.detected = 0
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.state = "far"  # far | near | face
+            self._start = None
+            self._seen = None
+            self._last_event = None
+        while True:
+            try:
+                self.events.get_nowait()
+            except queue.Empty:
+                break
+
+    def feed(self, dist, media_ts, ts):
+        """
+        Un resultado de inferencia: `dist` (o None sin muñeca/nariz), reloj
+        del video `media_ts` para las duraciones y `ts` de pared para el evento.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.samples += 1
+            if dist is None:
+                if self.state != "far" and media_ts - self._seen > LOST_GRACE_SEC:
+                    self.state = "far"
+                return
+
+            if self.state == "far":
+                if dist < D_NEAR:
+                    self.state, self._start = "near", media_ts
+            elif dist > D_FAR:
+                duration = media_ts - self._start
+                if self.state == "near" and self.t_min <= duration <= T_MAX:
+                    if self._last_event is None or media_ts - self._last_event >= MIN_GAP_SEC:
+                        self._last_event = media_ts
+                        self.detected += 1
+                        self.events.put(DrinkEvent(float(ts), float(media_ts), duration))
+                self.state = "far"
+            elif self.state == "near" and media_ts - self._start > T_FACE:
+                self.state = "face"  # hasta que la mano se aleje
+            self._seen = media_ts
+
+    def drain(self):
+        """Eventos pendientes, en orden."""
+        out = []
+        while True:
+            try:
+                out.append(self.events.get_nowait())
+            except queue.Empty:
+                return out
+
+    def stats(self):
+        return {"state": self.state, "samples": self.samples, "detected": self.detected}
@@ -0,0 +1,177 @@
+import threading
+
+import numpy as np
+import cv2
+import av
+
+def _plane_view(plane, rows, cols):
+    """Vista (rows, cols) sobre un plano de av.VideoFrame respetando line_size."""
+    buf = np.frombuffer(plane, np.uint8)
+    return buf.reshape(-1, plane.line_size)[:rows, :cols]
+
+
+class _RingSlot:
+    __slots__ = ("vf", "rgb", "lent")
+
+    def __init__(self, vf, rgb):
+        self.vf = vf
+        self.rgb = rgb
+        self.lent = False
+
+
+class _InferSlot:
+    __slots__ = ("rgb", "luma", "light", "media_ts", "busy")
+
+    def __init__(self, rgb):
+        self.rgb = rgb
+        self.luma = None
+        self.light = None
+        self.media_ts = None
+        self.busy = False
+
+
+class FramePipeline:
+    """
+    Decodifica cada frame de WebRTC una sola vez, directamente dentro de un
+    anillo de `av.VideoFrame` RGB preasignados, y reparte vistas de ese mismo
+    buffer a la inferencia y al overlay (que se dibuja en sitio). El brillo
+    no pasa por aquí: `LightingEngine` lee el plano Y del frame de entrada.
+
+    - yuv420p (lo que entrega aiortc): los planos se copian a un buffer I420
+      fijo y `cv2.cvtColor(..., dst=)` escribe el RGB en el frame de salida.
+      Otros formatos usan `to_ndarray` y cuentan como asignación.
+    - Cada frame de salida queda prestado hasta que el consumidor lo devuelve
+      con `release(vf)`; si no hay ninguno libre se agrega uno nuevo al
+      anillo (`ring_busy`) en vez de pisar uno que el encoder aún no leyó.
+    - Modo asíncrono: el worker recibe una copia en uno de `infer_slots`
+      buffers fijos, liberado al terminar el trabajo.
+
+    `allocations` cuenta los buffers del tamaño del frame creados por el
+    pipeline; en régimen estable `last_frame_allocs` debe ser 0.
+    """
+
+    def __init__(self, ring_size=8, infer_slots=3):
+        self.ring_size = max(2, int(ring_size))
+        self.n_infer_slots = max(1, int(infer_slots))
+        self._lock = threading.Lock()
+        self._size = None
+        self._ring = []
+        self._pos = 0
+        self.frames = 0
+        self.allocations = 0
+        self.alloc_bytes = 0
+        self.last_frame_allocs = 0
+        self.fallback_frames = 0
+        self.ring_busy = 0
+
+    # ---- asignación (contada) ----
+    def _count(self, nbytes):
+        self.allocations += 1
+        self.alloc_bytes += int(nbytes)
+        self.last_frame_allocs += 1
+
+    def _empty(self, shape, dtype=np.uint8):
+        arr = np.empty(shape, dtype=dtype)
+        self._count(arr.nbytes)
+        return arr
+
+    def _new_slot(self):
+        W, H = self._size
+        vf = av.VideoFrame(W, H, "rgb24")
+        self._count(vf.planes[0].buffer_size)
+        rgb = _plane_view(vf.planes[0], H, 3 * W).reshape(H, W, 3)
+        return _RingSlot(vf, rgb)
+
+    def _ensure(self, W, H):
+        if self._size == (W, H):
+            return
+        self._size = (W, H)
+        self._ring = []
+        for _ in range(self.ring_size):
+            self._ring.append(self._new_slot())
+        self._pos = 0
+        self._i420 = self._empty((H * 3 // 2, W))
+        flat = self._i420.reshape(-1)
+        q = (W // 2) * (H // 2)
+        self._y = flat[: W * H].reshape(H, W)
+        self._u = flat[W * H : W * H + q].reshape(H // 2, W // 2)
+        self._v = flat[W * H + q : W * H + 2 * q].reshape(H // 2, W // 2)
+        with self._lock:
+            self._infer_slots = [_InferSlot(self._empty((H, W, 3))) for _ in range(self.n_infer_slots)]
+
+    # ---- por frame ----
+    def decode(self, frame):
+        """Devuelve (frame de salida, vista RGB (H, W, 3) sobre su plano)."""
+        self.last_frame_allocs = 0
+        W, H = frame.width, frame.height
+        self._ensure(W, H)
+        slot = self._next_free()
+        slot.lent = True
+        vf, rgb = slot.vf, slot.rgb
+
+        done = False
+        if frame.format.name == "yuv420p" and W % 2 == 0 and H % 2 == 0:
+            y, u, v = frame.planes
+            np.copyto(self._y, _plane_view(y, H, W))
+            np.copyto(self._u, _plane_view(u, H // 2, W // 2))
+            np.copyto(self._v, _plane_view(v, H // 2, W // 2))
+            done = cv2.cvtColor(self._i420, cv2.COLOR_YUV2RGB_I420, dst=rgb) is rgb
+        if not done:
+            self.fallback_frames += 1
+            tmp = frame.to_ndarray(format="rgb24")
+            self._count(tmp.nbytes)
+            np.copyto(rgb, tmp)
+        self.frames += 1
+        return vf, rgb
+
+    def _next_free(self):
+        n = len(self._ring)
+        for i in range(n):
+            slot = self._ring[(self._pos + i) % n]
+            if not slot.lent:
+                self._pos = (self._pos + i + 1) % n
+                return slot
+        # Todos prestados: el anillo crece en vez de pisar un frame en uso
+        self.ring_busy += 1
+        slot = self._new_slot()
+        self._ring.insert(self._pos, slot)
+        self._pos = (self._pos + 1) % len(self._ring)
+        return slot
+
+    def release(self, vf):
+        """Devuelve al anillo un frame de `decode` que el consumidor ya no usa."""
+        for slot in self._ring:
+            if slot.vf is vf:
+                slot.lent = False
+                return
+
+    def acquire_infer_slot(self, rgb, luma, light, media_ts=None):
+        """Copia el frame (y su miniatura de luminancia) a un buffer libre para el worker asíncrono."""
+        with self._lock:
+            slot = next((s for s in self._infer_slots if not s.busy), None)
+            if slot is None:
+                # El worker retiene todos: uno extra, fuera del pool
+                W, H = self._size
+                slot = _InferSlot(self._empty((H, W, 3)))
+            slot.busy = True
+        if slot.luma is None or slot.luma.shape != luma.shape:
+            slot.luma = self._empty(luma.shape, luma.dtype)
+        np.copyto(slot.rgb, rgb)
+        np.copyto(slot.luma, luma)
+        slot.light = light
+        slot.media_ts = media_ts
+        return slot
+
+    def release_infer_slot(self, slot):
+        with self._lock:
+            slot.busy = False
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "allocations": self.allocations,
+            "alloc_mb": self.alloc_bytes / 1e6,
+            "last_frame_allocs": self.last_frame_allocs,
+            "fallback_frames": self.fallback_frames,
+            "ring_busy": self.ring_busy,
+        }
@@ -0,0 +1,295 @@
+"""
+Monitor sin navegador (kiosco, escritorio compartido): lee la cámara local
+(V4L2) o un archivo de video y corre el mismo pipeline que la app
+(`common.make_callback` → `analyze` → `StatusMonitor`), con las mismas
+alertas, `NotificationManager` e historial en `session_logger`. Sin
+WebRTC no hay ida y vuelta ni re-codificación del video.
+
+La configuración sale de un archivo TOML (ver `ergovision_headless.toml`)
+en lugar de la barra lateral; cada `report_sec` se imprime el uso de CPU y
+los frames por segundo.
+
+Uso:
+    python headless.py --config ergovision_headless.toml
+    python headless.py --config ergovision_headless.toml --source pasillo.mp4 --mode front
+"""
+import argparse
+import signal
+import socket
+import sys
+import threading
+import time
+import tomllib
+from fractions import Fraction
+from functools import partial
+
+import av
+
+from common import EMA, RoiTracker, make_callback, new_shared_state, try_limit_opencv_threads
+from frame_pipeline import FramePipeline
+from inference_scheduler import HOST_CPU, InferenceScheduler, MotionGate
+from lighting import LightingEngine
+from notificaciones import NotificationManager
+from overlay import PoseOverlay
+from pose_pool import PosePool, PoseLease
+from presence import PresenceTracker
+from session_logger import DEFAULT_DB_PATH, store_session
+from sidebar_config import get_config
+from status_monitor import StatusMonitor
+
+# Valores por defecto: los mismos de la barra lateral
+DEFAULTS = {
+    "source": {"device": "/dev/video0", "backend": "pyav", "mode": "side", "width": 640, "height": 360, "fps": 15,
+               "realtime": True},
+    "inference": {"adaptive": True, "target_fps": 10, "cpu_budget_pct": 75, "every_n": 1,
+                  "motion_gate": True, "roi_tracking": True},
+    "thresholds": {"lighting": 55, "front_good": 163.0, "front_fair": 159.0, "side_good": 165.0, "side_fair": 160.0},
+    "alerts": {"posture": True, "posture_seconds": 6, "good_seconds": 3,
+               "light": True, "light_seconds": 8, "good_light_seconds": 3, "cooldown_seconds": 15},
+    "notifications": {"desktop": True, "sound": True, "cooldown_min": 5},
+    "wellbeing": {"hydration": True, "hydrate_interval_min": 45, "drink_detection": True,
+                  "sitting_tracker": True, "sitting_threshold_min": 30, "sitting_absence_sec": 10},
+    "history": {"enabled": True, "db_path": DEFAULT_DB_PATH, "series": True, "user": "",
+                "checkpoint_sec": 30, "split_absence_min": 30},
+    "report": {"interval_sec": 60},
+}
+
+
+def load_config(path=None):
+    """Archivo TOML sobre DEFAULTS, sección por sección (claves desconocidas = error)."""
+    conf = {section: dict(values) for section, values in DEFAULTS.items()}
+    if path:
+        with open(path, "rb") as f:
+            user = tomllib.load(f)
+        for section, values in user.items():
+            if section not in conf:
+                raise ValueError(f"sección desconocida: [{section}]")
+            unknown = set(values) - set(conf[section])
+            if unknown:
+                raise ValueError(f"[{section}]: claves desconocidas: {', '.join(sorted(unknown))}")
+            conf[section].update(values)
+    return conf
+
+
+def build_cfg(conf):
+    """El `cfg` de `get_config` y los ajustes de bienestar del monitor."""
+    inf, thr, al, no, hist = conf["inference"], conf["thresholds"], conf["alerts"], conf["notifications"], conf["history"]
+    cfg = get_config(
+        lighting_thresh=thr["lighting"], process_every_n=inf["every_n"], debug_overlay=False,
+        fr_good=thr["front_good"], fr_fair=thr["front_fair"], lat_good=thr["side_good"], lat_fair=thr["side_fair"],
+        enable_posture_alerts=al["posture"], posture_seconds=al["posture_seconds"], good_seconds=al["good_seconds"],
+        enable_light_alerts=al["light"], light_seconds=al["light_seconds"], good_light_seconds=al["good_light_seconds"],
+        cooldown_seconds=al["cooldown_seconds"],
+        enable_desktop_notifications=no["desktop"], enable_notification_sound=no["sound"],
+        adaptive_inference=inf["adaptive"], target_infer_fps=inf["target_fps"], cpu_budget_pct=inf["cpu_budget_pct"],
+        motion_gate=inf["motion_gate"], roi_tracking=inf["roi_tracking"],
+        enable_history=hist["enabled"], history_db_path=hist["db_path"], history_series=hist["series"],
+        checkpoint_sec=hist["checkpoint_sec"], split_absence_min=hist["split_absence_min"],
+    )
+    wb = conf["wellbeing"]
+    settings = {
+        "enable_hydration": wb["hydration"],
+        "hydrate_interval_min": wb["hydrate_interval_min"],
+        "enable_drink_detection": wb["drink_detection"],
+        "enable_sitting_tracker": wb["sitting_tracker"],
+        "sitting_time_threshold_min": wb["sitting_threshold_min"],
+    }
+    return cfg, settings
+
+
+# =========================
+# Fuentes de video
+# =========================
+def _is_camera(dev):
+    return str(dev).startswith("/dev/video") or str(dev).isdigit()
+
+
+def _paced(frames, src, stop):
+    """Con `realtime`, un archivo se entrega a la velocidad del video, como una cámara."""
+    if _is_camera(src["device"]) or not src["realtime"]:
+        yield from frames
+        return
+    start = None
+    for frame in frames:
+        if frame.time is not None:
+            if start is None:
+                start = (time.monotonic(), frame.time)
+            wait = (frame.time - start[1]) - (time.monotonic() - start[0])
+            if wait > 0 and stop.wait(wait):
+                return
+        yield frame
+
+
+def pyav_frames(src, stop):
+    """av.VideoFrame de una cámara V4L2 (/dev/videoN) o de un archivo."""
+    options, fmt = {}, None
+    if src["device"].startswith("/dev/video"):
+        fmt = "v4l2"
+        options = {"video_size": f"{src['width']}x{src['height']}", "framerate": str(src["fps"])}
+    with av.open(src["device"], format=fmt, options=options) as container:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        for frame in container.decode(stream):
+            if stop.is_set():
+                return
+            yield frame
+
+
+def opencv_frames(src, stop):
+    """Alternativa con cv2.VideoCapture (índice o ruta); el pts sale de CAP_PROP_POS_MSEC."""
+    import cv2
+
+    dev = str(src["device"])
+    cap = cv2.VideoCapture(int(dev) if dev.isdigit() else dev)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, src["width"])
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, src["height"])
+    cap.set(cv2.CAP_PROP_FPS, src["fps"])
+    t0 = time.monotonic()
+    try:
+        while not stop.is_set():
+            ok, img = cap.read()
+            if not ok:
+                return
+            frame = av.VideoFrame.from_ndarray(img, format="bgr24")
+            ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            frame.pts = int(ms if ms > 0 else 1000.0 * (time.monotonic() - t0))
+            frame.time_base = Fraction(1, 1000)
+            yield frame
+    finally:
+        cap.release()
+
+
+class MediaClock:
+    """
+    Reloj de la sesión para un archivo sin pausar: la hora de inicio más el
+    tiempo de video transcurrido. Duraciones, alertas, ausencias y
+    enfriamientos miden así el mismo tiempo que `SessionAccumulator`, aunque
+    el lote corra mucho más rápido que el video.
+    """
+
+    def __init__(self, start):
+        self.start = float(start)
+        self._base = None
+        self._now = self.start
+
+    def __call__(self, media_ts=None):
+        if media_ts is not None:
+            if self._base is None:
+                self._base = float(media_ts)
+            self._now = max(self._now, self.start + float(media_ts) - self._base)
+        return self._now
+
+
+# =========================
+# Bucle principal
+# =========================
+def run(conf, *, log=print, stop=None):
+    stop = stop or threading.Event()
+    src = conf["source"]
+    mode = src["mode"]
+    cfg, settings = build_cfg(conf)
+
+    notifier = NotificationManager(cooldown_seconds=60 * conf["notifications"]["cooldown_min"])
+    # Archivo sin pausar: el reloj de pared corre más lento que el video
+    media_clock = not _is_camera(src["device"]) and not src["realtime"]
+    clock = MediaClock(time.time()) if media_clock else None
+    if clock is not None:
+        notifier.clock = clock
+    wb = conf["wellbeing"]
+    presence = PresenceTracker(absence_sec=wb["sitting_absence_sec"], threshold_min=wb["sitting_threshold_min"])
+    presence.enabled = wb["sitting_tracker"]
+    store = None
+    if cfg["enable_history"]:
+        store = partial(store_session, mode=mode, db_path=cfg["history_db_path"],
+                        user=conf["history"]["user"] or None, device=f"{socket.gethostname()}:{src['device']}")
+    monitor = StatusMonitor(mode)
+    monitor.configure(cfg, settings, notifier, presence, store=store)
+
+    scheduler = InferenceScheduler()
+    scheduler.configure(
+        target_fps=cfg["target_infer_fps"], cpu_budget=cfg["cpu_budget"],
+        adaptive=cfg["adaptive_inference"], every_n=cfg["process_every_n"],
+        media_clock=media_clock,
+    )
+    motion_gate = MotionGate()
+    motion_gate.enabled = cfg["motion_gate"]
+    roi_tracker = RoiTracker()
+    roi_tracker.enabled = cfg["roi_tracking"]
+    pipeline = FramePipeline()
+    pose_lease = PoseLease(PosePool(size=1))
+
+    cb = make_callback(
+        mode=mode, shared=new_shared_state(), lock=threading.Lock(), frame_counter={"n": 0},
+        neck_ema_obj=EMA(alpha=0.35, initial=None), bright_ema_obj=EMA(alpha=0.25, initial=60.0),
+        POSE=pose_lease, thr=cfg["thr"], lighting_thresh=cfg["lighting_thresh"],
+        process_every_n=cfg["process_every_n"], debug_overlay=False,
+        scheduler=scheduler, motion_gate=motion_gate, roi_tracker=roi_tracker,
+        pipeline=pipeline, lighting=LightingEngine(), overlay=PoseOverlay(),
+        monitor=monitor, drink_detector=monitor.drinks, clock=clock,
+    )
+
+    frames_of = opencv_frames if src["backend"] == "opencv" else pyav_frames
+    report_sec = float(conf["report"]["interval_sec"])
+    now_fn = clock or time.time
+    monitor.reset(now_fn(), history=cfg["enable_history"], series=cfg["history_series"])
+    log(f"ErgoVision sin navegador: {src['device']} ({src['backend']}, modo {mode})")
+
+    t_start = last_report = time.monotonic()
+    cpu_start = cpu_last = time.process_time()
+    frames = frames_last = inferred_last = 0
+    try:
+        for frame in _paced(frames_of(src, stop), src, stop):
+            cb(frame)
+            frames += 1
+            now = time.monotonic()
+            if now - last_report >= report_sec:
+                cpu = time.process_time()
+                ss = scheduler.stats()
+                snap = monitor.snapshot()
+                wall = now - last_report
+                log(f"{(frames - frames_last) / wall:.1f} fps · inferencia {(ss['inferred'] - inferred_last) / wall:.1f}/s"
+                    f" · CPU proceso {100 * (cpu - cpu_last) / wall:.0f}% de un núcleo (host {100 * HOST_CPU.utilization():.0f}%)"
+                    f" · {snap.get('p_label', 'sin datos')}")
+                last_report, cpu_last, frames_last, inferred_last = now, cpu, frames, ss["inferred"]
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sess = monitor.finish(now_fn())
+        pose_lease.release()
+
+    wall = time.monotonic() - t_start
+    cpu = time.process_time() - cpu_start
+    log(f"{frames} frames en {wall:.1f} s: {frames / max(wall, 1e-9):.1f} fps, "
+        f"{scheduler.stats()['inferred']} inferencias, CPU {100 * cpu / max(wall, 1e-9):.0f}% de un núcleo")
+    if sess is not None and monitor.session_id is not None:
+        log(f"✔ sesión #{monitor.session_id} ({sess.duration_sec / 60.0:.1f} min)")
+    return {"frames": frames, "wall_sec": wall, "cpu_sec": cpu}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="ErgoVision: monitor sin navegador (cámara local o archivo)")
+    ap.add_argument("--config", default=None, help="Archivo TOML (por defecto: valores de la barra lateral)")
+    ap.add_argument("--source", default=None, help="Dispositivo (/dev/video0, índice con opencv) o archivo de video")
+    ap.add_argument("--backend", choices=["pyav", "opencv"], default=None)
+    ap.add_argument("--mode", choices=["front", "side"], default=None, help="Vista de la cámara")
+    ap.add_argument("--db", default=None, help="Base de datos SQLite de sesiones")
+    args = ap.parse_args(argv)
+
+    try:
+        conf = load_config(args.config)
+    except (OSError, ValueError, tomllib.TOMLDecodeError) as e:
+        ap.error(str(e))
+    for section, key, value in (("source", "device", args.source), ("source", "backend", args.backend),
+                                ("source", "mode", args.mode), ("history", "db_path", args.db)):
+        if value is not None:
+            conf[section][key] = value
+
+    try_limit_opencv_threads(2)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())  # systemd: guardar la sesión y salir
+    run(conf, stop=stop)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
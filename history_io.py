@@ -0,0 +1,229 @@
+"""
+Exportar e importar el historial de sesiones (CSV, Parquet o JSON Lines).
+
+Lee y escribe por bloques de `--chunk-rows` filas (`session_logger.iter_session_rows`
+/ `import_sessions`), así que la memoria no crece con el tamaño del historial.
+Parquet es columnar y, con `--series`, agrega la serie de cada sesión como
+listas (`series_angle`, `series_brightness`, `series_presence`); JSON Lines
+también la acepta. Importar es idempotente: se omiten las sesiones que ya
+están, por (start_ts, mode, device).
+
+Uso:
+    python history_io.py export historial.parquet --series
+    python history_io.py export sesiones.csv --since-days 30 --db historial.db
+    python history_io.py import historial.parquet --db otra_pc.db
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+from session_logger import (
+    DEFAULT_DB_PATH, EXPORT_CHUNK_ROWS, import_sessions, iter_session_rows, session_column_types,
+)
+
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+SERIES_KEYS = ("angle", "brightness", "presence")
+
+
+def detect_format(path, fmt=None):
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"formato desconocido para {path} (usa --format csv|parquet|jsonl)")
+    return fmt
+
+
+def _chunks(it, size):
+    chunk = []
+    for item in it:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _json_list(values):
+    # JSON no tiene NaN: sin dato -> null
+    return [None if math.isnan(v) else v for v in np.asarray(values, np.float64).tolist()]
+
+
+# =========================
+# Escritores (un bloque por llamada)
+# =========================
+class CsvWriter:
+    def __init__(self, path, names, types, series):
+        if series:
+            raise ValueError("CSV no lleva series; usa Parquet o JSON Lines")
+        self._f = open(path, "w", newline="", encoding="utf-8")
+        self._w = csv.writer(self._f)
+        self._w.writerow(names)
+
+    def write(self, names, rows, series):
+        self._w.writerows(rows)
+
+    def close(self):
+        self._f.close()
+
+
+class JsonlWriter:
+    def __init__(self, path, names, types, series):
+        self._f = open(path, "w", encoding="utf-8")
+
+    def write(self, names, rows, series):
+        lines = []
+        for r in rows:
+            d = dict(zip(names, r))
+            d["metrics"] = json.loads(d.pop("metrics_json") or "{}")
+            s = series.get(d["id"])
+            if s is not None:
+                d["series"] = {"rate_hz": s["rate_hz"], **{k: _json_list(s[k]) for k in SERIES_KEYS}}
+            lines.append(json.dumps(d, ensure_ascii=False, separators=(",", ":")))
+        self._f.write("\n".join(lines) + "\n")
+
+    def close(self):
+        self._f.close()
+
+
+class ParquetWriter:
+    """Un row group por bloque; esquema fijo a partir de las columnas de `sessions`."""
+
+    def __init__(self, path, names, types, series):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        arrow = {"INTEGER": pa.int64(), "REAL": pa.float64()}
+        fields = [pa.field(n, arrow.get(types[n], pa.string())) for n in names]
+        if series:
+            fields.append(pa.field("series_rate_hz", pa.float64()))
+            fields += [pa.field(f"series_{k}", pa.list_(pa.float32())) for k in SERIES_KEYS]
+        self.schema = pa.schema(fields)
+        self._series = series
+        self._w = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, names, rows, series):
+        pa = self._pa
+        cols = list(zip(*rows))
+        if self._series:
+            per_row = [series.get(i) for i in cols[names.index("id")]]
+            cols.append([s["rate_hz"] if s else None for s in per_row])
+            cols += [[s[k] if s else None for s in per_row] for k in SERIES_KEYS]
+        arrays = [pa.array(c, type=f.type) for c, f in zip(cols, self.schema)]
+        self._w.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self._w.close()
+
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+
+# =========================
+# Lectores (bloques de dicts para import_sessions)
+# =========================
+def read_csv(path, chunk_rows, types):
+    conv = {"INTEGER": lambda v: int(float(v)), "REAL": float}
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = ({k: (conv.get(types.get(k), str)(v) if v != "" else None) for k, v in r.items()}
+                for r in csv.DictReader(f))
+        yield from _chunks(rows, chunk_rows)
+
+
+def read_jsonl(path, chunk_rows, types):
+    with open(path, encoding="utf-8") as f:
+        yield from _chunks((json.loads(line) for line in f if line.strip()), chunk_rows)
+
+
+def read_parquet(path, chunk_rows, types):
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+        rows = batch.to_pylist()
+        for d in rows:
+            if d.get("series_angle") is not None:
+                d["series"] = {"rate_hz": d["series_rate_hz"], **{k: d[f"series_{k}"] for k in SERIES_KEYS}}
+        yield rows
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl, "parquet": read_parquet}
+
+
+# =========================
+# Comandos
+# =========================
+def _rate(n, sec, path):
+    mb = os.path.getsize(path) / 1e6
+    return f"{n / max(sec, 1e-9):.0f} filas/s, {mb:.1f} MB, {mb / max(sec, 1e-9):.1f} MB/s"
+
+
+def export_history(path, *, fmt=None, db_path=DEFAULT_DB_PATH, chunk_rows=EXPORT_CHUNK_ROWS, since=None,
+                   series=False, log=print):
+    fmt = detect_format(path, fmt)
+    types = session_column_types(db_path)
+    names = list(types)
+    t0 = time.perf_counter()
+    n = 0
+    writer = WRITERS[fmt](path, names, types, series)
+    try:
+        for chunk_names, rows, chunk_series in iter_session_rows(
+            chunk_rows=chunk_rows, since=since, with_series=series, db_path=db_path,
+        ):
+            writer.write(chunk_names, rows, chunk_series)
+            n += len(rows)
+    finally:
+        writer.close()
+    sec = time.perf_counter() - t0
+    log(f"{fmt}: {n} sesiones exportadas a {path} en {sec:.2f} s ({_rate(n, sec, path)})")
+    return {"rows": n, "sec": sec}
+
+
+def import_history(path, *, fmt=None, db_path=DEFAULT_DB_PATH, chunk_rows=EXPORT_CHUNK_ROWS, log=print):
+    fmt = detect_format(path, fmt)
+    types = session_column_types(db_path)
+    t0 = time.perf_counter()
+    inserted = skipped = 0
+    for rows in READERS[fmt](path, chunk_rows, types):
+        ins, skip = import_sessions(rows, db_path=db_path)  # una transacción por bloque
+        inserted += ins
+        skipped += skip
+    sec = time.perf_counter() - t0
+    n = inserted + skipped
+    log(f"{fmt}: {n} sesiones leídas de {path} en {sec:.2f} s ({_rate(n, sec, path)}); "
+        f"{inserted} nuevas, {skipped} ya estaban")
+    return {"rows": n, "inserted": inserted, "skipped": skipped, "sec": sec}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="ErgoVision: exportar / importar el historial de sesiones")
+    ap.add_argument("command", choices=["export", "import"])
+    ap.add_argument("path", help="Archivo .csv, .parquet o .jsonl")
+    ap.add_argument("--format", choices=sorted(WRITERS), default=None, help="Por defecto: según la extensión")
+    ap.add_argument("--db", default=DEFAULT_DB_PATH, help="Base de datos SQLite de sesiones")
+    ap.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS, help="Filas por bloque (memoria)")
+    ap.add_argument("--series", action="store_true", help="Exportar también las series (Parquet / JSON Lines)")
+    ap.add_argument("--since-days", type=float, default=None, help="Exportar sólo los últimos N días")
+    args = ap.parse_args(argv)
+
+    try:
+        if args.command == "export":
+            since = time.time() - args.since_days * 86400.0 if args.since_days else None
+            export_history(args.path, fmt=args.format, db_path=args.db, chunk_rows=args.chunk_rows,
+                           since=since, series=args.series)
+        else:
+            if not os.path.exists(args.path):
+                ap.error(f"no existe: {args.path}")
+            import_history(args.path, fmt=args.format, db_path=args.db, chunk_rows=args.chunk_rows)
+    except ValueError as e:
+        ap.error(str(e))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,22 @@
 import datetime as _dt
+import os
+import time
+
+import numpy as np
 import pandas as pd
 import streamlit as st
 
-from session_logger import fetch_sessions, DEFAULT_DB_PATH
+from session_logger import connection, fetch_rollups, query_sessions, DEFAULT_DB_PATH
+
+# Sólo lo que muestra la pestaña (sin metrics_json)
+HISTORY_COLUMNS = [
+    "start_ts", "end_ts", "mode", "duration_sec",
+    "posture_good_sec", "posture_regular_sec", "posture_bad_sec", "posture_none_sec",
+    "posture_alerts_count", "posture_score_0_100",
+    "light_good_sec", "light_regular_sec", "light_bad_sec", "light_none_sec",
+    "light_alerts_count", "light_score_0_100",
+    "drink_events_count", "hydration_reminders_sent_count", "avg_minutes_between_drinks",
+]
 
 
 def _fmt_dt(ts: float) -> str:
@@ -12,131 +26,118 @@ def _fmt_dt(ts: float) -> str:
         return "—"
 
 
+def _pager(n, cursor, cursors):
+    """Páginas por cursor (end_ts, id): `cursors` es la pila de las páginas abiertas."""
+    col_prev, col_pos, col_next = st.columns([1, 2, 1])
+    if col_prev.button("← Más recientes", disabled=len(cursors) == 1, use_container_width=True):
+        cursors.pop()
+        st.rerun()
+    col_pos.caption(f"Página {len(cursors)} · {n} sesiones")
+    if col_next.button("Más antiguas →", disabled=cursor is None, use_container_width=True):
+        cursors.append(cursor)
+        st.rerun()
+
+
+def _weighted(df, axis):
+    """Puntaje ponderado por tiempo (0–100) de filas de resumen."""
+    weight = df[f"{axis}_score_weight"]
+    return df[f"{axis}_score_wsum"] / weight.where(weight > 0)
+
+
+def _bad_pct(df, axis):
+    """% del tiempo total (incluye 'sin datos') en nivel malo, por fila."""
+    secs = df[[f"{axis}_{k}_sec" for k in ("good", "regular", "bad", "none")]].to_numpy(np.float64)
+    return np.round(100.0 * secs[:, 2] / np.maximum(secs.sum(axis=1), 1e-9), 1)
+
+
+def _db_stamp(db_path):
+    """Último id y mtime de la base y su WAL: cambia con cada sesión nueva o checkpoint."""
+    last_id = connection(db_path).execute("SELECT MAX(id) FROM sessions").fetchone()[0]
+    mtimes = tuple(os.stat(p).st_mtime_ns if os.path.exists(p) else 0 for p in (db_path, db_path + "-wal"))
+    return (last_id,) + mtimes
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _sessions_frame(db_path, after, limit, stamp):
+    """Tabla de una página ya formateada, (tabla, cursor siguiente, filas). `stamp` sólo invalida."""
+    page = query_sessions(HISTORY_COLUMNS, after=after, limit=limit, db_path=db_path)
+    df = page.to_pandas()
+    if not len(df):
+        return df, None, 0
+
+    # Columnas ya tipadas por query_sessions (REAL -> float64 con NaN)
+    out = pd.DataFrame({
+        "Inicio": df["start_ts"].map(_fmt_dt),
+        "Fin": df["end_ts"].map(_fmt_dt),
+        "Modo": df["mode"].replace({"front": "frontal", "side": "lateral"}),
+        "Duración (min)": np.round(df["duration_sec"].to_numpy() / 60.0, 1),
+        "Postura Buena %": np.round(df["posture_score_0_100"].to_numpy(), 1),
+        "Postura mala %": _bad_pct(df, "posture"),
+        "Alertas postura": df["posture_alerts_count"],
+        "Luz Buena %": np.round(df["light_score_0_100"].to_numpy(), 1),
+        "Luz mala %": _bad_pct(df, "light"),
+        "Alertas luz": df["light_alerts_count"],
+        "Bebidas (eventos)": np.nan_to_num(df["drink_events_count"].to_numpy(np.float64)).astype(int),
+        "Recordatorios hidratación": np.nan_to_num(
+            df["hydration_reminders_sent_count"].to_numpy(np.float64)
+        ).astype(int),
+        "Prom. min entre bebidas": np.round(df["avg_minutes_between_drinks"].to_numpy(), 1),
+    })
+    return out.fillna("—"), page.cursor, len(df)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _rollup_frames(db_path, stamp):
+    """Resúmenes por semana y por día (todas las vistas juntas)."""
+    frames = {}
+    for period in ("week", "day"):
+        rollup = pd.DataFrame(fetch_rollups(period, db_path=db_path))
+        frames[period] = rollup.drop(columns=["mode"]).groupby("period").sum()
+    return frames
+
+
 def render_history(db_path: str = DEFAULT_DB_PATH, limit: int = 200):
+    t0 = time.perf_counter()
     st.subheader("📈 Historial (sesiones)")
-    rows = fetch_sessions(limit=limit, db_path=db_path)
-
-    if not rows:
+    cursors = st.session_state.setdefault(f"history_cursors:{db_path}", [None])
+    stamp = _db_stamp(db_path)
+    table, cursor, n = _sessions_frame(db_path, cursors[-1], limit, stamp)
+
+    if not n:
+        if len(cursors) > 1:
+            cursors[:] = [None]  # la base cambió debajo de la página abierta
+            st.rerun()
         st.info("Aún no hay sesiones registradas. Inicia una cámara (frontal o lateral) y úsala unos minutos.")
         return
 
-    # DataFrame base
-    df = pd.DataFrame(rows)
-
-    df["Inicio"] = df["start_ts"].apply(_fmt_dt)
-    df["Fin"] = df["end_ts"].apply(_fmt_dt)
-    df["Duración (min)"] = (df["duration_sec"] / 60.0).round(1)
-
-    # CONVERT ALL NUMERIC COLUMNS FIRST
-    # Posture and light scores
-    df["posture_score_0_100"] = pd.to_numeric(df["posture_score_0_100"], errors='coerce')
-    df["light_score_0_100"] = pd.to_numeric(df["light_score_0_100"], errors='coerce')
-    
-    # Duration columns (these should already be numeric, but just in case)
-    numeric_cols = [
-        "posture_good_sec", "posture_regular_sec", "posture_bad_sec", "posture_none_sec",
-        "light_good_sec", "light_regular_sec", "light_bad_sec", "light_none_sec",
-        "drink_events_count", "hydration_reminders_sent_count", "avg_minutes_between_drinks"
-    ]
-    
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    # Now create the rounded columns
-    df["Postura Buena %"] = df["posture_score_0_100"].round(1)
-    df["Luz Buena %"] = df["light_score_0_100"].round(1)
-
-    # Porcentaje malo
-    def pct(bad, total):
-        try:
-            return 100.0 * float(bad) / max(float(total), 1e-9)
-        except Exception:
-            return 0.0
-
-    df["Postura mala %"] = [
-        pct(b, g + r + b + n)
-        for b, g, r, n in zip(
-            df["posture_bad_sec"],
-            df["posture_good_sec"],
-            df["posture_regular_sec"],
-            df["posture_none_sec"],
-        )
-    ]
-
-    df["Luz mala %"] = [
-        pct(b, g + r + b + n)
-        for b, g, r, n in zip(
-            df["light_bad_sec"],
-            df["light_good_sec"],
-            df["light_regular_sec"],
-            df["light_none_sec"],
-        )
-    ]
-
-    df["Postura mala %"] = df["Postura mala %"].round(1)
-    df["Luz mala %"] = df["Luz mala %"].round(1)
-
-    # Hidratación - CONVERT THESE FIRST
-    df["drink_events_count"] = pd.to_numeric(df["drink_events_count"], errors='coerce')
-    df["hydration_reminders_sent_count"] = pd.to_numeric(df["hydration_reminders_sent_count"], errors='coerce')
-    df["avg_minutes_between_drinks"] = pd.to_numeric(df["avg_minutes_between_drinks"], errors='coerce')
-    
-    df["Bebidas (eventos)"] = df["drink_events_count"].fillna(0).astype(int)
-    df["Recordatorios hidratación"] = df["hydration_reminders_sent_count"].fillna(0).astype(int)
-    df["Prom. min entre bebidas"] = df["avg_minutes_between_drinks"].round(1)
-
- 
-    # KPIs
+    # KPIs (todo el historial, desde los resúmenes por semana)
     st.markdown("### Resumen rápido")
-    total_minutes = float(df["duration_sec"].sum() / 60.0)
+    rollups = _rollup_frames(db_path, stamp)
+    totals = rollups["week"].sum().to_frame().T
+    total_minutes = float(totals["duration_sec"].iloc[0] / 60.0)
 
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Sesiones", str(len(df)))
+    col1.metric("Sesiones", str(int(totals["sessions"].iloc[0])))
     col2.metric("Tiempo monitoreado", f"{total_minutes:.1f} min")
-    col3.metric("Prom. Postura", f"{df['Postura Buena %'].mean():.1f}%")
-    col4.metric("Prom. Luz", f"{df['Luz Buena %'].mean():.1f}%")
+    col3.metric("Prom. Postura", f"{_weighted(totals, 'posture').iloc[0]:.1f}%")
+    col4.metric("Prom. Luz", f"{_weighted(totals, 'light').iloc[0]:.1f}%")
 
 
     # Tendencias
-    st.markdown("### Tendencia (por sesión)")
-    trend = df.sort_values("end_ts")[["Postura Buena %", "Luz Buena %"]]
+    period = st.radio("Tendencia por", ["día", "semana"], horizontal=True, key="history_trend_period")
+    st.markdown(f"### Tendencia (por {period})")
+    by_period = rollups["week" if period == "semana" else "day"]
+    trend = pd.DataFrame({
+        "Postura Buena %": _weighted(by_period, "posture"),
+        "Luz Buena %": _weighted(by_period, "light"),
+    })
     st.line_chart(trend, height=220)
 
 
     # Tabla final
     st.markdown("### Detalle de sesiones")
-
-    show_cols = [
-        "Inicio",
-        "Fin",
-        "mode",
-        "Duración (min)",
-        "Postura Buena %",
-        "Postura mala %",
-        "posture_alerts_count",
-        "Luz Buena %",
-        "Luz mala %",
-        "light_alerts_count",
-        "Bebidas (eventos)",
-        "Recordatorios hidratación",
-        "Prom. min entre bebidas",
-    ]
-
-    df2 = df.copy()
-    df2["mode"] = df2["mode"].replace({"front": "frontal", "side": "lateral"})
-
-    df2 = df2[show_cols].rename(
-        columns={
-            "mode": "Modo",
-            "posture_alerts_count": "Alertas postura",
-            "light_alerts_count": "Alertas luz",
-        }
-    )
-
-    df2 = df2.fillna("—")
-
-    st.dataframe(df2, use_container_width=True, hide_index=True)
+    st.dataframe(table, use_container_width=True, hide_index=True)
+    _pager(n, cursor, cursors)
 
     st.caption("Nota: se guarda un resumen por sesión (no se guarda video ni frames).")
-
+    st.caption(f"Historial dibujado en {1000.0 * (time.perf_counter() - t0):.0f} ms")
@@ -0,0 +1,284 @@
+import os
+import time
+import threading
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:  # opcional: se usa el CPU del propio proceso
+    psutil = None
+
+# =========================
+# Carga de CPU del host
+# =========================
+class HostCPU:
+    """
+    Uso de CPU del host (0–1), muestreado como máximo una vez por `period`
+    y compartido por todos los streams. Sin psutil se estima con el tiempo
+    de CPU del proceso (el servidor de Streamlit) sobre el total de núcleos.
+    """
+
+    def __init__(self, period=1.0):
+        self.period = float(period)
+        self._lock = threading.Lock()
+        self._ncpu = os.cpu_count() or 1
+        self._last_wall = time.monotonic()
+        self._last_cpu = time.process_time()
+        self._value = 0.0
+        if psutil is not None:
+            psutil.cpu_percent(interval=None)  # primera llamada inicializa
+
+    def utilization(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_wall >= self.period:
+                if psutil is not None:
+                    self._value = psutil.cpu_percent(interval=None) / 100.0
+                else:
+                    cpu = time.process_time()
+                    self._value = (cpu - self._last_cpu) / ((now - self._last_wall) * self._ncpu)
+                    self._last_cpu = cpu
+                self._last_wall = now
+            return min(max(self._value, 0.0), 1.0)
+
+
+HOST_CPU = HostCPU()
+
+
+# =========================
+# Planificador adaptativo por stream
+# =========================
+class InferenceScheduler:
+    """
+    Decide qué frames pasan por `POSE.process`.
+
+    Modo adaptativo (AIMD, se ajusta una vez por segundo):
+      - baja la frecuencia ×0.8 si el host supera `cpu_budget` o si la
+        latencia medida no permite sostener la frecuencia actual;
+      - la sube +1 inf/s si hay margen de CPU y no se alcanzó `target_fps`.
+    Modo manual: procesa 1 de cada `every_n` frames (el slider de siempre).
+    Con `media_clock` (archivos leídos sin pausar, más rápido que el video)
+    la frecuencia se mide en tiempo del video, a `target_fps` fijo: el
+    reloj de pared no dice nada de cuánto video pasó.
+    Con `budget` (modo dual) la frecuencia la fija el `InferenceBudget`
+    compartido y este scheduler sólo mide y decide frame a frame.
+    """
+
+    ADAPT_PERIOD = 1.0
+
+    def __init__(self, target_fps=10.0, cpu_budget=0.75, min_fps=1.0, adaptive=True, every_n=1, host_cpu=HOST_CPU):
+        self.host_cpu = host_cpu
+        self.min_fps = float(min_fps)
+        self.name = None
+        self.configure(target_fps=target_fps, cpu_budget=cpu_budget, adaptive=adaptive, every_n=every_n)
+        self.rate = float(target_fps)
+        self.latency_s = None
+        self._lat_alpha = 0.2
+        self._last_infer = 0.0
+        self._last_media = None
+        self._last_adapt = time.monotonic()
+        self._frames = 0
+        self._inferred = 0
+        self._win_start = time.monotonic()
+        self._win_inferred = 0
+        self.measured_fps = 0.0
+
+    def configure(self, *, target_fps, cpu_budget, adaptive, every_n, budget=None, name=None, media_clock=False):
+        # Se llama en cada rerun de Streamlit con los valores de la barra lateral
+        self.target_fps = max(float(target_fps), self.min_fps)
+        self.cpu_budget = float(cpu_budget)
+        self.adaptive = bool(adaptive)
+        self.every_n = max(1, int(every_n))
+        self.budget = budget
+        self.name = name
+        self.media_clock = bool(media_clock)
+
+    def should_process(self, media_ts=None):
+        self._frames += 1
+        if self.media_clock and self.adaptive and media_ts is not None:
+            last = self._last_media
+            if last is None or media_ts < last or media_ts - last >= 0.9 / self.target_fps:
+                self._last_media = media_ts
+                return True
+            return False
+        now = time.monotonic()
+        if now - self._last_adapt >= self.ADAPT_PERIOD:
+            self._adapt(now)
+        if not self.adaptive:
+            return self._frames % self.every_n == 0
+        # pequeño margen para no perder frames por jitter de llegada
+        if (now - self._last_infer) >= 0.9 / self.rate:
+            self._last_infer = now
+            return True
+        return False
+
+    def record(self, latency_s):
+        self._inferred += 1
+        self._win_inferred += 1
+        lat = float(latency_s)
+        self.latency_s = lat if self.latency_s is None else (self._lat_alpha * lat + (1.0 - self._lat_alpha) * self.latency_s)
+
+    def _adapt(self, now):
+        elapsed = now - self._win_start
+        self.measured_fps = self._win_inferred / elapsed if elapsed > 0 else 0.0
+        self._win_start, self._win_inferred = now, 0
+        self._last_adapt = now
+        if not self.adaptive:
+            return
+        if self.budget is not None:
+            self.rate = self.budget.rate_for(self, now)
+            return
+
+        cpu = self.host_cpu.utilization()
+        # Fracción de un núcleo que consume este stream a la frecuencia actual
+        busy = (self.latency_s or 0.0) * self.rate
+        if cpu > self.cpu_budget or busy > 0.9:
+            self.rate *= 0.8
+        elif cpu < self.cpu_budget - 0.1 and self.rate < self.target_fps:
+            self.rate += 1.0
+        self.rate = min(max(self.rate, self.min_fps), self.target_fps)
+
+    def stats(self):
+        return {
+            "adaptive": self.adaptive,
+            "rate_fps": (self.target_fps if self.media_clock else self.rate) if self.adaptive else None,
+            "measured_fps": self.measured_fps,
+            "every_n": self.every_n,
+            "latency_ms": None if self.latency_s is None else 1000.0 * self.latency_s,
+            "host_cpu": self.host_cpu.utilization(),
+            "frames": self._frames,
+            "inferred": self._inferred,
+        }
+
+
+# =========================
+# Presupuesto compartido (modo dual)
+# =========================
+class InferenceBudget:
+    """
+    Un solo presupuesto de inferencias/s para varios streams (frontal y
+    lateral a la vez). El AIMD de `InferenceScheduler` corre aquí sobre el
+    total, una vez por período, y cada stream activo recibe una parte
+    proporcional a su peso: con `weights` (nombre → 0–1, p. ej. la
+    visibilidad de la pose en esa vista) la cámara que mejor ve a la
+    persona infiere más, pero ninguna baja de la mitad de su parte pareja.
+    """
+
+    ADAPT_PERIOD = 1.0
+    ACTIVE_SEC = 3.0  # sin pedir frecuencia en este tiempo = stream detenido
+
+    def __init__(self, target_fps=10.0, cpu_budget=0.75, min_fps=1.0, host_cpu=HOST_CPU, weights=None):
+        self.host_cpu = host_cpu
+        self.min_fps = float(min_fps)
+        self.weights = weights
+        self.configure(target_fps=target_fps, cpu_budget=cpu_budget)
+        self.rate = float(target_fps)
+        self._lock = threading.Lock()
+        self._members = {}  # scheduler -> última consulta
+        self._last_adapt = 0.0
+
+    def configure(self, *, target_fps, cpu_budget):
+        self.target_fps = max(float(target_fps), self.min_fps)
+        self.cpu_budget = float(cpu_budget)
+
+    def rate_for(self, scheduler, now):
+        """Frecuencia (inf/s) que le toca a `scheduler` en este período."""
+        with self._lock:
+            self._members[scheduler] = now
+            active = [s for s, seen in self._members.items() if now - seen <= self.ACTIVE_SEC]
+            if now - self._last_adapt >= self.ADAPT_PERIOD:
+                self._adapt(now, active)
+            w = self._weight(scheduler)
+            total = sum(self._weight(s) for s in active)
+            return max(self.min_fps, self.rate * w / total)
+
+    def _weight(self, scheduler):
+        vis = None if self.weights is None else self.weights(scheduler.name)
+        return 1.0 if vis is None else 0.5 + min(max(vis, 0.0), 1.0)
+
+    def _adapt(self, now, active):
+        self._last_adapt = now
+        cpu = self.host_cpu.utilization()
+        # Cada stream tiene su modelo e hilo: el límite es el más ocupado
+        busy = max(((s.latency_s or 0.0) * s.rate for s in active), default=0.0)
+        if cpu > self.cpu_budget or busy > 0.9:
+            self.rate *= 0.8
+        elif cpu < self.cpu_budget - 0.1 and self.rate < self.target_fps:
+            self.rate += 1.0
+        self.rate = min(max(self.rate, self.min_fps * max(1, len(active))), self.target_fps)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            active = sum(1 for seen in self._members.values() if now - seen <= self.ACTIVE_SEC)
+            return {"rate_fps": self.rate, "target_fps": self.target_fps, "streams": active}
+
+
+# =========================
+# Compuerta por movimiento
+# =========================
+class MotionGate:
+    """
+    Omite la inferencia cuando la escena no cambió respecto al último frame
+    inferido. Compara la miniatura de luminancia 96x54 que `analyze` ya
+    calcula para el brillo: hay movimiento si más de `min_changed_frac` de
+    los píxeles cambió más de `pixel_delta` niveles. Cada `max_interval`
+    segundos se infiere igualmente para no arrastrar un resultado viejo.
+    """
+
+    def __init__(self, pixel_delta=12.0, min_changed_frac=0.005, max_interval=3.0):
+        self.pixel_delta = float(pixel_delta)
+        self.min_changed_frac = float(min_changed_frac)
+        self.max_interval = float(max_interval)
+        self.enabled = True
+        self._ref = None
+        self._ref_ts = 0.0
+        self.last_result = None  # (res, neck_angle, wrist_mouth_dist)
+        self.last_changed_frac = 0.0
+        self.skipped = 0
+        self.inferred = 0
+        self.saved_ms = 0.0
+        self._lat_ms = None
+
+    def needs_inference(self, luma_small, now=None):
+        if not self.enabled or self._ref is None or self.last_result is None:
+            return True
+        now = time.monotonic() if now is None else now
+        if now - self._ref_ts >= self.max_interval:
+            return True
+        if self._ref.shape != luma_small.shape:
+            return True
+        changed = np.count_nonzero(np.abs(luma_small - self._ref) > self.pixel_delta)
+        self.last_changed_frac = float(changed) / luma_small.size
+        return self.last_changed_frac > self.min_changed_frac
+
+    def mark_inferred(self, luma_small, result, infer_ms, now=None):
+        # La miniatura puede ser un buffer reutilizado: copiar sobre la referencia
+        if self._ref is None or self._ref.shape != luma_small.shape:
+            self._ref = luma_small.copy()
+        else:
+            np.copyto(self._ref, luma_small)
+        self._ref_ts = time.monotonic() if now is None else now
+        self.last_result = result
+        self.inferred += 1
+        self._lat_ms = infer_ms if self._lat_ms is None else 0.2 * infer_ms + 0.8 * self._lat_ms
+
+    def mark_skipped(self):
+        self.skipped += 1
+        # CPU ahorrada ≈ latencia media de las inferencias reales
+        self.saved_ms += self._lat_ms or 0.0
+
+    def reset(self):
+        self._ref = None
+        self.last_result = None
+
+    def stats(self):
+        total = self.skipped + self.inferred
+        return {
+            "skipped": self.skipped,
+            "inferred": self.inferred,
+            "skip_ratio": (self.skipped / total) if total else 0.0,
+            "saved_cpu_sec": self.saved_ms / 1000.0,
+            "changed_frac": self.last_changed_frac,
+        }
@@ -0,0 +1,147 @@
+import time
+import threading
+
+
+class _Job:
+    __slots__ = ("payload", "fn", "on_result", "on_done", "t_submit", "deadline")
+
+    def __init__(self, payload, fn, on_result, on_done, t_submit, deadline):
+        self.payload = payload
+        self.fn = fn
+        self.on_result = on_result
+        self.on_done = on_done
+        self.t_submit = t_submit
+        self.deadline = deadline
+
+    def done(self):
+        # Se llama siempre (procesado, tardío, descartado o error): libera el buffer
+        if self.on_done is not None:
+            self.on_done(self.payload)
+
+
+class InferenceWorker:
+    """
+    Hilo de inferencia por stream con buzón de un solo lugar: el último frame
+    enviado reemplaza al pendiente (el anterior cuenta como descartado).
+    El callback de video nunca espera a MediaPipe; usa `latest()` para
+    dibujar el overlay más reciente. Un resultado que termina después de
+    su `deadline` se descarta en lugar de aplicarse; el plazo es `max_age`
+    o el doble de la inferencia medida, lo que sea mayor, así un equipo
+    lento no tira todos sus resultados.
+
+    `on_done(payload)` se invoca cuando el trabajo deja de usar el payload,
+    pase lo que pase con él, para devolver su buffer al pipeline.
+
+    El hilo arranca con el primer `submit` y termina solo tras `idle_timeout`
+    segundos sin trabajo (p. ej. pestaña cerrada sin detener la cámara).
+    """
+
+    def __init__(self, max_age=0.5, idle_timeout=60.0, name="ergovision-infer"):
+        self.max_age = float(max_age)
+        self.idle_timeout = float(idle_timeout)
+        self.name = name
+        self._cond = threading.Condition()
+        self._pending = None
+        self._thread = None
+        self._stop = False
+        self._latest = None
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0  # reemplazados en el buzón antes de procesarse
+        self.late = 0  # terminados (o tomados) después del deadline
+        self.errors = 0
+        self.infer_ms = None
+        self.video_ms = None
+        self.result_age_ms = None
+
+    # ---- lado del callback de video ----
+    def submit(self, payload, fn, on_result=None, now=None, on_done=None):
+        now = time.perf_counter() if now is None else now
+        job = _Job(payload, fn, on_result, on_done, now, now + self.max_wait())
+        with self._cond:
+            replaced = self._pending
+            if replaced is not None:
+                self.dropped += 1
+            self._pending = job
+            self.submitted += 1
+            self._stop = False
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        if replaced is not None:
+            replaced.done()
+
+    def latest(self):
+        return self._latest
+
+    def max_wait(self):
+        """Plazo de un trabajo (s): `max_age`, o 2× la inferencia medida si es mayor."""
+        infer_ms = self.infer_ms
+        return self.max_age if infer_ms is None else max(self.max_age, 2e-3 * infer_ms)
+
+    def record_video_latency(self, seconds):
+        ms = 1000.0 * seconds
+        self.video_ms = ms if self.video_ms is None else 0.1 * ms + 0.9 * self.video_ms
+
+    # ---- hilo de inferencia ----
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._pending is None and not self._stop:
+                    self._cond.wait(timeout=self.idle_timeout)
+                job, self._pending = self._pending, None
+                if job is None:
+                    # detenido o sin trabajo durante idle_timeout
+                    self._thread = None
+                    return
+
+            t0 = time.perf_counter()
+            if t0 > job.deadline:
+                self.late += 1
+                job.done()
+                continue
+            try:
+                result = job.fn(job.payload)
+            except Exception:
+                self.errors += 1
+                continue
+            finally:
+                job.done()
+            t1 = time.perf_counter()
+            ms = 1000.0 * (t1 - t0)
+            self.infer_ms = ms if self.infer_ms is None else 0.2 * ms + 0.8 * self.infer_ms
+            if t1 > job.deadline:
+                self.late += 1
+                continue
+
+            with self._cond:
+                if self._stop:  # `stop` llegó durante la inferencia: no publicar
+                    continue
+                self._latest = result
+            self.completed += 1
+            age = 1000.0 * (t1 - job.t_submit)
+            self.result_age_ms = age if self.result_age_ms is None else 0.2 * age + 0.8 * self.result_age_ms
+            if job.on_result is not None:
+                job.on_result(result)
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            job, self._pending = self._pending, None
+            self._latest = None
+            self._cond.notify()
+        if job is not None:
+            job.done()
+
+    def stats(self):
+        return {
+            "video_ms": self.video_ms,
+            "infer_ms": self.infer_ms,
+            "result_age_ms": self.result_age_ms,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "dropped": self.dropped,
+            "late": self.late,
+            "errors": self.errors,
+        }
@@ -0,0 +1,145 @@
+import math
+
+import numpy as np
+import cv2
+
+# Formatos cuyo plano 0 ya es la luminancia -> rango completo por defecto
+_LUMA_FORMATS = {
+    "yuv420p": False, "yuvj420p": True, "nv12": False, "nv21": False,
+    "yuv422p": False, "yuvj422p": True, "yuv444p": False, "yuvj444p": True,
+    "gray": True,
+}
+_RANGE_MPEG, _RANGE_JPEG = 1, 2  # av.VideoFrame.color_range
+
+
+def _make_lut(full_range):
+    """Nivel Y -> brillo 0–255 (el rango limitado de video es 16–235)."""
+    lut = np.arange(256, dtype=np.float64)
+    if not full_range:
+        lut = np.clip((lut - 16.0) * (255.0 / 219.0), 0.0, 255.0)
+    return lut
+
+
+class LightingEngine:
+    """
+    Métricas de iluminación leídas directamente del plano Y del
+    `av.VideoFrame` (WebRTC entrega YUV: no hace falta convertir color).
+
+    Por frame:
+      - miniatura de luminancia (reducciones ×2 sobre el plano, sin copiarlo),
+        que también usa la compuerta de movimiento;
+      - histograma de la primera reducción -> media, contraste RMS y
+        fracciones recortadas en sombras/luces;
+      - rejilla gruesa (4x4) -> contraluz: el 2x2 central, donde está la
+        persona, mucho más oscuro que las 12 celdas del borde.
+    Contraluz y reflejos se suavizan y usan histéresis para no parpadear.
+    """
+
+    THUMB_W = 80  # 640x360 -> 80x45 con reducciones exactas
+    GRID = (4, 4)  # filas, columnas
+    CLIP_LOW = 5.0
+    CLIP_HIGH = 250.0
+
+    def __init__(self, backlight_on=0.15, glare_on=0.03, alpha=0.2):
+        self.backlight_on = float(backlight_on)
+        self.glare_on = float(glare_on)
+        self.alpha = float(alpha)
+        self._shape = None
+        self._luts = {}
+        self._hist = np.empty((256, 1), np.float32)
+        self._grid = np.empty(self.GRID, np.float32)
+        self.frames = 0
+        self.fallback_frames = 0
+        self.reset()
+
+    def reset(self):
+        self.backlight_s = None
+        self.clip_high_s = None
+        self.backlit = False
+        self.glare = False
+
+    def _ensure(self, W, H):
+        if self._shape == (W, H):
+            return
+        self._shape = (W, H)
+        # Cadena de reducciones ×2 hasta el ancho de la miniatura
+        self._levels = []
+        w, h = W, H
+        while w // 2 >= self.THUMB_W and h // 2 >= 2:
+            w, h = w // 2, h // 2
+            self._levels.append(np.empty((h, w), np.uint8))
+        tw = min(self.THUMB_W, W)
+        th = max(2, int(round(tw * H / W)))
+        self._thumb_u8 = np.empty((th, tw), np.uint8)
+        self._thumb = np.empty((th, tw), np.float32)
+
+    def _lut(self, full_range):
+        if full_range not in self._luts:
+            lut = _make_lut(full_range)
+            self._luts[full_range] = (
+                lut, lut.astype(np.float32).reshape(1, 256), lut * lut,
+                lut <= self.CLIP_LOW, lut >= self.CLIP_HIGH,
+            )
+        return self._luts[full_range]
+
+    def measure(self, frame):
+        """Devuelve (métricas, miniatura float32 0–255) para un av.VideoFrame."""
+        full_range = _LUMA_FORMATS.get(frame.format.name)
+        if full_range is None:
+            # RGB u otros: una conversión (cuenta como camino lento)
+            self.fallback_frames += 1
+            return self.measure_gray(frame.to_ndarray(format="gray"), full_range=True)
+        if frame.color_range == _RANGE_JPEG:
+            full_range = True
+        elif frame.color_range == _RANGE_MPEG:
+            full_range = False
+        plane = frame.planes[0]
+        y = np.frombuffer(plane, np.uint8).reshape(-1, plane.line_size)[: frame.height, : frame.width]
+        return self.measure_gray(y, full_range=full_range)
+
+    def measure_gray(self, y, full_range=True):
+        """Igual que `measure` sobre una imagen de luminancia uint8 (H, W)."""
+        H, W = y.shape[:2]
+        self._ensure(W, H)
+        lut, lut_f32, lut_sq, low_mask, high_mask = self._lut(full_range)
+
+        src = y
+        for dst in self._levels:
+            src = cv2.resize(src, (dst.shape[1], dst.shape[0]), dst=dst, interpolation=cv2.INTER_AREA)
+        hist_src = self._levels[0] if self._levels else y
+        if src.shape != self._thumb_u8.shape:
+            src = cv2.resize(src, (self._thumb_u8.shape[1], self._thumb_u8.shape[0]), dst=self._thumb_u8, interpolation=cv2.INTER_AREA)
+        thumb = cv2.LUT(src, lut_f32, dst=self._thumb)
+
+        hist = cv2.calcHist([hist_src], [0], None, [256], [0, 256], hist=self._hist)[:, 0]
+        n = float(hist.sum()) or 1.0
+        mean = float(hist @ lut) / n
+        var = max(float(hist @ lut_sq) / n - mean * mean, 0.0)
+        clip_low = float(hist[low_mask].sum()) / n
+        clip_high = float(hist[high_mask].sum()) / n
+
+        grid = cv2.resize(thumb, (self.GRID[1], self.GRID[0]), dst=self._grid, interpolation=cv2.INTER_AREA).tolist()
+        center = (grid[1][1] + grid[1][2] + grid[2][1] + grid[2][2]) / 4.0
+        border = (sum(map(sum, grid)) - 4.0 * center) / 12.0
+        backlight = max(border - center, 0.0) / 255.0
+
+        a = self.alpha
+        self.backlight_s = backlight if self.backlight_s is None else a * backlight + (1.0 - a) * self.backlight_s
+        self.clip_high_s = clip_high if self.clip_high_s is None else a * clip_high + (1.0 - a) * self.clip_high_s
+        # Histéresis: se activa en el umbral y se apaga al 70 %
+        on = self.backlit or self.backlight_s >= self.backlight_on
+        self.backlit = on and self.backlight_s >= 0.7 * self.backlight_on
+        on = self.glare or self.clip_high_s >= self.glare_on
+        self.glare = on and self.clip_high_s >= 0.7 * self.glare_on
+        self.frames += 1
+
+        return {
+            "mean": mean,
+            "contrast": math.sqrt(var) / 255.0,
+            "clip_low": clip_low,
+            "clip_high": clip_high,
+            "grid": grid,
+            "backlight": self.backlight_s,
+            "backlit": self.backlit,
+            "glare": self.glare,
+        }, thumb
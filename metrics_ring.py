@@ -0,0 +1,101 @@
+import numpy as np
+
+ROW_DTYPE = np.dtype([
+    ("ts", "f8"),            # reloj de pared
+    ("media_ts", "f8"),      # frame.pts * time_base
+    ("angle_raw", "f4"),
+    ("angle_smooth", "f4"),
+    ("brightness", "f4"),
+    ("wrist_dist", "f4"),
+    ("visibility", "f4"),
+    ("infer_ms", "f4"),
+])
+
+# Nariz, orejas y hombros: los puntos del ángulo del cuello
+_VIS_IDX = np.array([0, 7, 8, 11, 12])
+_BLOCKS = "▁▂▃▄▅▆▇█"
+
+
+def _f(v):
+    return np.nan if v is None else v
+
+
+class MetricsRing:
+    """
+    Historia reciente de un stream en un arreglo estructurado de capacidad
+    fija (ROW_DTYPE, NaN = sin dato).
+
+    Cada fila se escribe dos veces (en `i` y en `i + capacity`), así que
+    cualquier ventana de hasta `capacity` filas es un slice contiguo: las
+    lecturas devuelven vistas sin copia. Un solo escritor (el pipeline del
+    stream) y sin lock: `count` se publica después de escribir la fila.
+    Una vista muy vieja puede verse pisada por escrituras posteriores;
+    quien la guarde debe copiarla.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = int(capacity)
+        self._buf = np.full(2 * self.capacity, np.nan, dtype=ROW_DTYPE)
+        self._row = np.zeros((), dtype=ROW_DTYPE)
+        self.count = 0
+
+    @property
+    def nbytes(self):
+        return self._buf.nbytes
+
+    def reset(self):
+        self.count = 0
+
+    def append(self, data, ts):
+        """Una fila a partir del dict de `analyze` (más `media_ts`)."""
+        r = self._row
+        r["ts"] = ts
+        r["media_ts"] = _f(data.get("media_ts"))
+        r["angle_raw"] = _f(data["neck_angle_raw"])
+        r["angle_smooth"] = _f(data["neck_angle_smooth"])
+        r["brightness"] = _f(data["brightness_smooth"])
+        r["wrist_dist"] = _f(data.get("wrist_mouth_dist"))
+        arr = data.get("landmarks")
+        r["visibility"] = np.nan if arr is None else float(arr[_VIS_IDX, 3].mean())
+        r["infer_ms"] = _f(data.get("infer_ms"))
+        i = self.count % self.capacity
+        self._buf[i] = r
+        self._buf[i + self.capacity] = r
+        self.count += 1
+
+    def last(self, n=None):
+        """Vista de las últimas `n` filas (todas las guardadas si n es None)."""
+        count = self.count
+        size = min(count, self.capacity)
+        n = size if n is None else min(int(n), size)
+        end = (count - 1) % self.capacity + 1 + (self.capacity if count > self.capacity else 0)
+        return self._buf[end - n:end]
+
+    def window(self, seconds, now=None):
+        """Vista de las filas de los últimos `seconds` segundos (reloj de pared)."""
+        rows = self.last()
+        if not len(rows):
+            return rows
+        now = rows["ts"][-1] if now is None else now
+        start = np.searchsorted(rows["ts"], now - seconds, side="left")
+        return rows[start:]
+
+
+def sparkline(values, width=32):
+    """Serie → texto con bloques Unicode (mínimo a máximo de la ventana); huecos sin dato en blanco."""
+    values = np.asarray(values, dtype=np.float32)
+    if values.size == 0:
+        return ""
+    edges = np.linspace(0, values.size, min(width, values.size) + 1).astype(np.intp)
+    ok = ~np.isnan(values)
+    counts = np.add.reduceat(ok, edges[:-1])
+    sums = np.add.reduceat(np.where(ok, values, 0.0), edges[:-1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    valid = counts > 0
+    if not valid.any():
+        return " " * len(means)
+    lo, hi = means[valid].min(), means[valid].max()
+    span = hi - lo if hi > lo else 1.0
+    level = np.clip(((means - lo) / span * (len(_BLOCKS) - 1)).round(), 0, len(_BLOCKS) - 1)
+    return "".join(_BLOCKS[int(l)] if v else " " for l, v in zip(np.nan_to_num(level), valid))
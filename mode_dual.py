@@ -0,0 +1,44 @@
+import time
+import streamlit as st
+from inference_scheduler import InferenceBudget
+from posture_fusion import PostureFusion
+from mode_stream import apply_sitting_reset, build_stream, mount_stream, session_object, shared_presence
+from mode_frontal import VIEW as FRONT_VIEW
+from mode_lateral import VIEW as SIDE_VIEW
+from status_panel import render_status_panels
+
+# Mismos objetos (claves de session_state) que los modos de una cámara
+VIEWS = {v["key"]: v for v in (FRONT_VIEW, SIDE_VIEW)}
+
+
+def render_dual(*, POSE_POOL, cfg):
+    """
+    Frontal y lateral a la vez: un `InferenceBudget` reparte las inferencias
+    entre las dos cámaras (más a la que mejor ve la pose), `PostureFusion`
+    combina sus posturas y cada panel se redibuja en su propio fragmento.
+    """
+    fusion = session_object("posture_fusion", PostureFusion)
+    budget = session_object("infer_budget", lambda: InferenceBudget(weights=lambda name: fusion.visibility(name, time.time())))
+    budget.configure(target_fps=cfg.get("target_infer_fps", 10.0), cpu_budget=cfg.get("cpu_budget", 0.75))
+
+    presence = shared_presence()
+
+    streams = {}
+    video_cols = st.columns(2)
+    for col, k in zip(video_cols, ("front", "side")):
+        s = build_stream(VIEWS[k], POSE_POOL=POSE_POOL, cfg=cfg, presence=presence, budget=budget, fusion=fusion)
+        with col:
+            webrtc_ctx = mount_stream(VIEWS[k], s, cfg=cfg, presence=presence)
+        streams[k] = (webrtc_ctx, s)
+
+    apply_sitting_reset(presence)
+
+    st.subheader("Estado")
+    fusion_box = st.container()
+    panel_cols = st.columns(2)
+    render_status_panels(
+        [(col, ctx, s["monitor"], s["perf"], s["ring"]) for col, (ctx, s) in zip(panel_cols, streams.values())],
+        cfg=cfg,
+        fusion=fusion,
+        fusion_box=fusion_box,
+    )
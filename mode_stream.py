@@ -0,0 +1,196 @@
+import time
+import threading
+from functools import partial
+
+import streamlit as st
+from streamlit_webrtc import webrtc_streamer, WebRtcMode
+
+from common import RTC_CONFIGURATION, EMA, RoiTracker, new_shared_state, reset_shared, make_callback
+from session_logger import store_session
+from pose_pool import PoseLease
+from inference_scheduler import InferenceScheduler, MotionGate
+from inference_worker import InferenceWorker
+from frame_pipeline import FramePipeline
+from lighting import LightingEngine
+from overlay import PoseOverlay
+from status_monitor import StatusMonitor
+from presence import PresenceTracker
+from metrics_ring import MetricsRing
+from status_panel import render_status_panel
+
+
+def session_object(key, factory):
+    """El objeto de `key` en session_state, creado con `factory` la primera vez."""
+    if st.session_state.get(key) is None:
+        st.session_state[key] = factory()
+    return st.session_state[key]
+
+
+def shared_presence():
+    """Tiempo sentado: uno solo para las dos cámaras, con la barra lateral vigente."""
+    presence = session_object("presence_tracker", PresenceTracker)
+    presence.enabled = st.session_state.enable_sitting_tracker
+    presence.absence_sec = float(st.session_state.sitting_absence_sec)
+    presence.threshold_min = float(st.session_state.sitting_time_threshold_min)
+    return presence
+
+
+def build_stream(view, *, POSE_POOL, cfg, presence, budget=None, fusion=None):
+    """
+    Objetos persistentes de un stream (claves `xxx_{front|side}` de
+    session_state), reconfigurados en cada rerun. `view` son las claves de
+    la vista (ver `VIEW` en mode_frontal / mode_lateral); `budget` y `fusion`
+    sólo los pasa el modo dual.
+    """
+    k = view["key"]
+    # Modelo propio para este stream (persiste entre reruns)
+    pose_lease = session_object(f"pose_lease_{k}", lambda: PoseLease(POSE_POOL))
+    scheduler = session_object(f"infer_sched_{k}", InferenceScheduler)
+    scheduler.configure(
+        target_fps=cfg.get("target_infer_fps", 10.0),
+        cpu_budget=cfg.get("cpu_budget", 0.75),
+        adaptive=cfg.get("adaptive_inference", False),
+        every_n=cfg["process_every_n"],
+        budget=budget,
+        name=k,
+    )
+    motion_gate = session_object(f"motion_gate_{k}", MotionGate)
+    motion_gate.enabled = cfg.get("motion_gate", False)
+    roi_tracker = session_object(f"roi_tracker_{k}", RoiTracker)
+    roi_tracker.enabled = cfg.get("roi_tracking", False)
+    worker_all = session_object(f"infer_worker_{k}", lambda: InferenceWorker(name=f"ergovision-infer-{k}"))
+    # Los frames del anillo pueden seguir en vuelo: el pipeline vive toda la sesión
+    pipeline_all = session_object(f"frame_pipeline_{k}", FramePipeline)
+    lighting = session_object(f"lighting_{k}", LightingEngine)
+    overlay = session_object(f"pose_overlay_{k}", PoseOverlay)
+    overlay.interpolate = cfg.get("overlay_interpolation", False)
+    # Historia reciente para las mini-gráficas del panel (memoria fija)
+    ring = session_object(f"metrics_ring_{k}", MetricsRing)
+
+    # Historial: la sesión en curso se guarda como 'open' cada checkpoint_sec
+    store = None
+    if cfg.get("enable_history", True):
+        store = partial(store_session, mode=k, db_path=cfg.get("history_db_path", "ergovision_sessions.db"))
+    # Temporizadores, alertas e hidratación avanzan con cada resultado del pipeline
+    monitor = session_object(f"status_monitor_{k}", lambda: StatusMonitor(k))
+    enable_hyd, interval, detect = view["hydration"]
+    monitor.configure(cfg, {
+        "enable_hydration": st.session_state[enable_hyd],
+        "hydrate_interval_min": st.session_state[interval],
+        "enable_drink_detection": st.session_state[detect],
+        "enable_sitting_tracker": st.session_state.enable_sitting_tracker,
+        "sitting_time_threshold_min": st.session_state.sitting_time_threshold_min,
+    }, st.session_state.notification_manager, presence, store=store, fusion=fusion)
+
+    return {
+        "pose_lease": pose_lease,
+        "worker_all": worker_all,
+        "monitor": monitor,
+        "ring": ring,
+        "lighting": lighting,
+        "overlay": overlay,
+        "perf": {
+            "scheduler": scheduler,
+            "motion_gate": motion_gate,
+            "roi_tracker": roi_tracker,
+            "worker": worker_all if cfg.get("async_inference", False) else None,
+            "pipeline": pipeline_all if cfg.get("frame_pipeline", False) else None,
+            "overlay": overlay,
+            "pool": POSE_POOL,
+        },
+    }
+
+
+def mount_stream(view, s, *, cfg, presence):
+    """
+    Callback, componente WebRTC y ciclo de vida de un stream armado con
+    `build_stream`: al arrancar reinicia el estado y abre la sesión; al
+    detenerse la cierra y suelta modelo y worker. Devuelve el contexto WebRTC.
+    """
+    k = view["key"]
+    shared_lock = threading.Lock()
+    shared = new_shared_state()
+    neck_ema = EMA(alpha=0.35, initial=None)
+    bright_ema = EMA(alpha=0.25, initial=60.0)
+    perf, monitor = s["perf"], s["monitor"]
+
+    st.subheader(view["title"])
+    cb = make_callback(
+        mode=k,
+        shared=shared,
+        lock=shared_lock,
+        frame_counter={"n": 0},
+        neck_ema_obj=neck_ema,
+        bright_ema_obj=bright_ema,
+        POSE=s["pose_lease"],
+        thr=cfg["thr"],
+        lighting_thresh=cfg["lighting_thresh"],
+        process_every_n=cfg["process_every_n"],
+        debug_overlay=cfg["debug_overlay"],
+        scheduler=perf["scheduler"],
+        motion_gate=perf["motion_gate"],
+        roi_tracker=perf["roi_tracker"],
+        worker=perf["worker"],
+        pipeline=perf["pipeline"],
+        lighting=s["lighting"],
+        overlay=s["overlay"],
+        monitor=monitor,
+        drink_detector=monitor.drinks,
+        ring=s["ring"],
+    )
+    webrtc_ctx = webrtc_streamer(
+        key=f"posture-light-{k}",
+        mode=WebRtcMode.SENDRECV,
+        rtc_configuration=RTC_CONFIGURATION,
+        video_frame_callback=cb,
+        media_stream_constraints={"video": {"width": 640, "height": 360, "frameRate": 15}, "audio": False},
+        async_processing=True,
+    )
+
+    done_key = f"{k}_reset_done"
+    if webrtc_ctx.state.playing and not st.session_state[done_key]:
+        reset_shared(shared, neck_ema, bright_ema)
+        perf["motion_gate"].reset()
+        perf["roi_tracker"].reset()
+        s["lighting"].reset()
+        s["overlay"].reset()
+        s["ring"].reset()
+        # El botón manual de la barra lateral no cuenta para la sesión nueva
+        st.session_state[view["manual_drink"]] = None
+        monitor.reset(time.time(), history=cfg.get("enable_history", True), series=cfg.get("history_series", True))
+        presence.reset_source(k)
+        st.session_state[done_key] = True
+    elif not webrtc_ctx.state.playing and st.session_state[done_key]:
+        # Cierra la fila que los checkpoints dejaron 'open' (o la crea)
+        monitor.finish(time.time())
+        s["worker_all"].stop()
+        s["pose_lease"].release()
+        st.session_state[done_key] = False
+
+    # Eventos de la barra lateral: "Tomé agua"
+    manual_drink = st.session_state.get(view["manual_drink"])
+    if manual_drink is not None:
+        monitor.note_drink(float(manual_drink))
+    return webrtc_ctx
+
+
+def apply_sitting_reset(presence):
+    """Botón "Resetear contador" de la barra lateral."""
+    sitting_reset = st.session_state.get("sitting_start_time")
+    if sitting_reset is not None and sitting_reset != presence.reset_seen:
+        presence.reset_sitting(sitting_reset)
+
+
+def render_single(view, *, POSE_POOL, cfg):
+    """Una cámara: video a la izquierda, panel de estado a la derecha."""
+    presence = shared_presence()
+    s = build_stream(view, POSE_POOL=POSE_POOL, cfg=cfg, presence=presence)
+
+    colV, colS = st.columns([2, 1])
+    with colV:
+        webrtc_ctx = mount_stream(view, s, cfg=cfg, presence=presence)
+    apply_sitting_reset(presence)
+
+    with colS:
+        st.subheader("Estado")
+        render_status_panel(webrtc_ctx, s["monitor"], cfg=cfg, perf=s["perf"], ring=s["ring"])
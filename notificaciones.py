@@ -53,11 +53,12 @@ class NotificationManager:
     def __init__(self, cooldown_seconds=300):
         self.last_notifications = {}
         self.cooldown = cooldown_seconds
+        self.clock = time.time  # headless sin pausar: reloj del video
     
     def can_notify(self, notification_type):
         """Verifica si ha pasado el tiempo de cooldown para este tipo de notificación"""
         last_time = self.last_notifications.get(notification_type, 0)
-        return time.time() - last_time > self.cooldown
+        return self.clock() - last_time > self.cooldown
     
     def send(self, notification_type, title, message, sound_type='default', play_sound=True):
         """Envía una notificación de escritorio con sonido opcional"""
@@ -80,7 +81,7 @@ class NotificationManager:
                     ).start()
                 
                 # Actualizar tiempo de la última notificación
-                self.last_notifications[notification_type] = time.time()
+                self.last_notifications[notification_type] = self.clock()
                 return True
                 
             except Exception as e:
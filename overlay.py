@@ -0,0 +1,87 @@
+import time
+
+import numpy as np
+import cv2
+import mediapipe as mp
+
+# Segmentos del esqueleto como dos vectores de índices (35 conexiones)
+_CONN = np.array(sorted(mp.solutions.pose.POSE_CONNECTIONS), dtype=np.intp)
+_CONN_A, _CONN_B = _CONN[:, 0], _CONN[:, 1]
+_VIS_MIN = 0.5  # mismo umbral que mp_drawing
+
+
+class PoseOverlay:
+    """
+    Dibuja el esqueleto en todos los frames, no sólo en los inferidos:
+    guarda los dos últimos conjuntos de landmarks y pinta las 35 conexiones
+    con un único `cv2.polylines` (y las articulaciones con otro).
+
+    Con `interpolate` el esqueleto se desplaza del penúltimo al último
+    resultado a lo largo de un intervalo de inferencia: movimiento suave a
+    cambio de ese retraso. `draw_ms` mide el costo por frame.
+    """
+
+    def __init__(self, interpolate=False, thickness=2, max_age=1.5):
+        self.interpolate = bool(interpolate)
+        self.thickness = int(thickness)
+        self.max_age = float(max_age)
+        # (prev, t_prev, cur, t_cur): se reemplaza entero, nunca se muta
+        self._state = (None, 0.0, None, 0.0)
+        self._seen = 0.0  # último frame en que `cur` seguía vigente
+        self._pts = np.empty((len(_CONN), 2, 2), np.int32)
+        self._scale = np.empty(2, np.float32)
+        self.draw_ms = None
+        self.frames = 0
+
+    def reset(self):
+        self._state = (None, 0.0, None, 0.0)
+        self._seen = 0.0
+
+    def update(self, arr, ts):
+        """Nuevo resultado de inferencia: landmarks (33, 4) en coordenadas del frame, o None."""
+        _, _, cur, t_cur = self._state
+        self._state = (cur, t_cur, arr, float(ts))
+        self._seen = float(ts)
+
+    def keep(self, ts):
+        """Frame omitido por la compuerta de movimiento: el último resultado sigue vigente."""
+        self._seen = max(self._seen, float(ts))
+
+    def _points(self, now):
+        prev, t_prev, cur, t_cur = self._state
+        if cur is None or now - max(t_cur, self._seen) > self.max_age:
+            return None
+        if not self.interpolate or prev is None or t_cur <= t_prev:
+            return cur
+        a = min(max((now - t_cur) / (t_cur - t_prev), 0.0), 1.0)
+        return prev + a * (cur - prev)
+
+    def draw(self, img, now=None, rgb=False):
+        """Pinta en sitio sobre `img` (BGR o, con `rgb=True`, RGB)."""
+        t0 = time.perf_counter()
+        pts = self._points(t0 if now is None else now)
+        if pts is None:
+            return img
+        H, W = img.shape[:2]
+        self._scale[0], self._scale[1] = W, H
+        xy = pts[:, :2] * self._scale
+        visible = pts[:, 3] >= _VIS_MIN
+
+        seg = self._pts
+        np.copyto(seg[:, 0], xy[_CONN_A], casting="unsafe")
+        np.copyto(seg[:, 1], xy[_CONN_B], casting="unsafe")
+        on = visible[_CONN_A] & visible[_CONN_B]
+        if on.any():
+            cv2.polylines(img, seg[on], False, (0, 255, 0), self.thickness)
+        # Articulaciones: segmentos de longitud cero con trazo grueso = puntos
+        joints = xy[visible].astype(np.int32)[:, None, :].repeat(2, axis=1)
+        if len(joints):
+            cv2.polylines(img, joints, False, (255, 0, 0) if rgb else (0, 0, 255), 2 * self.thickness)
+
+        ms = 1000.0 * (time.perf_counter() - t0)
+        self.draw_ms = ms if self.draw_ms is None else 0.1 * ms + 0.9 * self.draw_ms
+        self.frames += 1
+        return img
+
+    def stats(self):
+        return {"draw_ms": self.draw_ms, "frames": self.frames, "interpolate": self.interpolate}
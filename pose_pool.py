@@ -0,0 +1,168 @@
+import os
+import time
+import threading
+
+from common import build_pose_model
+
+# =========================
+# Pool de modelos MediaPipe Pose
+# =========================
+def default_pool_size():
+    """Un modelo por cada 2 núcleos (MediaPipe ya usa varios hilos por grafo)."""
+    cpus = os.cpu_count() or 2
+    return max(1, min(8, cpus // 2))
+
+
+class _PoseSlot:
+    def __init__(self, idx):
+        self.idx = idx
+        self.model = None
+        self.lock = threading.Lock()
+        self.owner = None
+        self.last_used = 0.0
+
+
+class PosePool:
+    """
+    Pool acotado de instancias `mp_pose.Pose`.
+
+    Cada stream WebRTC toma un modelo propio (así el tracking de MediaPipe no se
+    mezcla entre usuarios). Los modelos se crean bajo demanda hasta `size`.
+    Si el pool está lleno se espera hasta `acquire_timeout`; los slots sin uso
+    durante `idle_timeout` segundos (p. ej. pestaña cerrada sin detener) se
+    reasignan. Un slot que cambia de dueño recibe un `Pose` nuevo: el
+    tracking del stream anterior no pasa al siguiente. Si aun así no hay
+    slot libre, el stream comparte el slot menos reciente y su lock
+    serializa las llamadas.
+    """
+
+    def __init__(self, size=None, acquire_timeout=2.0, idle_timeout=30.0, model_factory=build_pose_model):
+        self.size = int(size or default_pool_size())
+        self.acquire_timeout = float(acquire_timeout)
+        self.idle_timeout = float(idle_timeout)
+        self._factory = model_factory
+        self._slots = [_PoseSlot(i) for i in range(self.size)]
+        self._cond = threading.Condition()
+        self._waiting = 0
+        self._wait_count = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _free_slot(self, now):
+        free = [s for s in self._slots if s.owner is None]
+        if free:
+            return free[0]
+        stale = [s for s in self._slots if now - s.last_used >= self.idle_timeout]
+        if stale:
+            return min(stale, key=lambda s: s.last_used)
+        return None
+
+    def acquire(self, owner):
+        t0 = time.perf_counter()
+        deadline = time.time() + self.acquire_timeout
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    now = time.time()
+                    slot = self._free_slot(now)
+                    if slot is not None or now >= deadline:
+                        break
+                    self._cond.wait(timeout=min(0.25, deadline - now))
+                shared = slot is None
+                if shared:
+                    # Pool saturado: compartir el slot usado hace más tiempo
+                    slot = min(self._slots, key=lambda s: s.last_used)
+                else:
+                    slot.owner = owner
+                slot.last_used = now
+            finally:
+                self._waiting -= 1
+                waited = time.perf_counter() - t0
+                self._wait_count += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+
+        with slot.lock:
+            if not shared and slot.model is not None and slot.owner is owner:
+                # Dueño nuevo: descartar el tracking del anterior
+                old, slot.model = slot.model, None
+                close = getattr(old, "close", None)
+                if close is not None:
+                    close()
+            if slot.model is None:
+                slot.model = self._factory()
+        return slot, shared
+
+    def has_free(self):
+        with self._cond:
+            return any(s.owner is None for s in self._slots)
+
+    def release(self, slot, owner):
+        with self._cond:
+            if slot.owner is owner:
+                slot.owner = None
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            in_use = sum(1 for s in self._slots if s.owner is not None)
+            created = sum(1 for s in self._slots if s.model is not None)
+            avg = (self._wait_total / self._wait_count) if self._wait_count else 0.0
+            return {
+                "size": self.size,
+                "created": created,
+                "in_use": in_use,
+                "waiting": self._waiting,
+                "avg_wait_ms": 1000.0 * avg,
+                "max_wait_ms": 1000.0 * self._wait_max,
+            }
+
+
+class PoseLease:
+    """
+    Modelo reservado para un stream. Expone `process()` como `mp_pose.Pose`,
+    así que se puede pasar como `POSE` a `analyze`/`make_callback`.
+    El slot se toma en el primer frame (hilo del video, no del script) y se
+    devuelve con `release()` al detener la cámara.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._slot = None
+        self._shared = False
+        self._lock = threading.Lock()
+
+    def process(self, rgb):
+        while True:
+            with self._lock:
+                slot = self._slot
+                if slot is None:
+                    need = True
+                elif self._shared:
+                    # Compartiendo: pasar a un slot propio en cuanto se libere uno
+                    need = self.pool.has_free()
+                else:
+                    # El slot pudo ser reasignado por inactividad
+                    need = slot.owner is not self
+                if need:
+                    slot, self._shared = self.pool.acquire(self)
+                    self._slot = slot
+                shared = self._shared
+            with slot.lock:
+                if not shared and slot.owner is not self:
+                    continue  # reasignado mientras se esperaba el lock: no tocar su tracking
+                slot.last_used = time.time()
+                return slot.model.process(rgb)
+
+    def release(self):
+        with self._lock:
+            if self._slot is not None:
+                self.pool.release(self._slot, self)
+                self._slot = None
+                self._shared = False
+
+    @property
+    def slot_index(self):
+        slot = self._slot
+        return slot.idx if slot is not None else None
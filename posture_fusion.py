@@ -0,0 +1,75 @@
+import threading
+
+import numpy as np
+
+FRESH_SEC = 2.0  # una vista sin resultado más reciente no vota
+
+# Visibilidad de los puntos del ángulo del cuello en cada vista
+_FRONT_IDX = np.array([0, 7, 8, 11, 12])
+_SIDE_PAIRS = (np.array([7, 11]), np.array([8, 12]))  # de perfil sólo se ve un lado
+
+
+def view_visibility(landmarks, mode):
+    """Visibilidad media (0–1) de oreja/hombro (y nariz de frente) en esa vista."""
+    if landmarks is None:
+        return 0.0
+    vis = landmarks[:, 3]
+    if mode == "side":
+        return float(max(vis[idx].mean() for idx in _SIDE_PAIRS))
+    return float(vis[_FRONT_IDX].mean())
+
+
+def angle_score(angle, good, fair):
+    """0–100 continuo: 100 desde `good`, 60 en `fair` y 0 un tramo (good - fair) por debajo."""
+    span = max(good - fair, 1.0)
+    if angle >= good:
+        return 100.0
+    if angle >= fair:
+        return 60.0 + 40.0 * (angle - fair) / span
+    return max(0.0, 60.0 * (1.0 - (fair - angle) / span))
+
+
+class PostureFusion:
+    """
+    Puntaje de postura único a partir de las dos cámaras. Cada vista aporta
+    su último ángulo convertido a 0–100 con sus propios umbrales, ponderado
+    por la visibilidad de sus puntos: la cámara que ve mal a la persona
+    (perfil tapado, fuera de cuadro) pesa poco o nada.
+    """
+
+    def __init__(self, fresh_sec=FRESH_SEC):
+        self.fresh_sec = float(fresh_sec)
+        self._lock = threading.Lock()
+        self._views = {}  # modo -> (puntaje, visibilidad, ts)
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    def feed(self, mode, angle, landmarks, thr, ts):
+        if angle is None:
+            score, vis = None, 0.0
+        else:
+            score = angle_score(angle, thr[mode]["good"], thr[mode]["fair"])
+            vis = view_visibility(landmarks, mode)
+        with self._lock:
+            self._views[mode] = (score, vis, ts)
+
+    def visibility(self, mode, now=None):
+        """Visibilidad reciente de la vista, o None si no hay resultado fresco."""
+        with self._lock:
+            view = self._views.get(mode)
+        if view is None or (now is not None and now - view[2] > self.fresh_sec):
+            return None
+        return view[1]
+
+    def fused(self, now):
+        """{"score", "level", "weights"} con las vistas frescas, o None sin ninguna."""
+        with self._lock:
+            views = {m: v for m, v in self._views.items() if v[0] is not None and now - v[2] <= self.fresh_sec}
+        total = sum(v[1] for v in views.values())
+        if total <= 0.0:
+            return None
+        score = sum(v[0] * v[1] for v in views.values()) / total
+        level = "good" if score >= 85.0 else "regular" if score >= 50.0 else "bad"
+        return {"score": score, "level": level, "weights": {m: v[1] / total for m, v in views.items()}}
@@ -0,0 +1,114 @@
+import threading
+
+from session_accumulator import MAX_GAP_SEC
+
+ABSENCE_SEC = 10.0  # sin pose durante este tiempo = se levantó
+MAX_INTERVALS = 500
+
+
+class PresenceTracker:
+    """
+    Tiempo sentado a partir de las detecciones de pose de cada frame
+    inferido, compartido por las dos cámaras.
+
+    Cada observación cubre el tiempo de video desde la anterior de la misma
+    cámara (pts), ubicado en el reloj de pared; sólo se descuenta la parte
+    que ya cubrió la *otra* cámara (con una sola se suma el dt de video
+    completo, sin el jitter del reloj de pared). Una ausencia sólo cuenta como "se levantó"
+    tras `absence_sec` seguidos sin pose; si vuelve antes, ese hueco se
+    suma al tramo sentado. Los tramos cerrados quedan en `intervals` como
+    (inicio, fin, "sit" | "stand").
+    """
+
+    def __init__(self, absence_sec=ABSENCE_SEC, threshold_min=30):
+        self.absence_sec = float(absence_sec)
+        self.threshold_min = float(threshold_min)
+        self.enabled = True
+        self._lock = threading.Lock()
+        self.reset_seen = None
+        self.reset()
+
+    def reset(self, now=None):
+        with self._lock:
+            self._clocks = {}
+            self._covered = {}  # cámara -> fin del tiempo que ya contó (pared)
+            self.sitting = False
+            self.sit_start = None
+            self.sitting_sec = 0.0
+            self._pending_sec = 0.0  # ausencia aún no confirmada
+            self.last_present = None
+            self.alert_sent = False
+            self.intervals = []
+            self._state_since = now
+
+    def reset_sitting(self, ts):
+        """Botón "Resetear contador": el tramo actual vuelve a cero."""
+        with self._lock:
+            self.reset_seen = ts
+            self.sitting_sec = 0.0
+            self._pending_sec = 0.0
+            self.alert_sent = False
+
+    def reset_source(self, source):
+        """Nuevo stream de una cámara: su reloj de video empieza de cero."""
+        with self._lock:
+            self._clocks.pop(source, None)
+            self._covered.pop(source, None)
+
+    def feed(self, source, present, media_ts, ts):
+        """
+        Una observación de `source` ("front"/"side"). Devuelve True una sola
+        vez, cuando el tramo sentado alcanza `threshold_min` (alerta pendiente).
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            last = self._clocks.get(source)
+            self._clocks[source] = media_ts
+            dt = 0.0 if last is None else media_ts - last
+            if dt < 0.0 or dt > MAX_GAP_SEC:
+                dt = 0.0
+            # Parte nueva de [ts - dt, ts]: la otra cámara pudo cubrirla ya
+            overlap = max((min(dt, end - (ts - dt)) for src, end in self._covered.items() if src != source),
+                          default=0.0)
+            new = dt - max(0.0, overlap)
+            self._covered[source] = max(self._covered.get(source, ts), ts)
+
+            if present:
+                if not self.sitting:
+                    self._close(ts, "stand")
+                    self.sitting, self.sit_start = True, ts
+                    self.sitting_sec, self._pending_sec = 0.0, 0.0
+                    self.alert_sent = False
+                else:
+                    self.sitting_sec += self._pending_sec + new
+                    self._pending_sec = 0.0
+                self.last_present = ts
+            elif self.sitting:
+                self._pending_sec += new
+                if ts - self.last_present >= self.absence_sec:
+                    self._close(self.last_present, "sit")
+                    self.sitting = False
+                    self.sitting_sec, self._pending_sec = 0.0, 0.0
+                    self.alert_sent = False
+
+            if self.sitting and not self.alert_sent and self.sitting_sec / 60.0 >= self.threshold_min:
+                self.alert_sent = True
+                return True
+            return False
+
+    def _close(self, end, kind):
+        start = self.sit_start if kind == "sit" else self._state_since
+        if start is not None and end > start:
+            self.intervals.append((start, end, kind))
+            del self.intervals[:-MAX_INTERVALS]
+        self._state_since = end
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "is_sitting": self.sitting,
+                "sitting_min": self.sitting_sec / 60.0,
+                "alert_sent": self.alert_sent,
+                "intervals": len(self.intervals),
+            }
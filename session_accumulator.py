@@ -0,0 +1,248 @@
+import numpy as np
+
+MAX_GAP_SEC = 5.0  # hueco mayor en el reloj del video = stream pausado o pts reiniciado
+
+LEVELS = ("good", "regular", "bad", "none")
+
+
+def level_score(good, regular, bad):
+    """Puntaje 0-100 de un eje (postura o luz); `regular` cuenta 0.6. None sin datos."""
+    total = good + regular + bad
+    if total <= 0:
+        return None
+    return 100.0 * (good + 0.6 * regular) / total
+
+
+class SessionAccumulator:
+    """
+    Contabilidad de una sesión (vivo o archivo): tiempos por nivel, rachas
+    malas, alertas, tomas de agua y recordatorios.
+
+    El tiempo sale del reloj del video (`frame.pts * time_base`), no de los
+    ticks de la UI: cada resultado suma exactamente el tiempo de video
+    transcurrido desde el anterior, sin importar cada cuánto se refresque el
+    panel ni cuántos frames se omitan entre inferencias.
+    """
+
+    __slots__ = (
+        "start_ts", "end_ts", "duration_sec",
+        "posture_good_sec", "posture_regular_sec", "posture_bad_sec", "posture_none_sec",
+        "posture_alerts_count", "posture_bad_streak_cur_sec", "posture_bad_streak_max_sec",
+        "light_good_sec", "light_regular_sec", "light_bad_sec", "light_none_sec",
+        "light_alerts_count", "light_bad_streak_cur_sec", "light_bad_streak_max_sec",
+        "light_backlit_sec", "light_glare_sec",
+        "drink_events_ts", "hydration_reminders_sent_count",
+        "clock_gaps", "max_gap", "series", "_clock",
+    )
+
+    SUM_FIELDS = (
+        "duration_sec",
+        "posture_good_sec", "posture_regular_sec", "posture_bad_sec", "posture_none_sec", "posture_alerts_count",
+        "light_good_sec", "light_regular_sec", "light_bad_sec", "light_none_sec", "light_alerts_count",
+        "light_backlit_sec", "light_glare_sec",
+        "hydration_reminders_sent_count",
+    )
+    MAX_FIELDS = ("posture_bad_streak_max_sec", "light_bad_streak_max_sec")
+
+    def __init__(self, start_ts, max_gap=MAX_GAP_SEC):
+        for name in self.SUM_FIELDS + self.MAX_FIELDS:
+            setattr(self, name, 0 if name.endswith("_count") else 0.0)
+        self.start_ts = float(start_ts)
+        self.end_ts = float(start_ts)
+        self.posture_bad_streak_cur_sec = 0.0
+        self.light_bad_streak_cur_sec = 0.0
+        self.drink_events_ts = []
+        self.clock_gaps = 0
+        self.max_gap = float(max_gap)
+        self.series = None  # SeriesRecorder opcional (no viaja en to_dict)
+        self._clock = None
+
+    # ---- reloj del video ----
+    def advance(self, media_ts):
+        """Segundos de video desde el resultado anterior (0 en el primero o tras un hueco)."""
+        last, self._clock = self._clock, float(media_ts)
+        if last is None:
+            return 0.0
+        dt = self._clock - last
+        if dt < 0.0 or dt > self.max_gap:
+            self.clock_gaps += 1
+            return 0.0
+        return dt
+
+    # ---- acumulación ----
+    def add(self, dt, p_level, l_level, lm=None):
+        self.duration_sec += dt
+        self._level("posture", p_level, dt)
+        self._level("light", l_level, dt)
+        if lm is not None and lm["backlit"]:
+            self.light_backlit_sec += dt
+        if lm is not None and lm["glare"]:
+            self.light_glare_sec += dt
+
+    def _level(self, prefix, level, dt):
+        level = level if level in LEVELS else "none"
+        cur = f"{prefix}_bad_streak_cur_sec"
+        streak = getattr(self, cur)
+        if level == "good":
+            streak = max(0.0, streak - dt * 0.5)
+        elif level == "regular":
+            streak = max(0.0, streak - dt * 0.3)
+        elif level == "bad":
+            streak += dt
+            if streak > getattr(self, f"{prefix}_bad_streak_max_sec"):
+                setattr(self, f"{prefix}_bad_streak_max_sec", streak)
+        setattr(self, cur, streak)
+        name = f"{prefix}_{level}_sec"
+        setattr(self, name, getattr(self, name) + dt)
+
+    def count_alert(self, kind):
+        """`kind`: "posture" o "light"."""
+        name = f"{kind}_alerts_count"
+        setattr(self, name, getattr(self, name) + 1)
+
+    def add_drink(self, ts):
+        if ts >= self.start_ts - 1.0:
+            self.drink_events_ts.append(float(ts))
+
+    def count_reminder(self):
+        self.hydration_reminders_sent_count += 1
+
+    # ---- resultados ----
+    def scores(self):
+        return (
+            level_score(self.posture_good_sec, self.posture_regular_sec, self.posture_bad_sec),
+            level_score(self.light_good_sec, self.light_regular_sec, self.light_bad_sec),
+        )
+
+    def to_dict(self):
+        """Forma serializable (estado de `batch_analyze`, `build_session_row`)."""
+        d = {name: getattr(self, name) for name in self.__slots__ if not name.startswith("_") and name != "series"}
+        d["drink_events_ts"] = list(self.drink_events_ts)
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        acc = cls(d["start_ts"])
+        for name in cls.__slots__:
+            if not name.startswith("_") and name != "series" and name in d:  # estados previos sin las claves nuevas
+                setattr(acc, name, d[name])
+        acc.drink_events_ts = list(d.get("drink_events_ts", []))
+        return acc
+
+    @classmethod
+    def merge(cls, parts):
+        """Une segmentos consecutivos (en cualquier orden) en un único acumulador."""
+        parts = sorted(parts, key=lambda p: p.start_ts)
+        out = cls.from_dict(parts[0].to_dict())
+        for p in parts[1:]:
+            for name in cls.SUM_FIELDS:
+                setattr(out, name, getattr(out, name) + getattr(p, name))
+            for name in cls.MAX_FIELDS:
+                setattr(out, name, max(getattr(out, name), getattr(p, name)))
+            out.drink_events_ts.extend(p.drink_events_ts)
+            out.clock_gaps += p.clock_gaps
+            out.end_ts = p.end_ts
+        out.posture_bad_streak_cur_sec = parts[-1].posture_bad_streak_cur_sec
+        out.light_bad_streak_cur_sec = parts[-1].light_bad_streak_cur_sec
+        return out
+
+
+class AlertTracker:
+    """
+    Alerta de un eje (postura o luz), la misma en vivo y en archivos: el
+    tiempo malo se acumula y el bueno lo descuenta; dispara al llegar a
+    `need_sec` fuera del enfriamiento y se apaga tras `clear_sec` buenos.
+    """
+
+    __slots__ = ("bad", "good", "cool_until", "active")
+
+    def __init__(self):
+        self.bad = 0.0
+        self.good = 0.0
+        self.cool_until = 0.0
+        self.active = False
+
+    def feed(self, level, dt, now, need_sec, clear_sec, cooldown_sec):
+        """Avanza `dt` segundos con `level`; True si la alerta se dispara ahora."""
+        if level == "bad":
+            self.bad += dt
+            self.good = max(0.0, self.good - dt * 0.5)
+        elif level == "good":
+            self.good += dt
+            self.bad = max(0.0, self.bad - dt * 0.5)
+        else:
+            self.bad = max(0.0, self.bad - dt * 0.3)
+            self.good = max(0.0, self.good - dt * 0.3)
+
+        fired = False
+        if self.bad >= need_sec and now >= self.cool_until and not self.active:
+            self.active = fired = True
+            self.bad = 0.0
+            self.cool_until = now + cooldown_sec
+        if self.active and level == "good" and self.good >= clear_sec:
+            self.active = False
+        return fired
+
+
+SERIES_RATE_HZ = 0.5  # una muestra cada 2 s de tiempo monitoreado
+
+
+class SeriesRecorder:
+    """
+    Serie de la sesión a ritmo fijo (`rate_hz`) para guardarla junto al
+    resumen: ángulo del cuello, brillo y presencia promediados por intervalo.
+    El eje es el tiempo monitoreado (reloj del video) desde el inicio, así
+    que los huecos del stream no dejan muestras vacías.
+    """
+
+    __slots__ = ("rate_hz", "angle", "brightness", "presence", "n", "_bin", "_sum", "_cnt")
+
+    def __init__(self, rate_hz=SERIES_RATE_HZ, capacity=1024):
+        self.rate_hz = float(rate_hz)
+        self.angle = np.full(capacity, np.nan, np.float32)
+        self.brightness = np.full(capacity, np.nan, np.float32)
+        self.presence = np.zeros(capacity, np.float32)
+        self.n = 0
+        self._bin = 0
+        self._sum = np.zeros(3)  # ángulo, brillo, presencia
+        self._cnt = np.zeros(3)
+
+    def add(self, elapsed, angle, brightness, present):
+        """Una observación en `elapsed` segundos monitoreados."""
+        b = int(elapsed * self.rate_hz)
+        while b > self._bin:
+            self._flush()
+        if angle is not None:
+            self._sum[0] += angle
+            self._cnt[0] += 1
+        if brightness is not None:
+            self._sum[1] += brightness
+            self._cnt[1] += 1
+        self._sum[2] += 1.0 if present else 0.0
+        self._cnt[2] += 1
+
+    def _flush(self):
+        if self.n == len(self.angle):
+            for name in ("angle", "brightness", "presence"):
+                old = getattr(self, name)
+                new = np.full(2 * len(old), np.nan if name != "presence" else 0.0, np.float32)
+                new[:len(old)] = old
+                setattr(self, name, new)
+        with np.errstate(invalid="ignore"):
+            mean = self._sum / self._cnt
+        self.angle[self.n], self.brightness[self.n] = mean[0], mean[1]
+        self.presence[self.n] = 0.0 if self._cnt[2] == 0 else mean[2]
+        self.n += 1
+        self._bin += 1
+        self._sum[:] = 0.0
+        self._cnt[:] = 0.0
+
+    def arrays(self):
+        """(ángulo, brillo, presencia 0-1) hasta el último intervalo, incluido el abierto."""
+        n = self.n + (1 if self._cnt[2] else 0)
+        if n > self.n:
+            with np.errstate(invalid="ignore"):
+                mean = self._sum / self._cnt
+            tail = (np.float32(mean[0]), np.float32(mean[1]), np.float32(mean[2]))
+            return tuple(np.append(a[:self.n], t) for a, t in zip((self.angle, self.brightness, self.presence), tail))
+        return self.angle[:n].copy(), self.brightness[:n].copy(), self.presence[:n].copy()
@@ -1,10 +1,21 @@
+import datetime as _dt
 import json
+import os
 import sqlite3
+import threading
+import time
+import zlib
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from session_accumulator import SessionAccumulator, level_score
 
 DEFAULT_DB_PATH = "ergovision_sessions.db"
+APP_VERSION = "1.1.0"  # stored with each session (column app_version)
 
+# Schema version 1 (the original table). Later changes are MIGRATIONS.
 SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS sessions (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -37,78 +48,746 @@ CREATE TABLE IF NOT EXISTS sessions (
 );
 """
 
-def ensure_db(db_path: str = DEFAULT_DB_PATH) -> str:
-    """Ensure the sqlite DB and schema exist. Returns resolved db path."""
-    p = Path(db_path)
-    if p.parent and str(p.parent) not in ("", "."):
-        p.parent.mkdir(parents=True, exist_ok=True)
+# Optional per-session series (see encode_series)
+SERIES_SQL = """
+CREATE TABLE IF NOT EXISTS session_series (
+  session_id INTEGER PRIMARY KEY REFERENCES sessions(id) ON DELETE CASCADE,
+  codec INTEGER NOT NULL,
+  rate_hz REAL NOT NULL,
+  n INTEGER NOT NULL,
+  data BLOB NOT NULL
+);
+"""
+
+VERSION_SQL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+  version INTEGER PRIMARY KEY,
+  name TEXT NOT NULL,
+  applied_ts REAL NOT NULL
+);
+"""
+
+# Daily / ISO-week totals per mode, kept in step with `sessions` by
+# save_session (same transaction). A session counts in the local day and
+# week of its start. Scores are time-weighted: avg = wsum / weight, with
+# weight = good + regular + bad seconds.
+ROLLUP_SUMS = (
+    "duration_sec",
+    "posture_good_sec", "posture_regular_sec", "posture_bad_sec", "posture_none_sec", "posture_alerts_count",
+    "light_good_sec", "light_regular_sec", "light_bad_sec", "light_none_sec", "light_alerts_count",
+    "drink_events_count", "hydration_reminders_sent_count",
+)
+ROLLUP_COLS = ("sessions",) + ROLLUP_SUMS + (
+    "posture_score_wsum", "posture_score_weight", "light_score_wsum", "light_score_weight",
+)
+ROLLUP_TABLES = {"day": "rollup_daily", "week": "rollup_weekly"}
+
+def _rollup_type(col: str) -> str:
+    return "INTEGER" if col == "sessions" or col.endswith("_count") else "REAL"
+
+def _rollup_sql(table: str) -> str:
+    cols = ",\n".join(f"  {c} {_rollup_type(c)} NOT NULL DEFAULT 0" for c in ROLLUP_COLS)
+    return (f"CREATE TABLE IF NOT EXISTS {table} (\n  period TEXT NOT NULL,\n  mode TEXT NOT NULL,\n"
+            f"{cols},\n  PRIMARY KEY (period, mode)\n) WITHOUT ROWID")
+
+# Live sessions are checkpointed as 'open' every few seconds (see
+# save_session); an open row not touched for ORPHAN_AFTER_SEC belongs to a
+# process that died and is closed at its last checkpoint. ensure_db looks
+# for them on first use and then every RECOVER_EVERY_SEC.
+ORPHAN_AFTER_SEC = 300.0
+RECOVER_EVERY_SEC = 60.0
+
+SERIES_CODEC = 1
+_NA = np.int16(-32768)
+_SCALE = {"angle": 10.0, "brightness": 10.0}  # stored in tenths
+
+# Per-connection tuning. WAL is persistent in the file and set once in
+# ensure_db; NORMAL is durable under WAL except for the last commits on
+# power loss. foreign_keys is off by default in SQLite: without it the
+# session_series cascade does nothing.
+CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+)
 
-    con = sqlite3.connect(str(p))
+_ready: Dict[str, int] = {}  # initialized paths -> generation
+_recovered: Dict[str, float] = {}  # path -> time.monotonic() of the last orphan sweep
+_ready_lock = threading.Lock()
+_local = threading.local()
+
+# =========================
+# Forward-only migrations
+# =========================
+def _columns(con: sqlite3.Connection, table: str) -> set:
+    return {r[1] for r in con.execute(f"PRAGMA table_info({table})")}
+
+def _add_columns(con: sqlite3.Connection, table: str, defs: Dict[str, str]) -> None:
+    # ADD COLUMN only touches the schema, not the existing rows
+    have = _columns(con, table)
+    for name, decl in defs.items():
+        if name not in have:
+            con.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+def _m001_base(con):
+    con.execute(SCHEMA_SQL)
+    con.execute(SERIES_SQL)
+
+def _m002_status(con):
+    _add_columns(con, "sessions", {"status": "TEXT NOT NULL DEFAULT 'closed'"})
+    con.execute("CREATE INDEX IF NOT EXISTS idx_sessions_open ON sessions(end_ts) WHERE status = 'open'")
+
+def _m003_indexes(con):
+    con.execute("CREATE INDEX IF NOT EXISTS idx_sessions_end_ts ON sessions(end_ts)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_sessions_start_ts ON sessions(start_ts)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_sessions_mode ON sessions(mode, end_ts)")
+
+def _m004_provenance(con):
+    _add_columns(con, "sessions", {"user": "TEXT", "device": "TEXT", "app_version": "TEXT"})
+
+def _m005_rollups(con):
+    for table in ROLLUP_TABLES.values():
+        con.execute(_rollup_sql(table))
+    _rebuild_rollups(con)
+
+# (version, name, step). Append only; never edit a released step. Steps
+# tolerate objects that already exist (DBs from before versioning).
+MIGRATIONS = (
+    (1, "base", _m001_base),
+    (2, "session status", _m002_status),
+    (3, "history indexes", _m003_indexes),
+    (4, "user, device and app version", _m004_provenance),
+    (5, "daily and weekly rollups", _m005_rollups),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def schema_version(con: sqlite3.Connection) -> int:
+    con.execute(VERSION_SQL)
+    return con.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def migrate(con: sqlite3.Connection) -> int:
+    """
+    Apply pending MIGRATIONS, each in its own transaction (BEGIN IMMEDIATE,
+    so two processes opening the same file do not both run it). Returns the
+    number applied. A DB newer than this code is an error, not a downgrade.
+    PRAGMA user_version mirrors the version for external tools.
+    """
+    applied = 0
+    for version, name, step in MIGRATIONS:
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            current = schema_version(con)
+            if current > SCHEMA_VERSION:
+                raise RuntimeError(f"database schema v{current} is newer than this app (v{SCHEMA_VERSION})")
+            if version > current:
+                step(con)
+                con.execute("INSERT INTO schema_version (version, name, applied_ts) VALUES (?,?,?)",
+                            (version, name, time.time()))
+                applied += 1
+                current = version
+            if con.execute("PRAGMA user_version").fetchone()[0] != current:
+                con.execute(f"PRAGMA user_version = {int(current)}")
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+    return applied
+
+def _init_db(path: str) -> None:
+    con = sqlite3.connect(path, isolation_level=None)  # migrate() manages its transactions
     try:
         con.execute("PRAGMA journal_mode=WAL;")
-        con.execute(SCHEMA_SQL)
-        con.commit()
+        migrate(con)
+        recover_open_sessions(con)
     finally:
         con.close()
+    _recovered[path] = time.monotonic()
 
-    return str(p)
+def _sweep_orphans(path: str) -> None:
+    # Sessions of a process that died after this one started age out later
+    now = time.monotonic()
+    with _ready_lock:
+        if now - _recovered.get(path, now) < RECOVER_EVERY_SEC:
+            return
+        _recovered[path] = now
+    con = sqlite3.connect(path, isolation_level=None, timeout=5.0)
+    try:
+        recover_open_sessions(con)
+    finally:
+        con.close()
+
+def ensure_db(db_path: str = DEFAULT_DB_PATH) -> str:
+    """
+    Ensure the sqlite DB and schema exist. Returns resolved db path.
+    Migrates once per path and process (again only if the file
+    disappears); orphaned open sessions are swept every RECOVER_EVERY_SEC.
+    """
+    path = str(Path(db_path))
+    if path in _ready and os.path.exists(path):
+        _sweep_orphans(path)
+        return path
+    with _ready_lock:
+        if path in _ready and os.path.exists(path):
+            return path
+        p = Path(path)
+        if p.parent and str(p.parent) not in ("", "."):
+            p.parent.mkdir(parents=True, exist_ok=True)
+        _init_db(path)
+        _ready[path] = _ready.get(path, 0) + 1
+    return path
+
+def connection(db_path: str = DEFAULT_DB_PATH) -> sqlite3.Connection:
+    """
+    This thread's connection to `db_path` (created and tuned on first use).
+    sqlite3 keeps a per-connection cache of prepared statements, so the
+    fixed SQL strings below are compiled once per thread.
+    """
+    path = ensure_db(db_path)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    gen = _ready[path]
+    entry = conns.get(path)
+    if entry is not None and entry[1] == gen:
+        return entry[0]
+    if entry is not None:
+        entry[0].close()  # the file was recreated
+    con = sqlite3.connect(path, cached_statements=64)
+    for pragma in CONNECTION_PRAGMAS:
+        con.execute(pragma)
+    conns[path] = (con, gen)
+    return con
+
+def close_connections() -> None:
+    """Close this thread's connections and forget initialized paths (tests, benchmarks)."""
+    for con, _ in getattr(_local, "conns", {}).values():
+        con.close()
+    _local.conns = {}
+    with _ready_lock:
+        _ready.clear()
+        _recovered.clear()
+
+def recover_open_sessions(con: sqlite3.Connection, now: Optional[float] = None) -> int:
+    """
+    Close orphaned 'open' sessions (last checkpoint older than
+    ORPHAN_AFTER_SEC). Their row already holds the totals up to that
+    checkpoint; metrics_json gets "recovered": true. Returns rows closed.
+    """
+    cutoff = (time.time() if now is None else now) - ORPHAN_AFTER_SEC
+    cur = con.execute(
+        "UPDATE sessions SET status = 'closed', metrics_json = json_set(metrics_json, '$.recovered', json('true')) "
+        "WHERE status = 'open' AND end_ts < ?",
+        (cutoff,),
+    )
+    return cur.rowcount
+
+def build_session_row(
+    sess: Union[SessionAccumulator, Dict[str, Any]],
+    *,
+    mode: str,
+    user: Optional[str] = None,
+    device: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Build the row for `save_session` from a `SessionAccumulator` (or its
+    `to_dict()` form). Derives scores and hydration intervals.
+    """
+    if isinstance(sess, SessionAccumulator):
+        sess = sess.to_dict()
+    # derive scores (ignore none)
+    posture_score = level_score(sess["posture_good_sec"], sess["posture_regular_sec"], sess["posture_bad_sec"])
+    light_score = level_score(sess["light_good_sec"], sess["light_regular_sec"], sess["light_bad_sec"])
+
+    # hydration intervals
+    ts = sorted(set([float(t) for t in sess.get("drink_events_ts", [])]))
+    if len(ts) >= 2:
+        gaps = [(ts[i] - ts[i-1]) / 60.0 for i in range(1, len(ts))]
+        avg_between = float(sum(gaps) / len(gaps))
+    else:
+        avg_between = None
+
+    return {
+        "start_ts": float(sess["start_ts"]),
+        "end_ts": float(sess["end_ts"]),
+        "mode": mode,
+        "duration_sec": float(sess["duration_sec"]),
+
+        "posture_good_sec": float(sess["posture_good_sec"]),
+        "posture_regular_sec": float(sess["posture_regular_sec"]),
+        "posture_bad_sec": float(sess["posture_bad_sec"]),
+        "posture_none_sec": float(sess["posture_none_sec"]),
+        "posture_alerts_count": int(sess["posture_alerts_count"]),
+        "posture_bad_streak_max_sec": float(sess["posture_bad_streak_max_sec"]),
+        "posture_score_0_100": posture_score,
+
+        "light_good_sec": float(sess["light_good_sec"]),
+        "light_regular_sec": float(sess["light_regular_sec"]),
+        "light_bad_sec": float(sess["light_bad_sec"]),
+        "light_none_sec": float(sess["light_none_sec"]),
+        "light_alerts_count": int(sess["light_alerts_count"]),
+        "light_bad_streak_max_sec": float(sess["light_bad_streak_max_sec"]),
+        "light_score_0_100": light_score,
+
+        "drink_events_count": int(len(ts)),
+        "hydration_reminders_sent_count": int(sess["hydration_reminders_sent_count"]),
+        "avg_minutes_between_drinks": avg_between,
+
+        "user": user,
+        "device": device,
+        "app_version": APP_VERSION,
+
+        # Keep full metrics in metrics_json
+        "metrics": {
+            "drink_events_ts": ts,
+            "posture_bad_streak_cur_sec": sess.get("posture_bad_streak_cur_sec", 0.0),
+            "light_bad_streak_cur_sec": sess.get("light_bad_streak_cur_sec", 0.0),
+            "light_backlit_sec": sess.get("light_backlit_sec", 0.0),
+            "light_glare_sec": sess.get("light_glare_sec", 0.0),
+            "clock_gaps": sess.get("clock_gaps", 0),
+        },
+    }
 
 def _to_json(obj: Any) -> str:
     return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
 
-def save_session(session: Dict[str, Any], db_path: str = DEFAULT_DB_PATH) -> int:
+def _shuffle(a: np.ndarray) -> bytes:
+    # low and high bytes apart: small deltas leave an almost all-zero plane
+    return a.view(np.uint8).reshape(-1, a.itemsize).T.tobytes()
+
+def _unshuffle(buf: bytes, n: int, dtype) -> np.ndarray:
+    size = np.dtype(dtype).itemsize
+    return np.frombuffer(buf, np.uint8).reshape(size, n).T.copy().view(dtype).ravel()
+
+def encode_series(angle, brightness, presence) -> bytes:
     """
-    Save one session dict to DB. Returns inserted row id.
+    Compact blob for a fixed-rate series: angle and brightness quantized to
+    int16 tenths (NaN -> -32768), presence to uint8 percent; each column is
+    delta-encoded, byte-shuffled and the whole thing zlib-compressed.
     """
-    db_path = ensure_db(db_path)
+    parts = []
+    for name, values in (("angle", angle), ("brightness", brightness)):
+        v = np.asarray(values, np.float64) * _SCALE[name]
+        q = np.where(np.isnan(v), _NA, np.clip(np.round(np.nan_to_num(v)), -32767, 32767)).astype(np.int16)
+        parts.append(_shuffle(np.diff(q, prepend=np.int16(0))))  # aritmética int16 modular
+    p = np.round(np.clip(np.asarray(presence, np.float64), 0.0, 1.0) * 100).astype(np.uint8)
+    parts.append(np.diff(p, prepend=np.uint8(0)).tobytes())
+    return zlib.compress(b"".join(parts), 9)
+
+def decode_series(blob: bytes, n: int) -> Dict[str, np.ndarray]:
+    raw = zlib.decompress(blob)
+    out = {}
+    for i, name in enumerate(("angle", "brightness")):
+        q = np.cumsum(_unshuffle(raw[2 * n * i:2 * n * (i + 1)], n, np.int16), dtype=np.int16)
+        v = q.astype(np.float32) / np.float32(_SCALE[name])
+        v[q == _NA] = np.nan
+        out[name] = v
+    p = np.cumsum(np.frombuffer(raw[4 * n:5 * n], np.uint8), dtype=np.uint8)
+    out["presence"] = p.astype(np.float32) / 100.0
+    return out
 
+_SESSION_COLS = [
+    "start_ts","end_ts","mode","duration_sec",
+    "posture_good_sec","posture_regular_sec","posture_bad_sec","posture_none_sec",
+    "posture_alerts_count","posture_bad_streak_max_sec","posture_score_0_100",
+    "light_good_sec","light_regular_sec","light_bad_sec","light_none_sec",
+    "light_alerts_count","light_bad_streak_max_sec","light_score_0_100",
+    "drink_events_count","hydration_reminders_sent_count","avg_minutes_between_drinks",
+    "metrics_json","status","user","device","app_version",
+]
+_INSERT_SESSION = f"INSERT INTO sessions ({','.join(_SESSION_COLS)}) VALUES ({','.join(['?'] * len(_SESSION_COLS))})"
+_UPDATE_SESSION = f"UPDATE sessions SET {','.join(c + '=?' for c in _SESSION_COLS)} WHERE id = ?"
+_UPSERT_SERIES = "INSERT OR REPLACE INTO session_series (session_id, codec, rate_hz, n, data) VALUES (?,?,?,?,?)"
+
+# =========================
+# Rollups
+# =========================
+_UPSERT_ROLLUP = {
+    table: f"INSERT INTO {table} (period, mode, {','.join(ROLLUP_COLS)}) "
+           f"VALUES ({','.join(['?'] * (len(ROLLUP_COLS) + 2))}) "
+           f"ON CONFLICT(period, mode) DO UPDATE SET {','.join(f'{c} = {c} + excluded.{c}' for c in ROLLUP_COLS)}"
+    for table in ROLLUP_TABLES.values()
+}
+_SELECT_ROLLUP_SRC = f"SELECT start_ts, mode, {','.join(ROLLUP_SUMS)} FROM sessions"
+
+def rollup_periods(ts: float) -> Tuple[str, str]:
+    """Local day ('2024-05-31') and ISO week ('2024-W22') of a timestamp."""
+    d = _dt.date.fromtimestamp(float(ts))
+    year, week, _ = d.isocalendar()
+    return d.isoformat(), f"{year}-W{week:02d}"
+
+def _rollup_values(row: Dict[str, Any]) -> list:
+    vals = [1] + [row.get(c) or 0 for c in ROLLUP_SUMS]
+    for axis in ("posture", "light"):
+        good, regular, bad = (row.get(f"{axis}_{k}_sec") or 0.0 for k in ("good", "regular", "bad"))
+        score = level_score(good, regular, bad) or 0.0
+        vals += [score * (good + regular + bad), good + regular + bad]
+    return vals
+
+def _update_rollups(cur: sqlite3.Cursor, new: Optional[Dict[str, Any]], old: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Add `new` to its buckets and take out `old` (the previous version of the
+    same row, for in-place updates): a checkpoint only adds its difference.
+    """
+    deltas: Dict[Tuple[str, str, str], list] = {}
+    for row, sign in ((new, 1), (old, -1)):
+        if row is None:
+            continue
+        acc = deltas.setdefault((*rollup_periods(row["start_ts"]), row["mode"]), [0] * len(ROLLUP_COLS))
+        for i, v in enumerate(_rollup_values(row)):
+            acc[i] += sign * v
+    for (day, week, mode), vals in deltas.items():
+        cur.execute(_UPSERT_ROLLUP["rollup_daily"], [day, mode] + vals)
+        cur.execute(_UPSERT_ROLLUP["rollup_weekly"], [week, mode] + vals)
+    if old is not None:
+        for table, key in zip(ROLLUP_TABLES.values(), rollup_periods(old["start_ts"])):
+            cur.execute(f"DELETE FROM {table} WHERE period = ? AND mode = ? AND sessions <= 0", (key, old["mode"]))
+
+def _rebuild_rollups(con: sqlite3.Connection) -> int:
+    """Recompute both rollup tables from `sessions` (caller owns the transaction)."""
+    totals = {table: {} for table in ROLLUP_TABLES.values()}
+    n = 0
+    cur = con.execute(_SELECT_ROLLUP_SRC)
+    names = [d[0] for d in cur.description]
+    for r in cur:
+        row = dict(zip(names, r))
+        vals = _rollup_values(row)
+        for table, key in zip(ROLLUP_TABLES.values(), rollup_periods(row["start_ts"])):
+            acc = totals[table].setdefault((key, row["mode"]), [0] * len(ROLLUP_COLS))
+            for i, v in enumerate(vals):
+                acc[i] += v
+        n += 1
+    for table, buckets in totals.items():
+        con.execute(f"DELETE FROM {table}")
+        con.executemany(_UPSERT_ROLLUP[table], [[key, mode] + vals for (key, mode), vals in buckets.items()])
+    return n
+
+def rebuild_rollups(db_path: str = DEFAULT_DB_PATH) -> int:
+    """Recompute the daily/weekly rollups of an existing DB. Returns sessions counted."""
+    con = connection(db_path)
+    with con:
+        return _rebuild_rollups(con)
+
+def fetch_rollups(
+    period: str = "day",
+    *,
+    since: Optional[float] = None,
+    mode: Optional[str] = None,
+    db_path: str = DEFAULT_DB_PATH,
+) -> Dict[str, np.ndarray]:
+    """
+    Rollup rows ("day" or "week") oldest first, as columns: `period`,
+    `mode` and ROLLUP_COLS. `since` keeps the buckets from that
+    timestamp's day/week on.
+    """
+    table = ROLLUP_TABLES[period]
+    where, args = [], []
+    if since is not None:
+        where.append("period >= ?")
+        args.append(rollup_periods(since)[0 if period == "day" else 1])
+    if mode is not None:
+        where.append("mode = ?")
+        args.append(mode)
+    sql = f"SELECT period, mode, {','.join(ROLLUP_COLS)} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    rows = connection(db_path).execute(sql + " ORDER BY period, mode", args).fetchall()
+    names = ("period", "mode") + ROLLUP_COLS
+    cols = list(zip(*rows)) if rows else [()] * len(names)
+    types = {"period": "TEXT", "mode": "TEXT", **{c: _rollup_type(c) for c in ROLLUP_COLS}}
+    return {name: _to_array(list(values), types[name]) for name, values in zip(names, cols)}
+
+def save_session(
+    session: Dict[str, Any],
+    db_path: str = DEFAULT_DB_PATH,
+    series=None,
+    session_id: Optional[int] = None,
+    status: str = "closed",
+) -> int:
+    """
+    Save one session dict to DB. Returns its row id. Without `session_id`
+    the row is inserted; with it, that row is updated in place (periodic
+    checkpoints of a live session, then the final 'closed' save). With
+    `series` (a `SeriesRecorder`), its compact blob goes in the same
+    transaction, as does the daily/weekly rollup update.
+    """
     # solo guardar métricas extendidas aquí
     metrics_json = _to_json(session.get("metrics", {}))
-
-    cols = [
-        "start_ts","end_ts","mode","duration_sec",
-        "posture_good_sec","posture_regular_sec","posture_bad_sec","posture_none_sec",
-        "posture_alerts_count","posture_bad_streak_max_sec","posture_score_0_100",
-        "light_good_sec","light_regular_sec","light_bad_sec","light_none_sec",
-        "light_alerts_count","light_bad_streak_max_sec","light_score_0_100",
-        "drink_events_count","hydration_reminders_sent_count","avg_minutes_between_drinks",
-        "metrics_json",
+    vals = [session.get(c) for c in _SESSION_COLS[:-5]] + [
+        metrics_json, status, session.get("user"), session.get("device"), session.get("app_version", APP_VERSION),
     ]
 
-    vals = [session.get(c) for c in cols[:-1]] + [metrics_json]
-
-    con = sqlite3.connect(db_path)
-    try:
+    con = connection(db_path)
+    with con:
         cur = con.cursor()
-        cur.execute(
-            f"INSERT INTO sessions ({','.join(cols)}) VALUES ({','.join(['?']*len(cols))})",
-            vals
-        )
-        con.commit()
-        return int(cur.lastrowid)
-    finally:
-        con.close()
+        old = None
+        if session_id is not None:
+            prev = cur.execute(_SELECT_ROLLUP_SRC + " WHERE id = ?", (int(session_id),)).fetchone()
+            if prev is not None:
+                old = dict(zip(("start_ts", "mode") + ROLLUP_SUMS, prev))
+                cur.execute(_UPDATE_SESSION, vals + [int(session_id)])
+            else:  # row gone (DB replaced): insert again
+                session_id = None
+        if session_id is None:
+            cur.execute(_INSERT_SESSION, vals)
+            session_id = int(cur.lastrowid)
+        _update_rollups(cur, session, old)
+        if series is not None:
+            angle, brightness, presence = series.arrays()
+            if len(angle):
+                cur.execute(
+                    _UPSERT_SERIES,
+                    (session_id, SERIES_CODEC, series.rate_hz, len(angle), encode_series(angle, brightness, presence)),
+                )
+    return session_id
+
+def store_session(
+    sess: SessionAccumulator,
+    *,
+    mode: str,
+    db_path: str = DEFAULT_DB_PATH,
+    session_id: Optional[int] = None,
+    status: str = "closed",
+    user: Optional[str] = None,
+    device: Optional[str] = None,
+) -> int:
+    """`build_session_row` + `save_session` for a live accumulator and its series."""
+    row = build_session_row(sess, mode=mode, user=user, device=device)
+    return save_session(row, db_path=db_path, series=sess.series, session_id=session_id, status=status)
+
+def fetch_session_series(session_id: int, db_path: str = DEFAULT_DB_PATH) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Return the stored series of a session as NumPy arrays: `t` (monitored
+    seconds since start), `angle`, `brightness` (NaN = no data) and
+    `presence` (0-1), plus `rate_hz`. None if the session has no series.
+    """
+    row = connection(db_path).execute(
+        "SELECT codec, rate_hz, n, data FROM session_series WHERE session_id = ?", (int(session_id),)
+    ).fetchone()
+    if row is None:
+        return None
+    codec, rate_hz, n, blob = row
+    if codec != SERIES_CODEC:
+        raise ValueError(f"unknown series codec: {codec}")
+    out = decode_series(blob, n)
+    out["t"] = np.arange(n, dtype=np.float32) / np.float32(rate_hz)
+    out["rate_hz"] = rate_hz
+    return out
 
 def fetch_sessions(limit: int = 200, db_path: str = DEFAULT_DB_PATH):
     """Return list of rows as dicts (newest first)."""
-    db_path = ensure_db(db_path)
-    con = sqlite3.connect(db_path)
-    con.row_factory = sqlite3.Row
-    try:
-        cur = con.cursor()
-        cur.execute(
-            "SELECT * FROM sessions ORDER BY end_ts DESC LIMIT ?",
-            (int(limit),)
-        )
-        rows = cur.fetchall()
-        out = []
-        for r in rows:
-            d = dict(r)
-            try:
-                d["metrics"] = json.loads(d.get("metrics_json") or "{}")
-            except Exception:
-                d["metrics"] = {}
-            out.append(d)
+    cur = connection(db_path).execute("SELECT * FROM sessions ORDER BY end_ts DESC LIMIT ?", (int(limit),))
+    names = [d[0] for d in cur.description]
+    out = []
+    for r in cur.fetchall():
+        d = dict(zip(names, r))
+        try:
+            d["metrics"] = json.loads(d.get("metrics_json") or "{}")
+        except Exception:
+            d["metrics"] = {}
+        out.append(d)
+    return out
+
+# =========================
+# Column-oriented history queries
+# =========================
+_NUMPY_TYPES = {"INTEGER": np.int64, "REAL": np.float64}
+
+class SessionPage(NamedTuple):
+    """
+    One page of `query_sessions`: `columns` maps each column to a NumPy
+    array (REAL -> float64 with NaN for NULL, INTEGER -> int64, TEXT ->
+    object). `cursor` is the `after` for the next (older) page, None at
+    the end.
+    """
+    columns: Dict[str, np.ndarray]
+    cursor: Optional[Tuple[float, int]]
+
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+
+    def to_pandas(self):
+        import pandas as pd
+        return pd.DataFrame(self.columns, copy=False)
+
+def _column_types(con: sqlite3.Connection) -> Dict[str, str]:
+    return {r[1]: r[2].upper() for r in con.execute("PRAGMA table_info(sessions)")}
+
+def _to_array(values: Sequence, decl: str) -> np.ndarray:
+    dtype = _NUMPY_TYPES.get(decl)
+    if dtype is np.int64 and None in values:
+        dtype = np.float64  # nullable INTEGER (NULL -> NaN)
+    if dtype is None:
+        out = np.empty(len(values), dtype=object)
+        out[:] = values
         return out
-    finally:
-        con.close()
+    return np.array(values, dtype=dtype)
+
+def query_sessions(
+    columns: Optional[Iterable[str]] = None,
+    *,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    mode: Optional[str] = None,
+    after: Optional[Tuple[float, int]] = None,
+    limit: int = 500,
+    with_metrics: bool = False,
+    db_path: str = DEFAULT_DB_PATH,
+) -> SessionPage:
+    """
+    Sessions newest first, as columns. Only the requested `columns` are
+    read (`id` and `end_ts` always, for the cursor; all but metrics_json if
+    None). `since`/`until` bound end_ts (until exclusive), `mode` filters
+    the view and `after` is the cursor of the previous page (keyset on
+    (end_ts, id), served by the end_ts / (mode, end_ts) indexes; no OFFSET).
+    `metrics_json` is only read and decoded into a `metrics` column with
+    `with_metrics`.
+    """
+    con = connection(db_path)
+    types = _column_types(con)
+    if columns is None:
+        names = [c for c in types if c != "metrics_json"]
+    else:
+        names = ["id", "end_ts"] + [c for c in columns if c not in ("id", "end_ts", "metrics", "metrics_json")]
+        unknown = [c for c in names if c not in types]
+        if unknown:
+            raise ValueError(f"unknown session columns: {', '.join(unknown)}")
+    select = names + (["metrics_json"] if with_metrics else [])
+
+    where, args = [], []
+    if since is not None:
+        where.append("end_ts >= ?")
+        args.append(float(since))
+    if until is not None:
+        where.append("end_ts < ?")
+        args.append(float(until))
+    if mode is not None:
+        where.append("mode = ?")
+        args.append(mode)
+    if after is not None:
+        where.append("(end_ts, id) < (?, ?)")
+        args.extend((float(after[0]), int(after[1])))
+    sql = f"SELECT {','.join(select)} FROM sessions"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY end_ts DESC, id DESC LIMIT ?"
+    args.append(int(limit))
+
+    rows = con.execute(sql, args).fetchall()
+    cols = list(zip(*rows)) if rows else [()] * len(select)
+    out = {name: _to_array(list(values), types[name]) for name, values in zip(names, cols)}
+    if with_metrics:
+        out["metrics"] = _to_array([json.loads(m or "{}") for m in cols[-1]], "TEXT")
+    cursor = None
+    if len(rows) == int(limit):
+        cursor = (float(out["end_ts"][-1]), int(out["id"][-1]))
+    return SessionPage(out, cursor)
+
+def fetch_metrics(session_ids: Iterable[int], db_path: str = DEFAULT_DB_PATH) -> Dict[int, Dict[str, Any]]:
+    """Decoded metrics_json of a few sessions (e.g. the ones a user opened)."""
+    ids = [int(i) for i in session_ids]
+    if not ids:
+        return {}
+    con = connection(db_path)
+    rows = con.execute(
+        f"SELECT id, metrics_json FROM sessions WHERE id IN ({','.join(['?'] * len(ids))})", ids
+    ).fetchall()
+    return {i: json.loads(m or "{}") for i, m in rows}
+
+# =========================
+# Bulk export / import
+# =========================
+EXPORT_CHUNK_ROWS = 10000
+_FIND_SESSION = "SELECT 1 FROM sessions WHERE start_ts = ? AND mode = ? AND COALESCE(device, '') = ? LIMIT 1"
+
+def session_column_types(db_path: str = DEFAULT_DB_PATH) -> Dict[str, str]:
+    """Declared type of each `sessions` column, in table order."""
+    return _column_types(connection(db_path))
+
+def iter_session_rows(
+    *,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+    since: Optional[float] = None,
+    with_series: bool = False,
+    db_path: str = DEFAULT_DB_PATH,
+):
+    """
+    Stream all sessions oldest id first as (names, rows, series) chunks of at
+    most `chunk_rows` tuples. Each chunk is its own query (keyset on id), so
+    memory and read transactions stay short at any table size. `series`
+    maps id -> fetch_session_series()-style dict (empty without
+    `with_series`).
+    """
+    con = connection(db_path)
+    sql = "SELECT * FROM sessions WHERE id > ?" + (" AND end_ts >= ?" if since is not None else "") + " ORDER BY id LIMIT ?"
+    last = -1
+    while True:
+        args = [last] + ([float(since)] if since is not None else []) + [int(chunk_rows)]
+        cur = con.execute(sql, args)
+        names = [d[0] for d in cur.description]
+        rows = cur.fetchall()
+        if not rows:
+            return
+        last = rows[-1][0]
+        series = {}
+        if with_series:
+            ids = [r[0] for r in rows]
+            for sid, codec, rate_hz, n, blob in con.execute(
+                f"SELECT session_id, codec, rate_hz, n, data FROM session_series "
+                f"WHERE session_id IN ({','.join(['?'] * len(ids))})", ids
+            ):
+                if codec != SERIES_CODEC:
+                    raise ValueError(f"unknown series codec: {codec}")
+                series[sid] = dict(decode_series(blob, n), rate_hz=rate_hz)
+        yield names, rows, series
+        if len(rows) < chunk_rows:
+            return
+
+def import_sessions(rows: Iterable[Dict[str, Any]], db_path: str = DEFAULT_DB_PATH) -> Tuple[int, int]:
+    """
+    Insert exported session dicts in one transaction, skipping those already
+    stored with the same (start_ts, mode, device), NULL device == ''. So
+    importing the same file twice is a no-op. Rows carry `metrics_json`
+    (text) or `metrics` (dict) and optionally `series` ({"rate_hz",
+    "angle", "brightness", "presence"}); rollups are updated as in
+    save_session. Returns (inserted, skipped).
+    """
+    inserted = skipped = 0
+    con = connection(db_path)
+    with con:
+        cur = con.cursor()
+        for row in rows:
+            start_ts, mode = float(row["start_ts"]), row["mode"]
+            if cur.execute(_FIND_SESSION, (start_ts, mode, row.get("device") or "")).fetchone():
+                skipped += 1
+                continue
+            metrics_json = row.get("metrics_json")
+            if metrics_json is None:
+                metrics_json = _to_json(row.get("metrics") or {})
+            vals = [row.get(c) for c in _SESSION_COLS[:-5]] + [
+                metrics_json, row.get("status") or "closed", row.get("user"), row.get("device"), row.get("app_version"),
+            ]
+            vals[0] = start_ts
+            cur.execute(_INSERT_SESSION, vals)
+            series = row.get("series")
+            if series and len(series["angle"]):
+                cur.execute(_UPSERT_SERIES, (
+                    cur.lastrowid, SERIES_CODEC, float(series["rate_hz"]), len(series["angle"]),
+                    encode_series(series["angle"], series["brightness"], series["presence"]),
+                ))
+            _update_rollups(cur, dict(row, start_ts=start_ts))
+            inserted += 1
+    return inserted, skipped
+
+if __name__ == "__main__":
+    # python session_logger.py rebuild-rollups [--db historial.db]
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Mantenimiento de la base del historial")
+    ap.add_argument("command", choices=["rebuild-rollups"])
+    ap.add_argument("--db", default=DEFAULT_DB_PATH)
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    n = rebuild_rollups(args.db)
+    print(f"Resúmenes por día y semana recalculados: {n} sesiones en {time.perf_counter() - t0:.2f} s")
@@ -8,19 +8,9 @@ def init_session_defaults():
     # Historial (SQLite)
     st.session_state.setdefault("enable_history", True)
     st.session_state.setdefault("history_db_path", "ergovision_sessions.db")
-
-    for key, default in [
-        ("bad_timer_side", 0.0), ("bad_timer_front", 0.0),
-        ("bad_cool_side", 0.0), ("bad_cool_front", 0.0),
-        ("lowlight_timer_side", 0.0), ("lowlight_timer_front", 0.0),
-        ("lowlight_cool_side", 0.0), ("lowlight_cool_front", 0.0),
-        ("good_timer_side", 0.0), ("good_timer_front", 0.0),
-        ("posture_alert_active_side", False), ("posture_alert_active_front", False),
-        ("goodlight_timer_side", 0.0), ("goodlight_timer_front", 0.0),
-        ("light_alert_active_side", False), ("light_alert_active_front", False),
-        ("last_tick_side", time.time()), ("last_tick_front", time.time()),
-    ]:
-        st.session_state.setdefault(key, default)
+    st.session_state.setdefault("history_series", True)
+    st.session_state.setdefault("checkpoint_sec", 30)
+    st.session_state.setdefault("split_absence_min", 30)
 
     if "notification_manager" not in st.session_state:
         st.session_state.notification_manager = NotificationManager(cooldown_seconds=300)
@@ -52,6 +42,7 @@ def init_session_defaults():
     for key, default in [
         ("enable_sitting_tracker", True),
         ("sitting_time_threshold_min", 30),
+        ("sitting_absence_sec", 10),
         ("sitting_start_time", None),
         ("total_sitting_time", 0.0),
         ("is_currently_sitting", False),
@@ -78,7 +69,21 @@ def get_config(
     good_light_seconds,
     cooldown_seconds,
     enable_desktop_notifications,
-    enable_notification_sound
+    enable_notification_sound,
+    adaptive_inference=False,
+    target_infer_fps=10,
+    cpu_budget_pct=75,
+    motion_gate=False,
+    roi_tracking=False,
+    async_inference=False,
+    frame_pipeline=False,
+    overlay_interpolation=False,
+    dual_camera=False,
+    enable_history=True,
+    history_db_path="ergovision_sessions.db",
+    history_series=True,
+    checkpoint_sec=30,
+    split_absence_min=30,
 ):
     """
     Construye el diccionario de configuración usado por los modos lateral y frontal.
@@ -86,6 +91,15 @@ def get_config(
     return {
         "lighting_thresh": float(lighting_thresh),
         "process_every_n": int(process_every_n),
+        "adaptive_inference": bool(adaptive_inference),
+        "target_infer_fps": float(target_infer_fps),
+        "cpu_budget": float(cpu_budget_pct) / 100.0,
+        "motion_gate": bool(motion_gate),
+        "roi_tracking": bool(roi_tracking),
+        "async_inference": bool(async_inference),
+        "frame_pipeline": bool(frame_pipeline),
+        "overlay_interpolation": bool(overlay_interpolation),
+        "dual_camera": bool(dual_camera),
         "debug_overlay": bool(debug_overlay),
         "thr": {
             "front": {"good": float(fr_good), "fair": float(fr_fair)},
@@ -100,6 +114,11 @@ def get_config(
         "cooldown_seconds": int(cooldown_seconds),
         "enable_desktop_notifications": bool(enable_desktop_notifications),
         "enable_notification_sound": bool(enable_notification_sound),
+        "enable_history": bool(enable_history),
+        "history_db_path": str(history_db_path),
+        "history_series": bool(history_series),
+        "checkpoint_sec": int(checkpoint_sec),
+        "split_absence_min": int(split_absence_min),
     }
 
 
@@ -225,6 +244,13 @@ def render_sidebar():
             5,
             help="Tiempo máximo recomendado sentado antes de tomar un descanso"
         )
+        st.session_state.sitting_absence_sec = st.slider(
+            "Ausencia para contar como levantado (segundos)",
+            3, 60,
+            int(st.session_state.sitting_absence_sec),
+            1,
+            help="Detecciones perdidas más cortas no reinician el contador"
+        )
         
         if st.button("Resetear tiempo sentado ⏳", key="reset_sitting_btn"):
             st.session_state.total_sitting_time = 0.0
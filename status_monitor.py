@@ -0,0 +1,393 @@
+import logging
+import queue
+import time
+import threading
+
+from common import posture_category_for_panel, lighting_category
+from drink_gesture import DrinkDetector
+from notificaciones import get_notification_message
+from session_accumulator import AlertTracker, SessionAccumulator, SeriesRecorder
+
+log = logging.getLogger(__name__)
+
+
+# =========================
+# Guardado fuera del hilo de video
+# =========================
+class _SeriesCopy:
+    """Serie congelada en el momento del checkpoint (lo que `save_session` lee)."""
+
+    __slots__ = ("rate_hz", "_arrays")
+
+    def __init__(self, series):
+        self.rate_hz = series.rate_hz
+        self._arrays = series.arrays()  # ya son copias
+
+    def arrays(self):
+        return self._arrays
+
+
+class SessionWriter:
+    """
+    Un hilo y una cola por monitor para `store`: el pipeline sólo encola una
+    copia del acumulador, así que un disco lento atrasa el guardado, no los
+    frames. Los trabajos de una misma sesión (`row`, con su id en la base)
+    se escriben en orden. Si una escritura falla se registra, queda en
+    `error` y la copia más reciente de esa sesión se reintenta cada
+    `RETRY_SEC` y en `flush` (fin de stream).
+    """
+
+    RETRY_SEC = 5.0
+
+    def __init__(self, name, on_error=None):
+        self.name = name
+        self.on_error = on_error
+        self.error = None  # último fallo sin resolver (texto)
+        self._q = queue.Queue()
+        self._failed = {}  # id(row) -> último trabajo fallido de esa sesión
+        self._last_retry = 0.0
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, store, row, acc, status):
+        copy = SessionAccumulator.from_dict(acc.to_dict())
+        if acc.series is not None:
+            copy.series = _SeriesCopy(acc.series)
+        self._ensure_thread()
+        self._q.put((store, row, copy, status))
+
+    def flush(self, timeout=None):
+        """Espera lo encolado (y un reintento de lo fallido). True si no queda nada pendiente."""
+        if self._thread is None:
+            return not self._failed
+        done = threading.Event()
+        self._q.put(done)
+        return done.wait(timeout) and not self._failed
+
+    def _ensure_thread(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"ergovision-store-{self.name}", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._q.get()
+            if isinstance(job, threading.Event):
+                self._retry(force=True)
+                job.set()
+                continue
+            self._write(job)
+            self._retry()
+
+    def _write(self, job):
+        store, row, acc, status = job
+        try:
+            row["id"] = store(acc, session_id=row["id"], status=status)
+        except Exception as e:
+            log.exception("No se pudo guardar la sesión %s (%s)", row["id"], status)
+            self._failed[id(row)] = job
+            self._set_error(f"{type(e).__name__}: {e}")
+            return False
+        self._failed.pop(id(row), None)
+        if not self._failed and self.error is not None:
+            self._set_error(None)
+        return True
+
+    def _retry(self, force=False):
+        now = time.monotonic()
+        if not self._failed or (not force and now - self._last_retry < self.RETRY_SEC):
+            return
+        self._last_retry = now
+        for job in list(self._failed.values()):
+            self._write(job)
+
+    def _set_error(self, error):
+        self.error = error
+        if self.on_error is not None:
+            self.on_error(error)
+
+
+class StatusMonitor:
+    """
+    Máquina de estados del panel de un stream: temporizadores y alertas de
+    postura/luz, acumulación de la sesión, gesto de beber, recordatorio de
+    hidratación y tiempo sentado. Avanza con cada resultado de `analyze`
+    desde el pipeline de video (`update`), no desde el script de Streamlit.
+
+    Con `store` (ver `session_logger.store_session`) la sesión se guarda
+    como 'open' cada `checkpoint_sec` y como 'closed' en `finish`; una
+    ausencia de más de `split_absence_min` cierra la sesión en el último
+    momento con pose y la siguiente empieza cuando la persona vuelve.
+
+    La UI sólo lee `snapshot()`: `version` sube cuando cambia algo visible
+    (categoría, alerta, contador o minuto transcurrido) y el panel sólo
+    recalcula entonces.
+    """
+
+    MIN_RENDER_INTERVAL = 1.0  # como mucho un redibujado por segundo
+    CHECKPOINT_SEC = 30.0
+    SPLIT_ABSENCE_MIN = 30.0
+    FINISH_WAIT_SEC = 5.0  # `finish` espera el guardado final como mucho esto
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.cfg = None
+        self.settings = {}
+        self.notifier = None
+        self.presence = None
+        self.store = None
+        self.fusion = None
+        self._lock = threading.Lock()
+        self.version = 0
+        self._key = None
+        self._snap = None
+        self._last_bump = 0.0
+        self.acc = None
+        self.keep_history = False
+        self.store_error = None
+        self.writer = SessionWriter(mode, on_error=self._on_store_error)
+        self.last_drink_ts = None
+        # Corre en el pipeline (make_callback); aquí sólo se consumen sus eventos
+        self.drinks = DrinkDetector(mode)
+        self.reset(time.time(), history=False)
+
+    def configure(self, cfg, settings, notifier, presence=None, store=None, fusion=None):
+        """Se llama en cada rerun con la barra lateral vigente."""
+        with self._lock:
+            self.cfg = cfg
+            self.settings = dict(settings)
+            self.notifier = notifier
+            self.presence = presence
+            self.store = store
+            self.fusion = fusion
+            self.drinks.enabled = self.settings.get("enable_hydration", True) and self.settings.get("enable_drink_detection", True)
+
+    def reset(self, now, history=True, series=False):
+        """Inicio de stream: temporizadores, alertas, gesto y sesión nuevos."""
+        with self._lock:
+            self.posture_alert = AlertTracker()
+            self.light_alert = AlertTracker()
+            self.drinks.reset()
+            self.last_drink_ts = None
+            self.hydration_alert_sent = False
+            self.keep_history = bool(history)
+            self._series = bool(history and series)
+            self._new_session(now)
+            self._absent_since = None
+            self._absent_snap = None
+            self._away = False
+            self.view = {}
+            self._key = None
+            self._publish(now, force=True)
+
+    # ---- eventos de la UI ----
+    def note_drink(self, ts):
+        """Botón "Tomé agua": mismo efecto que un gesto detectado."""
+        with self._lock:
+            if self.last_drink_ts is not None and ts <= self.last_drink_ts:
+                return
+            self._register_drink(float(ts))
+            self._publish(ts, force=True)
+
+    def finish(self, now):
+        """
+        Fin de stream: cierra y guarda la sesión (con `store`). Devuelve el
+        `SessionAccumulator`, o None sin historial o si ya se cerró por ausencia.
+        Espera el guardado hasta `FINISH_WAIT_SEC`; si falla queda en
+        `store_error` y el escritor lo sigue reintentando.
+        """
+        with self._lock:
+            acc = None
+            if self.keep_history and not self._away:
+                self.acc.end_ts = float(now)
+                self._store(self.acc, "closed")
+                acc = self.acc
+        # Fuera del lock: el escritor toma `_lock` al informar un error
+        self.writer.flush(self.FINISH_WAIT_SEC)
+        return acc
+
+    @property
+    def session_id(self):
+        """Id en la base de la sesión en curso (None hasta su primer guardado)."""
+        return self._row["id"]
+
+    # ---- sesión en la base ----
+    def _new_session(self, now):
+        self.acc = SessionAccumulator(now)
+        if self._series:
+            self.acc.series = SeriesRecorder()
+        self._row = {"id": None}
+        self._last_checkpoint = now
+
+    def _store(self, acc, status):
+        if self.store is not None:
+            self.writer.submit(self.store, self._row, acc, status)
+
+    def _on_store_error(self, error):
+        with self._lock:
+            self.store_error = error
+            self._publish(time.time(), force=True)
+
+    def _checkpoint(self, now):
+        if not self.keep_history or self._away:
+            return
+        if now - self._last_checkpoint < float(self.cfg.get("checkpoint_sec", self.CHECKPOINT_SEC)):
+            return
+        self._last_checkpoint = now
+        self.acc.end_ts = now
+        self._store(self.acc, "open")
+
+    def _split(self, present, now):
+        """Ausencia larga: la sesión termina en la última pose; la próxima empieza al volver."""
+        if present:
+            if self._away:
+                self._away = False
+                self._new_session(now)
+            self._absent_since = self._absent_snap = None
+            return
+        if self._absent_since is None:
+            # Estado de la sesión con la última pose (más un frame): lo que se guarda si se corta
+            self._absent_since, self._absent_snap = now, self.acc.to_dict()
+            return
+        split_sec = 60.0 * float(self.cfg.get("split_absence_min", self.SPLIT_ABSENCE_MIN))
+        if self._away or split_sec <= 0 or now - self._absent_since < split_sec:
+            return
+        if self.keep_history:
+            closed = SessionAccumulator.from_dict(self._absent_snap)
+            closed.series = self.acc.series
+            closed.end_ts = self._absent_since
+            self._store(closed, "closed")
+        self._away = True
+        self._absent_snap = None
+
+    # ---- pipeline ----
+    def update(self, data, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            cfg = self.cfg
+            if cfg is None:
+                return
+            # Reloj del video; sin pts (fuentes sin time_base) se usa el de pared
+            media_ts = data.get("media_ts")
+            nang = data["neck_angle_smooth"]
+            ang_now = nang if nang is not None else data["neck_angle_raw"]
+            present = ang_now is not None or data.get("landmarks") is not None
+            self._split(present, now)
+            dt = self.acc.advance(now if media_ts is None else media_ts)
+
+            lm = data.get("light_metrics")
+            p_label, p_level, _ = posture_category_for_panel(ang_now, self.mode, cfg["thr"])
+            l_label, l_level = lighting_category(data["brightness_smooth"], cfg["lighting_thresh"], lm)
+            self.view = {
+                "angle": ang_now, "p_label": p_label, "p_level": p_level,
+                "l_label": l_label, "l_level": l_level, "light_metrics": lm,
+                "brightness": data["brightness_smooth"],
+            }
+
+            if not self._away:  # entre sesiones no se acumula nada
+                self.acc.add(dt, p_level, l_level, lm)
+            self._sitting(present, now if media_ts is None else media_ts, now)
+            if self.fusion is not None:
+                self.fusion.feed(self.mode, ang_now, data.get("landmarks"), cfg["thr"], now)
+            if self.acc.series is not None and not self._away:
+                self.acc.series.add(self.acc.duration_sec, ang_now, data["brightness_smooth"], present)
+            self._hydration(now)
+            if cfg["enable_posture_alerts"]:
+                self._alert(self.posture_alert, p_level, dt, now, cfg["posture_seconds"], cfg["good_seconds"],
+                            "posture", f"posture_bad_{self.mode}")
+            if cfg["enable_light_alerts"]:
+                self._alert(self.light_alert, l_level, dt, now, cfg["light_seconds"], cfg["good_light_seconds"],
+                            "light", f"lighting_low_{self.mode}")
+            self._checkpoint(now)
+            self._publish(now)
+
+    def _alert(self, tracker, level, dt, now, need_sec, clear_sec, kind, notif_type):
+        if tracker.feed(level, dt, now, need_sec, clear_sec, self.cfg["cooldown_seconds"]):
+            self._notify(notif_type)
+            self.acc.count_alert(kind)
+
+    def _sitting(self, present, media_ts, now):
+        # Compartido con la otra cámara: la alerta la envía quien cruza el umbral
+        if self.presence is None or not self.settings.get("enable_sitting_tracker", True):
+            return
+        if self.presence.feed(self.mode, present, media_ts, now):
+            self._notify("sitting_too_long")
+
+    def _register_drink(self, ts):
+        self.last_drink_ts = ts
+        self.hydration_alert_sent = False
+        self.acc.add_drink(ts)
+
+    def _hydration(self, now):
+        s = self.settings
+        if not s.get("enable_hydration", True):
+            return
+        for ev in self.drinks.drain():
+            if self.last_drink_ts is None or ev.ts > self.last_drink_ts:
+                self._register_drink(ev.ts)
+
+        interval_min = float(s.get("hydrate_interval_min", 45))
+        if self.last_drink_ts is not None and not self.hydration_alert_sent:
+            if (now - self.last_drink_ts) / 60.0 >= interval_min:
+                self.hydration_alert_sent = True
+                if self.cfg.get("enable_desktop_notifications", True):
+                    self._notify("hydration_reminder")
+                    self.acc.count_reminder()
+
+    def _notify(self, notif_type):
+        cfg = self.cfg
+        if not cfg.get("enable_desktop_notifications", True) or self.notifier is None:
+            return
+        msg = get_notification_message(notif_type)
+        # plyer/sonido pueden tardar: fuera del hilo de video
+        threading.Thread(
+            target=self.notifier.send,
+            args=(notif_type, msg["title"], msg["message"]),
+            kwargs={"sound_type": msg.get("sound", "default"), "play_sound": cfg.get("enable_notification_sound", True)},
+            daemon=True,
+        ).start()
+
+    # ---- snapshot para la UI ----
+    def _publish(self, now, force=False):
+        view = self.view
+        angle = view.get("angle")
+        bright = view.get("brightness")
+        sit = self.presence.snapshot() if self.presence is not None else {"is_sitting": False, "sitting_min": 0.0, "alert_sent": False}
+        drink_min = None if self.last_drink_ts is None else int(max(0.0, now - self.last_drink_ts) // 60)
+        key = (
+            view.get("p_level"), view.get("l_level"), view.get("l_label", "")[:12],
+            None if angle is None else round(angle),
+            None if bright is None else round(bright),
+            self.posture_alert.active, self.light_alert.active,
+            sit["is_sitting"], int(sit["sitting_min"]), sit["alert_sent"],
+            drink_min, self.hydration_alert_sent,
+            self.acc.posture_alerts_count, self.acc.light_alerts_count, len(self.acc.drink_events_ts),
+            self.store_error,
+        )
+        if key == self._key:
+            return
+        # Cambios sólo numéricos (ángulo, brillo) se agrupan; categorías y alertas van enseguida
+        if not force and self._key is not None and key[5:] == self._key[5:] and key[:3] == self._key[:3]:
+            if now - self._last_bump < self.MIN_RENDER_INTERVAL:
+                return
+        self._key = key
+        self._last_bump = now
+        self.version += 1
+        self._snap = dict(
+            view,
+            version=self.version,
+            ts=now,
+            posture_alert_active=self.posture_alert.active,
+            light_alert_active=self.light_alert.active,
+            is_sitting=sit["is_sitting"],
+            sitting_min=sit["sitting_min"],
+            last_drink_ts=self.last_drink_ts,
+            hydration_alert_sent=self.hydration_alert_sent,
+            store_error=self.store_error,
+        )
+
+    def snapshot(self):
+        with self._lock:
+            return self._snap
+
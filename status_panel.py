@@ -0,0 +1,207 @@
+import time
+import numpy as np
+import streamlit as st
+
+from metrics_ring import sparkline
+from status_monitor import StatusMonitor
+
+PERF_REFRESH_SEC = 5.0  # las métricas de rendimiento no mueven `version`
+REFRESH_SEC = StatusMonitor.MIN_RENDER_INTERVAL  # período del fragmento del panel
+TREND_SEC = 60.0
+
+
+def _fmt_ms(v):
+    return f"{v:.0f} ms" if v is not None else "—"
+
+
+def _level_box(label, level):
+    if level == "good": st.success(label)
+    elif level == "regular": st.warning(label)
+    elif level == "bad": st.error(label)
+    else: st.info(label)
+
+
+def _trend(label, values, unit):
+    ok = values[~np.isnan(values)]
+    if not len(ok):
+        return
+    st.text(f"{label:<8}{sparkline(values)}  {ok.min():.0f}–{ok.max():.0f}{unit}")
+
+
+def _perf_stats(perf, cfg):
+    """Métricas de rendimiento del stream (None = deshabilitada)."""
+    return {
+        "scheduler": perf["scheduler"].stats(),
+        "motion_gate": perf["motion_gate"].stats() if perf["motion_gate"].enabled else None,
+        "roi_tracker": perf["roi_tracker"].stats() if perf["roi_tracker"].enabled else None,
+        "worker": perf["worker"].stats() if perf["worker"] is not None else None,
+        "pipeline": perf["pipeline"].stats() if perf["pipeline"] is not None else None,
+        "overlay": perf["overlay"].stats() if cfg["debug_overlay"] else None,
+        "pool": perf["pool"].stats(),
+    }
+
+
+def _trend_rows(ring, now):
+    if ring is None:
+        return None
+    rows = ring.window(TREND_SEC, now)
+    if len(rows) <= 1:
+        return None
+    return rows["angle_smooth"].copy(), rows["brightness"].copy()
+
+
+def _render(snap, settings, cfg, stats, trend):
+    now = time.time()
+
+    if snap.get("store_error"):
+        st.error(f"⚠️ No se pudo guardar la sesión en el historial ({snap['store_error']}). Se reintenta automáticamente.")
+
+    st.markdown("### Postura")
+    _level_box(snap.get("p_label", "Esperando detección…"), snap.get("p_level"))
+    ang_now = snap.get("angle")
+    if ang_now is not None: st.write(f"Ángulo del cuello: **{ang_now:.1f}°**")
+    else: st.write("Esperando detección…")
+
+    st.markdown("### 💡 Iluminación")
+    _level_box(snap.get("l_label", "Sin datos de luz"), snap.get("l_level"))
+    st.caption(f"Mínimo umbral: {cfg['lighting_thresh']:.0f} (Buena ≥ {cfg['lighting_thresh'] + 15:.0f})")
+    lm = snap.get("light_metrics")
+    if lm is not None:
+        st.caption(f"Contraste: {100 * lm['contrast']:.0f}% · sombras recortadas: {100 * lm['clip_low']:.1f}% · luces recortadas: {100 * lm['clip_high']:.1f}% · contraluz: {100 * lm['backlight']:.0f}%")
+
+    if trend is not None:
+        st.caption(f"Últimos {TREND_SEC:.0f} s")
+        _trend("Cuello", trend[0], "°")
+        _trend("Brillo", trend[1], "")
+
+    ss = stats["scheduler"]
+    lat = _fmt_ms(ss["latency_ms"])
+    if ss["adaptive"]:
+        st.caption(f"Inferencia: {ss['measured_fps']:.1f}/s (objetivo {ss['rate_fps']:.1f}/s, adaptativa) · latencia {lat} · CPU {100 * ss['host_cpu']:.0f}%")
+    else:
+        st.caption(f"Inferencia: {ss['measured_fps']:.1f}/s (1 de cada {ss['every_n']}, manual) · latencia {lat}")
+    mg = stats["motion_gate"]
+    if mg is not None:
+        st.caption(f"Escena quieta: {mg['skipped']} inferencias omitidas ({100 * mg['skip_ratio']:.0f}%) · CPU ahorrada {mg['saved_cpu_sec']:.1f} s")
+    rs = stats["roi_tracker"]
+    if rs is not None:
+        if rs["tracking"]:
+            st.caption(f"Seguimiento ROI: activo (recorte {100 * rs['roi_area']:.0f}% del frame) · pérdidas: {rs['lost']}")
+        else:
+            st.caption(f"Seguimiento ROI: buscando en frame completo · pérdidas: {rs['lost']}")
+    ws = stats["worker"]
+    if ws is not None:
+        st.caption(f"Video devuelto: {_fmt_ms(ws['video_ms'])}/frame · inferencia: {_fmt_ms(ws['infer_ms'])} · edad del resultado: {_fmt_ms(ws['result_age_ms'])} · descartados: {ws['dropped']} (tardíos: {ws['late']})")
+    fs = stats["pipeline"]
+    if fs is not None:
+        st.caption(f"Buffers de video: {fs['allocations']} asignaciones ({fs['alloc_mb']:.1f} MB) en {fs['frames']} frames · último frame: {fs['last_frame_allocs']}")
+    ov = stats["overlay"]
+    if ov is not None:
+        cost = f"{ov['draw_ms']:.2f} ms" if ov["draw_ms"] is not None else "—"
+        st.caption(f"Overlay: {cost}/frame{' (interpolado)' if ov['interpolate'] else ''}")
+    ps = stats["pool"]
+    st.caption(f"Modelos en uso: {ps['in_use']}/{ps['size']} · espera prom. {ps['avg_wait_ms']:.0f} ms (máx. {ps['max_wait_ms']:.0f} ms)")
+
+    # ---- Tiempo Sentado ----
+    if settings.get("enable_sitting_tracker", True):
+        st.markdown("### 🪑 Tiempo Sentado")
+        sitting_minutes = snap["sitting_min"]
+        threshold_min = settings.get("sitting_time_threshold_min", 30)
+        if snap["is_sitting"]:
+            if sitting_minutes >= threshold_min:
+                st.error(f"⚠️ Llevas {sitting_minutes:.0f} minutos sentado")
+                st.caption(f"Recomendación: Levántate cada {threshold_min} min")
+            elif sitting_minutes >= threshold_min * 0.8:
+                st.warning(f"Tiempo sentado: {sitting_minutes:.0f} min de {threshold_min}")
+            else:
+                st.info(f"Tiempo sentado: {sitting_minutes:.0f} min de {threshold_min}")
+        else:
+            st.success("✅ No estás sentado o sin detección")
+            st.caption("El contador se reinicia al detectar que te levantas")
+
+    # ---- Hidratación ----
+    if settings.get("enable_hydration", True):
+        st.markdown("### 💧 Hidratación")
+        interval_min = float(settings.get("hydrate_interval_min", 45))
+        last = snap["last_drink_ts"]
+        if last is None:
+            st.info(f"Sin registro aún (intervalo: {interval_min:.0f} min)")
+            st.caption("Toma agua o usa el botón manual para iniciar")
+        else:
+            elapsed_min = max(0.0, (now - last) / 60.0)
+            if elapsed_min >= interval_min:
+                st.error(f"⚠️ Han pasado {elapsed_min:.0f} minutos desde la última hidratación")
+                st.caption(f"Recomendación: Toma agua cada {interval_min:.0f} min")
+            elif elapsed_min >= interval_min * 0.8:
+                st.warning(f"Última hidratación: hace {elapsed_min:.0f} min (de {interval_min:.0f})")
+            else:
+                st.success(f"Última hidratación: hace {elapsed_min:.0f} min (de {interval_min:.0f})")
+
+    if cfg["enable_posture_alerts"] and snap["posture_alert_active"]:
+        st.error("⚠️ Mala postura mantenida. Endereza cuello y la espalda.")
+    if cfg["enable_light_alerts"] and snap["light_alert_active"]:
+        st.warning("💡 Iluminación insuficiente. Aumenta el nivel de luz en la habitación o ajusta el umbral.")
+
+
+_VIEW_NAMES = {"front": "frontal", "side": "lateral"}
+
+
+def _render_fusion(fused):
+    st.markdown("### Postura combinada")
+    if fused is None:
+        st.info("Esperando detección en alguna cámara…")
+        return
+    label = {"good": "Buena postura", "regular": "Postura regular", "bad": "MALA POSTURA"}[fused["level"]]
+    _level_box(f"{label} · {fused['score']:.0f}/100", fused["level"])
+    weights = " · ".join(f"{_VIEW_NAMES.get(m, m)} {100 * w:.0f}%" for m, w in sorted(fused["weights"].items()))
+    st.caption(f"Peso por visibilidad: {weights}")
+
+
+def _panel(playing, monitor, cfg, perf, ring):
+    if not playing:
+        st.info("Inicia la cámara para este modo.")
+        return
+    # `snapshot()` es el mismo objeto hasta que algo visible cambia: entonces (o
+    # cada PERF_REFRESH_SEC) se recalcula; si no, se reenvía lo último dibujado.
+    # Un fragmento borra lo que no vuelve a emitir, así que hay que reenviarlo;
+    # al ser idéntico, el navegador no lo vuelve a pintar.
+    cache = st.session_state.setdefault(f"status_panel_{monitor.mode}", {"snap": None})
+    snap = monitor.snapshot()
+    now = time.time()
+    if snap is not cache["snap"] or now - cache["at"] >= PERF_REFRESH_SEC:
+        cache.update(snap=snap, at=now, stats=_perf_stats(perf, cfg), trend=_trend_rows(ring, now))
+    _render(cache["snap"], monitor.settings, cfg, cache["stats"], cache["trend"])
+
+
+def _fusion_panel(fusion, monitors):
+    cache = st.session_state.setdefault("status_panel_fusion", {"snaps": None})
+    snaps = [m.snapshot() for m in monitors]
+    if cache["snaps"] is None or any(a is not b for a, b in zip(snaps, cache["snaps"])):
+        cache.update(snaps=snaps, fused=fusion.fused(time.time()))
+    _render_fusion(cache["fused"])
+
+
+def render_status_panel(webrtc_ctx, monitor, *, cfg, perf, ring=None):
+    """
+    Panel "Estado" de un stream. La lógica corre en `StatusMonitor` junto al
+    pipeline de video; aquí sólo se lee su `snapshot()` desde un fragmento
+    que se vuelve a ejecutar cada REFRESH_SEC mientras la cámara corre, así
+    el script termina y atiende enseguida Stop y la barra lateral.
+    """
+    render_status_panels([(st.container(), webrtc_ctx, monitor, perf, ring)], cfg=cfg)
+
+
+def render_status_panels(streams, *, cfg, fusion=None, fusion_box=None):
+    """
+    Igual que `render_status_panel` para varios streams a la vez (modo
+    dual): un fragmento por panel y, con `fusion`, otro con el puntaje
+    combinado arriba. `streams`: lista de (contenedor, webrtc_ctx, monitor, perf, ring).
+    """
+    playing = [ctx.state.playing for _, ctx, *_ in streams]
+    if fusion is not None:
+        with fusion_box or st.container():
+            st.fragment(_fusion_panel, run_every=REFRESH_SEC if any(playing) else None)(
+                fusion, [monitor for _, _, monitor, *_ in streams])
+    for on, (box, _, monitor, perf, ring) in zip(playing, streams):
+        with box:
+            st.fragment(_panel, run_every=REFRESH_SEC if on else None)(on, monitor, cfg, perf, ring)
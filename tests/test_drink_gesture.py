@@ -0,0 +1,85 @@
+import pytest
+
+from drink_gesture import D_FAR, D_NEAR, MIN_GAP_SEC, DrinkDetector
+
+FPS = 10.0
+
+
+def _gesture(det, t0, near_sec, dist_near=0.1, lost=()):
+    """Mano lejos 1 s, cerca `near_sec` y lejos otra vez; `lost` = instantes sin detección."""
+    t = t0
+    for _ in range(int(FPS)):
+        det.feed(0.5, t, 1000.0 + t)
+        t += 1.0 / FPS
+    end = t + near_sec
+    while t < end - 1e-9:
+        det.feed(None if any(a <= t - t0 < b for a, b in lost) else dist_near, t, 1000.0 + t)
+        t += 1.0 / FPS
+    det.feed(0.5, t, 1000.0 + t)
+    return t
+
+
+def test_drink_is_queued_with_wall_and_media_time():
+    det = DrinkDetector("front")
+    end = _gesture(det, 0.0, 2.0)
+    (ev,) = det.drain()
+    assert ev.media_ts == pytest.approx(end) and ev.ts == pytest.approx(1000.0 + end)
+    assert ev.duration == pytest.approx(2.0)
+    assert det.drain() == [] and det.stats()["detected"] == 1
+
+
+@pytest.mark.parametrize("near_sec", [0.8, 3.5])
+def test_too_short_or_too_long_is_not_a_drink(near_sec):
+    det = DrinkDetector("front")
+    _gesture(det, 0.0, near_sec)
+    assert det.drain() == []
+
+
+def test_side_view_needs_a_longer_gesture():
+    front, side = DrinkDetector("front"), DrinkDetector("side")
+    for det in (front, side):
+        _gesture(det, 0.0, 1.6)
+    assert len(front.drain()) == 1 and side.drain() == []
+
+
+def test_hysteresis_band_does_not_break_the_gesture():
+    det = DrinkDetector("front")
+    t = 0.0
+    det.feed(0.5, t, t)
+    for i in range(20):  # oscila dentro de la banda D_NEAR–D_FAR
+        t += 0.1
+        det.feed(D_NEAR - 0.01 if i == 0 else (D_NEAR + D_FAR) / 2, t, t)
+    det.feed(0.5, t + 0.1, t + 0.1)
+    assert len(det.drain()) == 1
+
+
+def test_short_loss_is_bridged_and_long_loss_cancels():
+    det = DrinkDetector("front")
+    _gesture(det, 0.0, 2.0, lost=[(1.3, 1.7)])  # 0.4 s < LOST_GRACE_SEC
+    assert len(det.drain()) == 1
+    det = DrinkDetector("front")
+    _gesture(det, 0.0, 2.0, lost=[(1.3, 2.5)])
+    assert det.drain() == []
+
+
+def test_hand_held_at_the_face_and_min_gap():
+    det = DrinkDetector("front")
+    t = _gesture(det, 0.0, 6.0)  # más de T_FACE: mano en la cara
+    assert det.drain() == [] and det.state == "far"
+    t = _gesture(det, t, 2.0)
+    t = _gesture(det, t, 2.0)  # segundos después: dentro de MIN_GAP_SEC
+    assert len(det.drain()) == 1
+    _gesture(det, t + MIN_GAP_SEC, 2.0)
+    assert len(det.drain()) == 1
+
+
+def test_reset_clears_state_and_pending_events():
+    det = DrinkDetector("front")
+    _gesture(det, 0.0, 2.0)
+    det.feed(0.1, 10.0, 10.0)
+    det.reset()
+    assert det.state == "far" and det.events.empty()
+    det.enabled = False  # hidratación o detección apagadas
+    samples = det.stats()["samples"]
+    _gesture(det, 20.0, 2.0)
+    assert det.drain() == [] and det.stats()["samples"] == samples
@@ -0,0 +1,39 @@
+import av
+import numpy as np
+
+from frame_pipeline import FramePipeline
+
+
+def _frame(value, w=64, h=48):
+    return av.VideoFrame.from_ndarray(np.full((h, w, 3), value, np.uint8), format="rgb24").reformat(format="yuv420p")
+
+
+def test_lent_frame_is_not_reused_until_released():
+    pipe = FramePipeline(ring_size=2)
+    held, rgb = pipe.decode(_frame(200))
+    before = rgb.copy()
+    for v in (10, 20, 30, 40):
+        vf, _ = pipe.decode(_frame(v))
+        pipe.release(vf)
+    np.testing.assert_array_equal(rgb, before)  # el encoder sigue viendo su frame
+    assert pipe.stats()["ring_busy"] == 0
+
+    pipe.release(held)
+    seen = {id(pipe.decode(_frame(v))[0]) for v in (50, 60)}
+    assert id(held) in seen
+
+
+def test_ring_grows_when_every_slot_is_lent():
+    pipe = FramePipeline(ring_size=2)
+    frames = [pipe.decode(_frame(v))[0] for v in (10, 20, 30)]
+    assert len({id(f) for f in frames}) == 3
+    assert pipe.stats()["ring_busy"] == 1
+
+
+def test_steady_state_does_not_allocate():
+    pipe = FramePipeline(ring_size=3)
+    for v in range(10):
+        vf, rgb = pipe.decode(_frame(v * 20))
+        assert abs(int(rgb[0, 0, 0]) - v * 20) <= 2
+        pipe.release(vf)
+    assert pipe.stats()["last_frame_allocs"] == 0 and pipe.stats()["ring_busy"] == 0
@@ -0,0 +1,68 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("mediapipe")
+
+import headless  # noqa: E402
+import session_logger as sl  # noqa: E402
+
+FPS = 15
+SECONDS = 6
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    """Video sintético con cambios de brillo (luz buena / baja) y algo de movimiento."""
+    path = str(tmp_path_factory.mktemp("video") / "clip.avi")
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, (320, 180))
+    for i in range(FPS * SECONDS):
+        level = 200 if i < FPS * SECONDS // 2 else 25
+        img = np.full((180, 320, 3), level, np.uint8)
+        cv2.circle(img, (40 + 4 * (i % 60), 90), 20, (0, 0, 255), -1)
+        out.write(img)
+    out.release()
+    return path
+
+
+def _run(clip, db, realtime):
+    conf = headless.load_config()
+    conf["source"].update(device=clip, realtime=realtime)
+    conf["notifications"].update(desktop=False, sound=False)
+    conf["inference"].update(motion_gate=False, roi_tracking=False)
+    conf["history"].update(db_path=db, series=False)
+    conf["report"]["interval_sec"] = 3600
+    headless.run(conf, log=lambda msg: None)
+    sl.close_connections()
+    con = sqlite3.connect(db)
+    cols = ["end_ts - start_ts", "duration_sec"] + [f"{a}_{k}_sec" for a in ("posture", "light") for k in ("good", "regular", "bad", "none")]
+    row = con.execute(f"SELECT {','.join(cols)} FROM sessions").fetchall()
+    con.close()
+    assert len(row) == 1
+    out = dict(zip(cols, row[0]))
+    out["span"] = out.pop("end_ts - start_ts")
+    return out
+
+
+def test_unpaced_file_matches_paced_run(clip, tmp_path):
+    paced = _run(clip, str(tmp_path / "paced.db"), realtime=True)
+    unpaced = _run(clip, str(tmp_path / "unpaced.db"), realtime=False)
+    assert paced["duration_sec"] > SECONDS - 1.0
+    # Sin pausar, inicio y fin también salen del reloj del video
+    assert unpaced.pop("span") == pytest.approx(unpaced["duration_sec"], abs=0.2)
+    paced.pop("span")
+    for key, value in paced.items():
+        # los frames inferidos no son los mismos: unas pocas inferencias de
+        # diferencia en el cambio de luz (EMA del brillo)
+        assert unpaced[key] == pytest.approx(value, abs=0.35), key
+
+
+def test_media_clock_follows_video_time():
+    clock = headless.MediaClock(1000.0)
+    assert clock() == 1000.0
+    assert clock(12.0) == 1000.0  # primer pts = inicio
+    assert clock(72.5) == 1060.5
+    assert clock(70.0) == 1060.5  # nunca retrocede
+    assert clock() == 1060.5
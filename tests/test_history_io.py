@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+import history_io
+import session_logger as sl
+from session_accumulator import SeriesRecorder, SessionAccumulator
+
+quiet = lambda msg: None  # noqa: E731
+
+
+@pytest.fixture(autouse=True)
+def _fresh_connections():
+    sl.close_connections()
+    yield
+    sl.close_connections()
+
+
+@pytest.fixture
+def src_db(tmp_path):
+    path = str(tmp_path / "src.db")
+    t = 1_700_000_000.0
+    for i in range(5):
+        acc = SessionAccumulator(t + i * 86400.0)
+        for m in range(10 + i):
+            acc.add(60.0, ("good", "regular", "bad")[m % 3], "good")
+        acc.end_ts = acc.start_ts + acc.duration_sec
+        if i % 2 == 0:
+            acc.series = SeriesRecorder()
+            for s in range(int(acc.duration_sec)):
+                acc.series.add(float(s), 150.0 + s % 30, 100.0, True)
+        sl.store_session(acc, mode="side" if i % 2 else "front", db_path=path, device="cam:0" if i else None)
+    return path
+
+
+def _table(path, sql):
+    return sl.connection(path).execute(sql).fetchall()
+
+
+def _sessions(path):
+    return _table(path, "SELECT start_ts, end_ts, mode, device, duration_sec, posture_bad_sec, metrics_json "
+                        "FROM sessions ORDER BY start_ts")
+
+
+@pytest.mark.parametrize("fmt,series", [("csv", False), ("jsonl", True), ("parquet", True)])
+def test_import_twice_is_idempotent(tmp_path, src_db, fmt, series):
+    path = str(tmp_path / f"historial.{fmt}")
+    dst = str(tmp_path / f"{fmt}.db")
+    history_io.export_history(path, db_path=src_db, series=series, chunk_rows=2, log=quiet)
+
+    first = history_io.import_history(path, db_path=dst, chunk_rows=2, log=quiet)
+    assert (first["inserted"], first["skipped"]) == (5, 0)
+    snapshot = {t: _table(dst, f"SELECT * FROM {t} ORDER BY 1, 2") for t in ("sessions", "session_series",
+                                                                              "rollup_daily", "rollup_weekly")}
+    assert len(snapshot["session_series"]) == (3 if series else 0)
+    second = history_io.import_history(path, db_path=dst, chunk_rows=2, log=quiet)
+    assert (second["inserted"], second["skipped"]) == (0, 5)
+    for table, rows in snapshot.items():
+        assert _table(dst, f"SELECT * FROM {table} ORDER BY 1, 2") == rows
+
+    assert _sessions(dst) == _sessions(src_db)
+    for table in ("rollup_daily", "rollup_weekly"):
+        got = _table(dst, f"SELECT * FROM {table} ORDER BY period, mode")
+        want = _table(src_db, f"SELECT * FROM {table} ORDER BY period, mode")
+        assert [r[:3] for r in got] == [r[:3] for r in want]
+        for a, b in zip(got, want):
+            assert a == pytest.approx(b)
+
+    src_ids = [r[0] for r in _table(src_db, "SELECT id FROM sessions ORDER BY start_ts")]
+    dst_ids = [r[0] for r in _table(dst, "SELECT id FROM sessions ORDER BY start_ts")]
+    for s, d in zip(src_ids, dst_ids):
+        want = sl.fetch_session_series(s, db_path=src_db)
+        got = sl.fetch_session_series(d, db_path=dst)
+        if not series or want is None:
+            assert got is None
+            continue
+        assert got["rate_hz"] == want["rate_hz"]
+        for key in ("angle", "brightness", "presence"):
+            np.testing.assert_allclose(got[key], want[key], atol=0.05)
@@ -0,0 +1,166 @@
+import types
+
+import numpy as np
+import pytest
+
+import inference_scheduler
+from inference_scheduler import InferenceBudget, InferenceScheduler, MotionGate
+
+
+class FakeCPU:
+    def __init__(self, value=0.2):
+        self.value = value
+
+    def utilization(self):
+        return self.value
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = {"t": 1000.0}
+    monkeypatch.setattr(inference_scheduler, "time", types.SimpleNamespace(monotonic=lambda: clock["t"]))
+    return clock
+
+
+def _run(sched, clock, seconds, fps=30.0, latency_s=0.02):
+    """Frames a `fps` durante `seconds`; devuelve cuántos se infirieron."""
+    inferred = 0
+    for _ in range(int(seconds * fps)):
+        clock["t"] += 1.0 / fps
+        if sched.should_process():
+            sched.record(latency_s)
+            inferred += 1
+    return inferred
+
+
+def test_backs_off_over_cpu_budget_and_recovers(clock):
+    cpu = FakeCPU(0.95)
+    sched = InferenceScheduler(target_fps=10.0, cpu_budget=0.75, host_cpu=cpu)
+    _run(sched, clock, 1.5)
+    assert sched.rate == pytest.approx(8.0)  # ×0.8 por período
+    _run(sched, clock, 20.0)
+    assert sched.rate == pytest.approx(sched.min_fps)  # nunca por debajo del mínimo
+
+    cpu.value = 0.3
+    _run(sched, clock, 4.0)
+    assert sched.rate == pytest.approx(sched.min_fps + 4.0)  # +1 inf/s por período
+    _run(sched, clock, 20.0)
+    assert sched.rate == pytest.approx(10.0)  # hasta target_fps, no más
+    assert _run(sched, clock, 5.0) == pytest.approx(50, abs=3)
+
+
+def test_latency_too_high_for_the_rate_backs_off(clock):
+    sched = InferenceScheduler(target_fps=10.0, cpu_budget=0.75, host_cpu=FakeCPU(0.2))
+    _run(sched, clock, 3.0, latency_s=0.2)  # 10 inf/s × 0.2 s = 2 núcleos
+    assert sched.rate < 10.0 * 0.8 ** 2 + 1e-6
+
+
+def test_between_thresholds_rate_holds(clock):
+    sched = InferenceScheduler(target_fps=10.0, cpu_budget=0.75, host_cpu=FakeCPU(0.7))
+    sched.rate = 6.0
+    _run(sched, clock, 5.0)
+    assert sched.rate == pytest.approx(6.0)
+
+
+def test_manual_mode_takes_one_in_every_n(clock):
+    sched = InferenceScheduler(adaptive=False, every_n=3, host_cpu=FakeCPU(0.99))
+    assert _run(sched, clock, 3.0) == 30  # 90 frames / 3
+    assert sched.stats()["rate_fps"] is None
+
+
+def test_media_clock_spaces_inferences_on_video_time(clock):
+    sched = InferenceScheduler(target_fps=5.0, host_cpu=FakeCPU(0.99))
+    sched.configure(target_fps=5.0, cpu_budget=0.75, adaptive=True, every_n=1, media_clock=True)
+    # Lote sin pausar: 300 frames de video a 30 fps sin que avance el reloj de pared
+    taken = [i for i in range(300) if sched.should_process(i / 30.0)]
+    assert len(taken) == pytest.approx(50, abs=1)
+    assert sched.should_process(0.0)  # pts que vuelve atrás (otro archivo): se infiere
+
+def _members(n, names=("front", "side")):
+    out = []
+    for name in names[:n]:
+        sched = InferenceScheduler(host_cpu=FakeCPU())
+        sched.name = name
+        out.append(sched)
+    return out
+
+
+def test_budget_splits_rate_between_active_streams(clock):
+    budget = InferenceBudget(target_fps=10.0, cpu_budget=0.75, host_cpu=FakeCPU(0.3))
+    front, side = _members(2)
+    assert budget.rate_for(front, 0.0) == pytest.approx(10.0)  # solo
+    assert budget.rate_for(side, 0.5) == pytest.approx(5.0)
+    assert budget.rate_for(front, 0.6) == pytest.approx(5.0)
+    # La lateral se detuvo: pasados ACTIVE_SEC la frontal recupera todo
+    assert budget.rate_for(front, 0.6 + budget.ACTIVE_SEC + 0.1) == pytest.approx(10.0)
+
+
+def test_budget_weights_favor_the_camera_that_sees_the_person(clock):
+    vis = {"front": 1.0, "side": 0.0}
+    budget = InferenceBudget(target_fps=12.0, host_cpu=FakeCPU(0.3), weights=vis.get)
+    front, side = _members(2)
+    budget.rate_for(side, 0.0)
+    assert budget.rate_for(front, 0.0) == pytest.approx(9.0)  # 1.5 / (1.5 + 0.5)
+    assert budget.rate_for(side, 0.0) == pytest.approx(3.0)  # nunca menos de la mitad de su parte
+
+
+def test_budget_backs_off_on_the_busiest_stream_and_keeps_a_floor(clock):
+    cpu = FakeCPU(0.3)
+    budget = InferenceBudget(target_fps=10.0, cpu_budget=0.75, min_fps=1.0, host_cpu=cpu)
+    front, side = _members(2)
+    front.latency_s, front.rate = 0.25, 5.0  # 125 % de un núcleo
+    for t in range(1, 4):  # un ajuste por período
+        budget.rate_for(front, float(t))
+        budget.rate_for(side, float(t))
+    assert budget.rate == pytest.approx(10.0 * 0.8 ** 3)
+    front.latency_s = 0.01
+    cpu.value = 0.95
+    for t in range(4, 30):
+        budget.rate_for(front, float(t))
+        budget.rate_for(side, float(t))
+    assert budget.rate == pytest.approx(2.0)  # min_fps por stream activo
+
+
+def _thumb(value=100.0):
+    return np.full((54, 96), value, np.float32)
+
+
+def test_gate_skips_static_scene_and_counts_it():
+    gate = MotionGate()
+    luma = _thumb()
+    assert gate.needs_inference(luma, now=0.0)  # sin referencia
+    gate.mark_inferred(luma, "res", infer_ms=20.0, now=0.0)
+    for i in range(1, 11):
+        noisy = luma + np.float32(5.0 * (i % 2))  # ruido bajo pixel_delta
+        assert not gate.needs_inference(noisy, now=0.1 * i)
+        gate.mark_skipped()
+    stats = gate.stats()
+    assert stats["skipped"] == 10 and stats["inferred"] == 1
+    assert stats["skip_ratio"] == pytest.approx(10 / 11)
+    assert stats["saved_cpu_sec"] == pytest.approx(0.2)  # 10 × 20 ms
+
+
+def test_gate_infers_on_motion_and_after_max_interval():
+    gate = MotionGate(max_interval=3.0)
+    luma = _thumb()
+    gate.mark_inferred(luma, "res", infer_ms=20.0, now=0.0)
+    moved = luma.copy()
+    moved[10:20, 10:20] = 200.0  # 100 px de 5184 cambian: ~1.9 %
+    assert gate.needs_inference(moved, now=1.0)
+    assert gate.stats()["changed_frac"] == pytest.approx(100 / luma.size)
+    assert not gate.needs_inference(luma, now=2.9)
+    assert gate.needs_inference(luma, now=3.0)  # resultado demasiado viejo
+
+
+def test_gate_reference_is_a_copy_and_reset_forces_inference():
+    gate = MotionGate()
+    buf = _thumb()
+    gate.mark_inferred(buf, "res", infer_ms=20.0, now=0.0)
+    buf[:] = 250.0  # el motor de luz reutiliza su buffer
+    assert gate.needs_inference(buf, now=0.5)
+    assert gate.needs_inference(np.full((45, 80), 100.0, np.float32), now=0.5)  # otro tamaño
+    gate.reset()
+    assert gate.needs_inference(_thumb(), now=0.5) and gate.last_result is None
+    gate.enabled = False
+    gate.mark_inferred(_thumb(), "res", infer_ms=20.0, now=0.0)
+    assert gate.needs_inference(_thumb(), now=0.1)
@@ -0,0 +1,46 @@
+import threading
+import time
+
+from inference_worker import InferenceWorker
+
+
+def _wait(cond, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not cond() and time.monotonic() < end:
+        time.sleep(0.01)
+    return cond()
+
+
+def test_slow_inference_stretches_the_deadline():
+    worker = InferenceWorker(max_age=0.05)
+    done = []
+    slow = lambda payload: time.sleep(0.15) or payload  # noqa: E731
+
+    worker.submit(1, slow, on_done=done.append)
+    assert _wait(lambda: done == [1])
+    assert worker.late == 1 and worker.latest() is None  # sin medida aún: plazo = max_age
+    assert worker.max_wait() >= 0.25
+
+    worker.submit(2, slow, on_done=done.append)
+    assert _wait(lambda: worker.latest() == 2)
+    assert worker.completed == 1 and worker.late == 1
+    worker.stop()
+
+
+def test_stop_during_inference_does_not_publish():
+    worker = InferenceWorker(max_age=5.0)
+    started, release = threading.Event(), threading.Event()
+    done = []
+
+    def fn(payload):
+        started.set()
+        release.wait(5.0)
+        return payload
+
+    worker.submit("frame", fn, on_done=done.append)
+    assert started.wait(5.0)
+    worker.stop()
+    release.set()
+    assert _wait(lambda: worker._thread is None)  # el hilo termina tras el stop
+    assert done == ["frame"]
+    assert worker.latest() is None and worker.completed == 0
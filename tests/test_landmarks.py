@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from mediapipe.framework.formats import landmark_pb2
+
+from common import N_LANDMARKS, landmarks_to_array
+
+
+def _attrs(msg):
+    return np.array([[p.x, p.y, p.z, p.visibility] for p in msg.landmark], np.float32)
+
+
+def _message(fields=("x", "y", "z", "visibility"), skip=None):
+    rng = np.random.default_rng(7)
+    msg = landmark_pb2.NormalizedLandmarkList()
+    for i in range(N_LANDMARKS):
+        p = msg.landmark.add()
+        for name in fields:
+            if skip is not None and skip == (i, name):
+                continue  # campo ausente: el getter devuelve el default
+            setattr(p, name, float(rng.uniform(-1.0, 1.0)))
+    return msg
+
+
+@pytest.mark.parametrize("fields", [("x", "y", "z", "visibility"), ("x", "y", "z", "visibility", "presence")])
+def test_message_and_list_match_attributes(fields):
+    msg = _message(fields)
+    np.testing.assert_array_equal(landmarks_to_array(msg), _attrs(msg))
+    np.testing.assert_array_equal(landmarks_to_array(msg.landmark), _attrs(msg))
+
+
+@pytest.mark.parametrize("skip", [(0, "visibility"), (12, "z"), (32, "x")])
+def test_missing_field_reads_default(skip):
+    msg = _message(skip=skip)
+    arr = landmarks_to_array(msg)
+    np.testing.assert_array_equal(arr, _attrs(msg))
+    assert arr[skip[0], ("x", "y", "z", "visibility").index(skip[1])] == 0.0
+
+
+def test_fills_out_buffer_and_passes_arrays_through():
+    msg = _message()
+    out = np.empty((N_LANDMARKS, 4), np.float32)
+    assert landmarks_to_array(msg, out=out) is out
+    np.testing.assert_array_equal(out, _attrs(msg))
+    assert landmarks_to_array(out) is out
+
+
+def test_wrong_landmark_count_raises():
+    msg = _message()
+    del msg.landmark[-1]
+    with pytest.raises(ValueError):
+        landmarks_to_array(msg)
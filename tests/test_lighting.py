@@ -0,0 +1,61 @@
+import av
+import numpy as np
+import pytest
+
+from lighting import LightingEngine
+
+
+def _backlight(img):
+    metrics, _ = LightingEngine().measure_gray(img)
+    return metrics["backlight"]
+
+
+def test_dark_subject_in_the_middle_is_backlight():
+    img = np.full((360, 640), 230, np.uint8)
+    img[90:270, 160:480] = 40  # persona a contraluz, centrada
+    assert _backlight(img) > 0.3
+
+
+def test_dark_desk_in_the_lower_middle_is_not_backlight():
+    img = np.full((360, 640), 230, np.uint8)
+    img[240:, 160:480] = 40  # escritorio oscuro abajo, cara iluminada
+    uniform = _backlight(np.full((360, 640), 230, np.uint8))
+    assert _backlight(img) < 0.1 and uniform == 0.0
+
+
+def test_yuv_frame_reads_the_luma_plane_in_limited_range():
+    img = np.full((360, 640, 3), 128, np.uint8)
+    frame = av.VideoFrame.from_ndarray(img, format="rgb24").reformat(format="yuv420p")
+    metrics, thumb = LightingEngine().measure(frame)
+    y = frame.to_ndarray()[:360]  # plano Y (16–235)
+    ref, _ = LightingEngine().measure_gray(y, full_range=False)
+    assert metrics["mean"] == pytest.approx(ref["mean"]) == pytest.approx(128.0, abs=2.0)
+    assert thumb.shape == (45, 80)
+
+
+def test_backlit_flag_has_hysteresis_and_reset_clears_it():
+    engine = LightingEngine(backlight_on=0.15, alpha=1.0)  # sin suavizado
+    img = np.full((360, 640), 230, np.uint8)
+
+    def step(dark):
+        img[90:270, 160:480] = dark
+        return engine.measure_gray(img)[0]
+
+    assert not step(230)["backlit"]
+    m = step(170)  # persona bastante más oscura que el fondo
+    assert m["backlit"] and m["backlight"] >= 0.15
+    m = step(200)  # baja del umbral pero no del 70 %
+    assert 0.105 <= m["backlight"] < 0.15 and m["backlit"]
+    assert not step(225)["backlit"]
+    step(170)
+    engine.reset()
+    assert not engine.backlit and engine.backlight_s is None
+
+
+def test_clipped_highlights_set_glare():
+    engine = LightingEngine(glare_on=0.03, alpha=1.0)
+    img = np.full((360, 640), 120, np.uint8)
+    assert not engine.measure_gray(img)[0]["glare"]
+    img[:40, :] = 255  # ventana quemada: ~11 % del cuadro
+    m = engine.measure_gray(img)[0]
+    assert m["glare"] and m["clip_high"] == pytest.approx(40 / 360, abs=0.01)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from metrics_ring import MetricsRing, sparkline
+
+
+def _data(i, landmarks=None):
+    return {
+        "media_ts": 0.1 * i, "neck_angle_raw": 150.0 + i, "neck_angle_smooth": 150.0 + i,
+        "brightness_smooth": 60.0, "wrist_mouth_dist": None, "infer_ms": 20.0, "landmarks": landmarks,
+    }
+
+
+def test_last_is_a_contiguous_view_in_order_across_wraparound():
+    ring = MetricsRing(capacity=8)
+    assert len(ring.last()) == 0
+    for i in range(21):
+        ring.append(_data(i), ts=100.0 + i)
+        rows = ring.last()
+        assert len(rows) == min(i + 1, 8)
+        np.testing.assert_array_equal(rows["ts"], 100.0 + np.arange(i + 1 - len(rows), i + 1))
+        assert np.shares_memory(rows, ring._buf)
+    np.testing.assert_array_equal(ring.last(3)["angle_raw"], [168.0, 169.0, 170.0])
+    assert len(ring.last(100)) == 8
+
+
+def test_missing_values_are_nan_and_visibility_is_averaged():
+    ring = MetricsRing(capacity=4)
+    lm = np.zeros((33, 4), np.float32)
+    lm[[0, 7, 8, 11, 12], 3] = [1.0, 0.5, 0.5, 1.0, 0.0]
+    ring.append(_data(0, landmarks=lm), ts=1.0)
+    ring.append(dict(_data(1), neck_angle_raw=None, neck_angle_smooth=None), ts=2.0)
+    rows = ring.last()
+    assert rows["visibility"][0] == pytest.approx(0.6) and np.isnan(rows["visibility"][1])
+    assert np.isnan(rows["wrist_dist"]).all() and np.isnan(rows["angle_raw"][1])
+
+
+def test_window_selects_by_wall_time_and_reset_empties():
+    ring = MetricsRing(capacity=64)
+    for i in range(100):
+        ring.append(_data(i), ts=float(i))
+    assert ring.window(10.0)["ts"].tolist() == [float(t) for t in range(89, 100)]
+    assert len(ring.window(5.0, now=200.0)) == 0
+    ring.reset()
+    assert len(ring.last()) == 0 and len(ring.window(10.0)) == 0
+
+
+def test_sparkline_scales_min_to_max_and_leaves_gaps_blank():
+    assert sparkline([]) == ""
+    assert sparkline([1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0]) == "▁▂▃▄▅▆▇█"
+    assert sparkline([1.0, np.nan, 8.0], width=3) == "▁ █"
+    assert sparkline([np.nan] * 4) == "    "
+    assert len(sparkline(np.arange(1000.0), width=32)) == 32
@@ -0,0 +1,61 @@
+import threading
+import types
+from fractions import Fraction
+
+import av
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+import common
+import inference_scheduler
+from common import EMA, make_callback
+from inference_scheduler import MotionGate
+from overlay import PoseOverlay
+from sidebar_config import get_config
+
+CFG = get_config(
+    lighting_thresh=55, process_every_n=1, debug_overlay=True,
+    fr_good=163.0, fr_fair=159.0, lat_good=165.0, lat_fair=160.0,
+    enable_posture_alerts=False, posture_seconds=6, good_seconds=3,
+    enable_light_alerts=False, light_seconds=8, good_light_seconds=3,
+    cooldown_seconds=15, enable_desktop_notifications=False, enable_notification_sound=False,
+)
+
+
+class FakePose:
+    def __init__(self):
+        msg = landmark_pb2.NormalizedLandmarkList()
+        for i in range(common.N_LANDMARKS):
+            p = msg.landmark.add()
+            p.x, p.y, p.z, p.visibility = 0.3 + 0.01 * i, 0.2 + 0.015 * i, 0.0, 1.0
+        self.result = types.SimpleNamespace(pose_landmarks=msg)
+        self.calls = 0
+
+    def process(self, rgb):
+        self.calls += 1
+        return self.result
+
+
+def test_gated_frames_keep_the_skeleton(monkeypatch):
+    clock = {"t": 100.0}
+    fake_time = types.SimpleNamespace(
+        perf_counter=lambda: clock["t"], monotonic=lambda: clock["t"], time=lambda: clock["t"])
+    monkeypatch.setattr(common, "time", fake_time)
+    monkeypatch.setattr(inference_scheduler, "time", fake_time)
+
+    pose, overlay, gate = FakePose(), PoseOverlay(), MotionGate(max_interval=3.0)
+    cb = make_callback(
+        mode="side", shared={}, lock=threading.Lock(), frame_counter={"n": 0},
+        neck_ema_obj=EMA(), bright_ema_obj=EMA(initial=60.0), POSE=pose, thr=CFG["thr"],
+        lighting_thresh=55, process_every_n=1, debug_overlay=True, motion_gate=gate, overlay=overlay,
+    )
+    img = np.full((240, 320, 3), 128, np.uint8)  # escena quieta: la compuerta omite casi todo
+    drawn = ""
+    for i in range(40):  # 15 fps, 2.7 s: más que max_age (1.5 s), menos que max_interval
+        clock["t"] = 100.0 + i / 15.0
+        frame = av.VideoFrame.from_ndarray(img, format="bgr24")
+        frame.pts, frame.time_base = i, Fraction(1, 15)
+        out = cb(frame).to_ndarray(format="bgr24")
+        drawn += "X" if (out != img).any() else "."
+    assert pose.calls == 1 and gate.skipped == 39
+    assert drawn == "X" * 40
@@ -0,0 +1,44 @@
+import itertools
+
+from pose_pool import PosePool, PoseLease
+
+
+class FakePose:
+    ids = itertools.count()
+
+    def __init__(self):
+        self.id = next(self.ids)
+        self.closed = False
+
+    def process(self, rgb):
+        return self.id
+
+    def close(self):
+        self.closed = True
+
+
+def test_new_owner_gets_a_fresh_model():
+    pool = PosePool(size=1, acquire_timeout=0.0, idle_timeout=30.0, model_factory=FakePose)
+    a = PoseLease(pool)
+    first = a.process(None)
+    assert a.process(None) == first  # mismo dueño: mismo tracking
+    a.release()
+
+    b = PoseLease(pool)
+    assert b.process(None) != first
+    assert pool._slots[0].model.id != first
+
+
+def test_stale_reclaim_resets_tracking_and_old_owner_moves_on():
+    pool = PosePool(size=1, acquire_timeout=0.0, idle_timeout=30.0, model_factory=FakePose)
+    a, b = PoseLease(pool), PoseLease(pool)
+    first = a.process(None)
+    old = pool._slots[0].model
+    pool._slots[0].last_used -= 60.0  # `a` inactivo más que idle_timeout
+
+    second = b.process(None)
+    assert second != first and old.closed
+    assert pool._slots[0].owner is b
+    # `a` vuelve: comparte (pool lleno) sin reiniciar el modelo de `b`
+    assert a.process(None) == second
+    assert a._shared and pool._slots[0].owner is b
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from posture_fusion import PostureFusion, angle_score, view_visibility
+
+THR = {"front": {"good": 163.0, "fair": 159.0}, "side": {"good": 165.0, "fair": 160.0}}
+
+
+def _landmarks(vis):
+    arr = np.zeros((33, 4), np.float32)
+    arr[:, 3] = vis
+    return arr
+
+
+def test_angle_score_is_continuous_across_thresholds():
+    assert angle_score(170.0, 163.0, 159.0) == 100.0
+    assert angle_score(163.0, 163.0, 159.0) == 100.0
+    assert angle_score(159.0, 163.0, 159.0) == pytest.approx(60.0)
+    assert angle_score(161.0, 163.0, 159.0) == pytest.approx(80.0)
+    assert angle_score(155.0, 163.0, 159.0) == pytest.approx(0.0)
+    assert angle_score(120.0, 163.0, 159.0) == 0.0
+
+
+def test_side_visibility_uses_the_better_side():
+    lm = _landmarks(0.0)
+    lm[[7, 11], 3] = 0.9  # lado izquierdo visible, derecho tapado
+    assert view_visibility(lm, "side") == pytest.approx(0.9)
+    assert view_visibility(lm, "front") == pytest.approx(0.36)
+    assert view_visibility(None, "front") == 0.0
+
+
+def test_fused_score_weights_by_visibility_and_drops_stale_views():
+    fusion = PostureFusion(fresh_sec=2.0)
+    assert fusion.fused(0.0) is None
+    fusion.feed("front", 170.0, _landmarks(0.9), THR, ts=10.0)  # 100
+    fusion.feed("side", 160.0, _landmarks(0.3), THR, ts=10.0)   # 60
+    out = fusion.fused(11.0)
+    assert out["score"] == pytest.approx(90.0) and out["level"] == "good"
+    assert out["weights"] == pytest.approx({"front": 0.75, "side": 0.25})
+    assert fusion.visibility("side", now=11.0) == pytest.approx(0.3)
+
+    fusion.feed("side", 150.0, _landmarks(0.3), THR, ts=12.5)
+    out = fusion.fused(12.5)  # la frontal ya no es fresca: sólo vota la lateral
+    assert out["weights"] == {"side": 1.0} and out["level"] == "bad"
+    assert fusion.visibility("front", now=12.5) is None
+
+
+def test_view_without_angle_does_not_vote():
+    fusion = PostureFusion()
+    fusion.feed("front", None, None, THR, ts=0.0)
+    assert fusion.fused(0.0) is None
+    fusion.feed("side", 165.0, _landmarks(1.0), THR, ts=0.0)
+    assert fusion.fused(0.5)["weights"] == {"side": 1.0}
+    fusion.reset()
+    assert fusion.fused(0.5) is None
@@ -0,0 +1,38 @@
+import numpy as np
+
+from presence import PresenceTracker
+
+
+def _feed(tracker, source, t_media, t_wall, present=True):
+    for m, w in zip(t_media, t_wall):
+        tracker.feed(source, present, float(m), float(w))
+
+
+def test_single_source_counts_media_time_despite_wall_jitter():
+    rng = np.random.default_rng(0)
+    media = np.arange(0.0, 3600.0, 0.1)  # 1 h a 10 Hz
+    wall = 1000.0 + media + rng.normal(0.0, 0.02, media.size)
+    tracker = PresenceTracker(threshold_min=1000)
+    _feed(tracker, "side", media, wall)
+    assert abs(tracker.snapshot()["sitting_min"] - media[-1] / 60.0) < 1e-6
+
+
+def test_two_sources_are_not_double_counted():
+    rng = np.random.default_rng(1)
+    media = np.arange(0.0, 600.0, 0.1)
+    tracker = PresenceTracker(threshold_min=1000)
+    front = 1000.0 + media + rng.normal(0.0, 0.02, media.size)
+    side = 1000.05 + media + rng.normal(0.0, 0.02, media.size)
+    for i in range(media.size):  # intercaladas, como llegan en vivo
+        tracker.feed("front", True, float(media[i]), float(front[i]))
+        tracker.feed("side", True, float(media[i]), float(side[i]))
+    assert abs(tracker.snapshot()["sitting_min"] - 10.0) < 0.2
+
+
+def test_reset_source_forgets_its_coverage():
+    tracker = PresenceTracker(threshold_min=1000)
+    _feed(tracker, "front", np.arange(0.0, 60.0, 0.5), 1000.0 + np.arange(0.0, 60.0, 0.5))
+    tracker.reset_source("front")
+    before = tracker.sitting_sec
+    _feed(tracker, "side", np.arange(0.0, 60.0, 0.5), 1000.0 + np.arange(0.0, 60.0, 0.5))
+    assert abs(tracker.sitting_sec - before - 59.5) < 1e-6
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from common import N_LANDMARKS, UPPER_BODY_IDX, RoiTracker
+
+
+def _pose(x0, y0, x1, y1, vis=1.0):
+    """Landmarks con el torso superior repartido en la caja (x0, y0)-(x1, y1)."""
+    arr = np.zeros((N_LANDMARKS, 4), np.float32)
+    n = len(UPPER_BODY_IDX)
+    arr[UPPER_BODY_IDX, 0] = np.linspace(x0, x1, n)
+    arr[UPPER_BODY_IDX, 1] = np.linspace(y0, y1, n)[::-1]
+    arr[UPPER_BODY_IDX, 3] = vis
+    return arr
+
+
+def test_box_expands_by_margin_and_is_clamped():
+    roi = RoiTracker(margin=0.25, min_size=0.1)
+    roi.update(_pose(0.4, 0.3, 0.6, 0.5))
+    assert roi.box == pytest.approx((0.35, 0.25, 0.65, 0.55))
+    roi.reset()
+    roi.update(_pose(0.0, 0.0, 0.3, 0.3))  # pegado a la esquina
+    assert roi.box[:2] == (0.0, 0.0) and roi.box[2] == pytest.approx(0.375)
+
+
+def test_box_holds_while_the_body_stays_inside_and_moves_when_it_leaves():
+    roi = RoiTracker(margin=0.25, min_size=0.1)
+    roi.update(_pose(0.4, 0.3, 0.6, 0.5))
+    box = roi.box
+    roi.update(_pose(0.41, 0.31, 0.61, 0.51))  # se mueve un poco: misma caja
+    assert roi.box is box
+    roi.update(_pose(0.55, 0.3, 0.75, 0.5))  # se sale del borde: caja nueva
+    assert roi.box != box and roi.box[0] == pytest.approx(0.5)
+    box = roi.box
+    roi.update(_pose(0.62, 0.38, 0.66, 0.42))  # mucho más chico: se ajusta
+    assert roi.box != box
+
+
+def test_lost_tracking_falls_back_to_the_full_frame():
+    roi = RoiTracker()
+    img = np.zeros((360, 640, 3), np.uint8)
+    roi.update(_pose(0.4, 0.3, 0.6, 0.5))
+    crop, box = roi.crop(img)
+    assert box is not None and crop.shape[0] < 360
+    roi.update(_pose(0.4, 0.3, 0.6, 0.5, vis=0.1))  # torso no visible
+    assert roi.box is None and roi.lost == 1
+    crop, box = roi.crop(img)
+    assert box is None and crop is img
+    roi.update(None)  # sin pose: ya estaba perdido, no cuenta otra vez
+    assert roi.lost == 1
+    assert roi.stats()["roi_ratio"] == 0.5 and not roi.stats()["tracking"]
+
+
+def test_large_crop_is_scaled_to_max_side():
+    roi = RoiTracker(min_size=0.9, max_side=256)
+    roi.update(_pose(0.4, 0.3, 0.6, 0.5))
+    crop, box = roi.crop(np.zeros((720, 1280, 3), np.uint8))
+    assert max(crop.shape[:2]) <= 256 and box[4:] == (1280, 720)
+
+
+def test_crop_landmarks_map_back_to_the_full_frame():
+    roi = RoiTracker(margin=0.25, min_size=0.1, max_side=10_000)
+    img = np.zeros((360, 640, 3), np.uint8)
+    roi.update(_pose(0.4, 0.3, 0.6, 0.5))
+    crop, box = roi.crop(img)
+    px0, py0, px1, py1, W, H = box
+    assert crop.shape[:2] == (py1 - py0, px1 - px0)
+    local = np.zeros((N_LANDMARKS, 4), np.float32)
+    local[:, :2] = 0.5  # centro del recorte
+    full = RoiTracker.to_full(local, box)
+    assert full[0, 0] == pytest.approx((px0 + px1) / 2 / W)
+    assert full[0, 1] == pytest.approx((py0 + py1) / 2 / H)
@@ -0,0 +1,77 @@
+import pytest
+
+from session_accumulator import AlertTracker, SessionAccumulator
+
+
+def _feed(tracker, levels, dt=1.0, t0=0.0, need=6.0, clear=3.0, cooldown=15.0):
+    """Un resultado por segundo; devuelve los instantes en que dispara."""
+    fired = []
+    for i, level in enumerate(levels):
+        now = t0 + i * dt
+        if tracker.feed(level, dt, now, need, clear, cooldown):
+            fired.append(now)
+    return fired
+
+
+def test_alert_fires_after_need_sec_of_bad():
+    tracker = AlertTracker()
+    assert _feed(tracker, ["bad"] * 5) == []
+    assert tracker.feed("bad", 1.0, 5.0, 6.0, 3.0, 15.0)
+    assert tracker.active
+
+
+def test_good_moments_delay_but_do_not_reset_the_alert():
+    tracker = AlertTracker()
+    # 2 s buenos descuentan 1 s de los malos: dispara al 7.º malo, no al 6.º
+    fired = _feed(tracker, ["bad"] * 3 + ["good"] * 2 + ["bad"] * 4)
+    assert fired == [8.0]
+
+
+def test_alert_clears_only_after_clear_sec_of_good():
+    tracker = AlertTracker()
+    _feed(tracker, ["bad"] * 6)
+    _feed(tracker, ["good"] * 2, t0=6.0)
+    assert tracker.active  # histéresis: 2 s buenos no alcanzan
+    _feed(tracker, ["good"], t0=8.0)
+    assert not tracker.active
+
+
+def test_cooldown_blocks_refiring():
+    tracker = AlertTracker()
+    levels = ["bad"] * 6 + ["good"] * 4 + ["bad"] * 20
+    assert _feed(tracker, levels, cooldown=15.0) == [5.0, 20.0]  # espera el fin del enfriamiento
+    # Enfriamiento corto: vuelve a necesitar 6 s malos tras apagarse
+    assert _feed(AlertTracker(), levels, cooldown=5.0) == [5.0, 15.0]
+
+
+def test_unknown_level_decays_both_counters():
+    tracker = AlertTracker()
+    _feed(tracker, ["bad"] * 5 + ["none"] * 10)
+    assert tracker.bad == pytest.approx(2.0) and not tracker.active
+
+
+def test_accumulator_uses_media_clock_and_drops_gaps():
+    acc = SessionAccumulator(start_ts=1000.0, max_gap=5.0)
+    assert acc.advance(10.0) == 0.0  # primer resultado
+    assert acc.advance(10.5) == pytest.approx(0.5)
+    assert acc.advance(30.0) == 0.0 and acc.clock_gaps == 1  # stream pausado
+    assert acc.advance(29.0) == 0.0 and acc.clock_gaps == 2  # pts reiniciado
+    assert acc.advance(29.25) == pytest.approx(0.25)
+
+
+def test_accumulator_levels_streaks_and_merge():
+    a = SessionAccumulator(start_ts=0.0)
+    for level in ["bad"] * 4 + ["good"] * 2 + ["bad"] * 2:
+        a.add(1.0, level, "good")
+    assert (a.posture_bad_sec, a.posture_good_sec, a.light_good_sec) == (6.0, 2.0, 8.0)
+    # La racha baja 0.5 s por segundo bueno en vez de cortarse
+    assert a.posture_bad_streak_max_sec == 5.0 and a.posture_bad_streak_cur_sec == 5.0
+    a.count_alert("posture")
+    b = SessionAccumulator(start_ts=8.0)
+    b.add(2.0, "regular", "bad")
+    b.end_ts = 10.0
+    m = SessionAccumulator.merge([b, a])
+    assert m.start_ts == 0.0 and m.end_ts == 10.0 and m.duration_sec == 10.0
+    assert m.posture_alerts_count == 1 and m.posture_bad_streak_max_sec == 5.0
+    assert m.scores()[0] == pytest.approx(100.0 * (2.0 + 0.6 * 2.0) / 10.0)
+    assert SessionAccumulator.from_dict(m.to_dict()).to_dict() == m.to_dict()
@@ -0,0 +1,317 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+import session_logger as sl
+from session_accumulator import SeriesRecorder, SessionAccumulator
+
+V1_COLS = sl._SESSION_COLS[:-4]  # hasta metrics_json: la tabla original
+
+
+@pytest.fixture(autouse=True)
+def _fresh_connections():
+    sl.close_connections()
+    yield
+    sl.close_connections()
+
+
+def _legacy_rows(n=6):
+    rows = []
+    for i in range(n):
+        start = 1_700_000_000.0 + i * 7200.0
+        rows.append((
+            start, start + 1800.0, "side" if i % 2 else "front", 1800.0,
+            900.0, 450.0, 300.0 + i, 150.0, i, 120.0, 72.0 + i,
+            1200.0, 300.0, 200.0, 100.0, 2 * i, 60.0, 81.5,
+            i % 3, 1, None if i % 2 else 12.5,
+            '{"drink_events_ts":[]}',
+        ))
+    return rows
+
+
+@pytest.fixture
+def old_db(tmp_path):
+    """Base como la creaba la versión original (sólo `sessions`, sin versión) con filas de esa época."""
+    path = tmp_path / "old.db"
+    con = sqlite3.connect(path)
+    con.execute("PRAGMA journal_mode=WAL;")
+    con.execute(sl.SCHEMA_SQL)
+    assert con.execute("PRAGMA user_version").fetchone()[0] == 0
+    con.executemany(
+        f"INSERT INTO sessions ({','.join(V1_COLS)}) VALUES ({','.join(['?'] * len(V1_COLS))})", _legacy_rows()
+    )
+    con.commit()
+    con.close()
+    return path
+
+
+def _dump(path):
+    con = sqlite3.connect(path)
+    try:
+        return con.execute(f"SELECT id,{','.join(V1_COLS)} FROM sessions ORDER BY id").fetchall()
+    finally:
+        con.close()
+
+
+def test_upgrade_old_db_in_place(old_db):
+    before = _dump(old_db)
+    sl.ensure_db(str(old_db))
+
+    con = sqlite3.connect(old_db)
+    assert con.execute("PRAGMA user_version").fetchone()[0] == sl.SCHEMA_VERSION == 5
+    assert [r[0] for r in con.execute("SELECT version FROM schema_version ORDER BY version")] == [1, 2, 3, 4, 5]
+    names = {r[0] for r in con.execute("SELECT name FROM sqlite_master")}
+    assert {"idx_sessions_open", "idx_sessions_end_ts", "idx_sessions_start_ts", "idx_sessions_mode"} <= names
+    assert {"rollup_daily", "rollup_weekly", "session_series"} <= names
+    cols = {r[1] for r in con.execute("PRAGMA table_info(sessions)")}
+    assert {"status", "user", "device", "app_version"} <= cols
+    assert con.execute("SELECT COUNT(*) FROM sessions WHERE status != 'closed'").fetchone()[0] == 0
+    # Los resúmenes se llenan con las filas existentes
+    assert con.execute("SELECT SUM(sessions) FROM rollup_weekly").fetchone()[0] == len(before)
+    con.close()
+
+    assert _dump(old_db) == before
+
+
+def test_second_run_is_a_no_op(old_db):
+    sl.ensure_db(str(old_db))
+    con = sqlite3.connect(old_db)
+    versions = con.execute("SELECT * FROM schema_version ORDER BY version").fetchall()
+    rollups = con.execute("SELECT * FROM rollup_daily ORDER BY period, mode").fetchall()
+    con.close()
+    before = _dump(old_db)
+
+    sl.close_connections()  # olvida la ruta: ensure_db vuelve a abrir y migrar
+    sl.ensure_db(str(old_db))
+    con = sqlite3.connect(old_db, isolation_level=None)
+    assert sl.migrate(con) == 0
+    assert con.execute("SELECT * FROM schema_version ORDER BY version").fetchall() == versions
+    assert con.execute("SELECT * FROM rollup_daily ORDER BY period, mode").fetchall() == rollups
+    assert con.execute("PRAGMA user_version").fetchone()[0] == 5
+    con.close()
+    assert _dump(old_db) == before
+
+
+def test_newer_schema_is_rejected(tmp_path):
+    path = str(tmp_path / "new.db")
+    sl.ensure_db(path)
+    con = sqlite3.connect(path)
+    con.execute("INSERT INTO schema_version (version, name, applied_ts) VALUES (99, 'futuro', 0)")
+    con.commit()
+    con.close()
+    sl.close_connections()
+    with pytest.raises(RuntimeError, match="newer"):
+        sl.ensure_db(path)
+
+
+class _Clock:
+    """Reloj de pared y monotónico que el test avanza a mano."""
+
+    def __init__(self, t):
+        self.t = t
+
+    def time(self):
+        return self.t
+
+    def monotonic(self):
+        return self.t
+
+
+def _session(start, minutes=10.0):
+    acc = SessionAccumulator(start)
+    for _ in range(int(minutes)):
+        acc.add(60.0, "good", "regular")
+    acc.end_ts = start + 60.0 * minutes
+    return acc
+
+
+def _status(path, sid):
+    return sl.connection(path).execute("SELECT status, metrics_json FROM sessions WHERE id = ?", (sid,)).fetchone()
+
+
+def test_open_session_orphaned_after_init_is_recovered(tmp_path, monkeypatch):
+    path = str(tmp_path / "h.db")
+    clock = _Clock(1_700_000_000.0)
+    monkeypatch.setattr(sl, "time", clock)
+    acc = _session(clock.t - 600.0)
+    sid = sl.store_session(acc, mode="side", db_path=path, status="open")  # primer ensure_db: aún fresca
+    assert _status(path, sid)[0] == "open"
+
+    clock.t += sl.ORPHAN_AFTER_SEC + 1.0  # el proceso dueño murió; este sigue corriendo
+    sl.ensure_db(path)
+    status, metrics = _status(path, sid)
+    assert status == "closed" and '"recovered":true' in metrics
+
+
+def _row(path, sid):
+    con = sl.connection(path)
+    cur = con.execute("SELECT * FROM sessions WHERE id = ?", (sid,))
+    return dict(zip([d[0] for d in cur.description], cur.fetchone()))
+
+
+def test_checkpoint_updates_the_open_row_in_place(tmp_path):
+    path = str(tmp_path / "h.db")
+    acc = _session(1_700_000_000.0, minutes=5)
+    sid = sl.store_session(acc, mode="front", db_path=path, status="open")
+    for _ in range(3):  # más minutos, checkpoint sobre la misma fila
+        acc.add(60.0, "bad", "good")
+    acc.end_ts += 180.0
+    assert sl.store_session(acc, mode="front", db_path=path, session_id=sid, status="open") == sid
+
+    row = _row(path, sid)
+    assert sl.connection(path).execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 1
+    assert (row["status"], row["duration_sec"], row["posture_bad_sec"]) == ("open", 480.0, 180.0)
+    assert row["end_ts"] == acc.end_ts
+
+
+def test_stale_open_row_is_closed_with_its_last_totals(tmp_path):
+    path = str(tmp_path / "h.db")
+    now = 1_700_000_000.0
+    stale = sl.store_session(_session(now - 3600.0, minutes=20), mode="side", db_path=path, status="open")
+    fresh = sl.store_session(_session(now - 900.0, minutes=14), mode="side", db_path=path, status="open")
+    before = _row(path, stale)
+
+    con = sl.connection(path)
+    with con:
+        assert sl.recover_open_sessions(con, now=now) == 1
+    after = _row(path, stale)
+    assert after["status"] == "closed" and '"recovered":true' in after["metrics_json"]
+    for col in ("end_ts", "duration_sec", "posture_good_sec", "light_regular_sec", "posture_score_0_100"):
+        assert after[col] == before[col]
+    assert _row(path, fresh)["status"] == "open"  # último checkpoint hace 60 s
+
+
+def test_series_blob_round_trip():
+    rng = np.random.default_rng(3)
+    n = 500
+    angle = 150.0 + np.cumsum(rng.normal(0.0, 2.0, n))
+    angle[[0, 7, 8, 250]] = np.nan
+    angle[100] = 3000.0  # salto grande: el delta int16 da la vuelta y vuelve
+    brightness = rng.uniform(0.0, 255.0, n)
+    brightness[-1] = np.nan
+    presence = rng.uniform(0.0, 1.0, n)
+
+    out = sl.decode_series(sl.encode_series(angle, brightness, presence), n)
+    np.testing.assert_array_equal(np.isnan(out["angle"]), np.isnan(angle))
+    np.testing.assert_allclose(out["angle"], angle, atol=0.05, equal_nan=True)
+    np.testing.assert_allclose(out["brightness"], brightness, atol=0.05, equal_nan=True)
+    np.testing.assert_allclose(out["presence"], presence, atol=0.005)
+
+
+def _session_with_series(start, minutes=10):
+    acc = _session(start, minutes)
+    acc.series = SeriesRecorder()
+    for i in range(int(minutes * 60)):
+        acc.series.add(float(i), 160.0 + (i % 20), None if i % 50 == 0 else 90.0, i % 7 != 0)
+    return acc
+
+
+def test_fetch_session_series(tmp_path):
+    path = str(tmp_path / "h.db")
+    acc = _session_with_series(1_700_000_000.0)
+    sid = sl.store_session(acc, mode="side", db_path=path)
+    angle, brightness, presence = acc.series.arrays()
+
+    got = sl.fetch_session_series(sid, db_path=path)
+    assert got["rate_hz"] == acc.series.rate_hz and len(got["t"]) == len(angle) == 300
+    np.testing.assert_allclose(got["t"], np.arange(300) / acc.series.rate_hz)
+    np.testing.assert_allclose(got["angle"], angle, atol=0.05)
+    np.testing.assert_allclose(got["brightness"], brightness, atol=0.05)
+    np.testing.assert_allclose(got["presence"], presence, atol=0.005)
+    assert sl.fetch_session_series(sid + 1, db_path=path) is None
+
+
+def test_deleting_a_session_drops_its_series(tmp_path):
+    path = str(tmp_path / "h.db")
+    sid = sl.store_session(_session_with_series(1_700_000_000.0), mode="side", db_path=path)
+    con = sl.connection(path)
+    with con:
+        con.execute("DELETE FROM sessions WHERE id = ?", (sid,))
+    assert con.execute("SELECT COUNT(*) FROM session_series").fetchone()[0] == 0
+
+
+def _store_rows(path, specs):
+    """specs: (start_ts, end_ts, mode); devuelve los ids en orden de inserción."""
+    ids = []
+    for start, end, mode in specs:
+        acc = _session(start, minutes=1)
+        acc.end_ts = end
+        ids.append(sl.store_session(acc, mode=mode, db_path=path))
+    return ids
+
+
+def _pages(path, limit, **kw):
+    pages, after = [], None
+    while True:
+        page = sl.query_sessions(["mode"], after=after, limit=limit, db_path=path, **kw)
+        pages.append(page)
+        if page.cursor is None:
+            return pages
+        after = page.cursor
+
+
+def test_keyset_pages_break_ties_on_id(tmp_path):
+    path = str(tmp_path / "h.db")
+    t = 1_700_000_000.0
+    # tres sesiones con el mismo inicio y fin: el orden lo decide el id
+    specs = [(t, t + 60, "side"), (t, t + 60, "front"), (t, t + 60, "side"),
+             (t + 100, t + 200, "side"), (t - 500, t - 400, "front"), (t + 10, t + 30, "side"),
+             (t + 300, t + 400, "front")]
+    ids = _store_rows(path, specs)
+    end = {i: e for i, (_, e, _) in zip(ids, specs)}
+    expected = sorted(ids, key=lambda i: (end[i], i), reverse=True)
+
+    for limit in (1, 2, 3, 7, 10):
+        pages = _pages(path, limit)
+        got = [int(i) for p in pages for i in p.columns["id"]]
+        assert got == expected
+        assert all(len(p) == limit for p in pages[:-1]) and len(pages[-1]) <= limit
+        assert pages[-1].cursor is None
+    # límite múltiplo exacto: la última página llena tiene cursor y la siguiente viene vacía
+    pages = _pages(path, 7)
+    assert [len(p) for p in pages] == [7, 0]
+
+    side = [int(i) for p in _pages(path, 2, mode="side") for i in p.columns["id"]]
+    assert side == [i for i in expected if i in (ids[0], ids[2], ids[3], ids[5])]
+
+
+def _rollup_tables(path):
+    con = sl.connection(path)
+    return {t: con.execute(f"SELECT * FROM {t} ORDER BY period, mode").fetchall() for t in sl.ROLLUP_TABLES.values()}
+
+
+def test_incremental_rollups_match_a_rebuild(tmp_path):
+    path = str(tmp_path / "h.db")
+    t = 1_700_000_000.0
+    # Sesión en vivo: checkpoints abiertos y cierre
+    acc = _session(t, minutes=3)
+    sid = sl.store_session(acc, mode="side", db_path=path, status="open")
+    for level in ("bad", "regular", "good"):
+        acc.add(120.0, level, "bad")
+        acc.count_alert("posture")
+        acc.end_ts += 120.0
+        sl.store_session(acc, mode="side", db_path=path, session_id=sid, status="open")
+    sl.store_session(acc, mode="side", db_path=path, session_id=sid)
+    # Otros días, semanas y modos
+    for d in (1, 3, 9):
+        sl.store_session(_session(t + d * 86400.0, minutes=d), mode="front" if d % 2 else "side", db_path=path)
+    # Importadas (y una repetida, que no cuenta)
+    rows = [dict(sl.build_session_row(_session(t + d * 86400.0 + 3600.0, minutes=5), mode="front"), device="cam")
+            for d in (0, 1, 20)]
+    assert sl.import_sessions(rows + rows[:1], db_path=path) == (3, 1)
+    # Recuperada: se cierra sin tocar sus totales
+    orphan = sl.store_session(_session(t + 40 * 86400.0, minutes=7), mode="side", db_path=path, status="open")
+    con = sl.connection(path)
+    with con:
+        assert sl.recover_open_sessions(con, now=t + 41 * 86400.0) == 1
+    assert _row(path, orphan)["status"] == "closed"
+
+    incremental = _rollup_tables(path)
+    assert sl.rebuild_rollups(path) == 8
+    rebuilt = _rollup_tables(path)
+    assert incremental.keys() == rebuilt.keys()
+    for table in rebuilt:
+        assert [r[:3] for r in incremental[table]] == [r[:3] for r in rebuilt[table]]
+        for a, b in zip(incremental[table], rebuilt[table]):
+            assert a == pytest.approx(b)
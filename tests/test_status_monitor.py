@@ -0,0 +1,101 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import session_logger as sl
+from status_monitor import StatusMonitor
+from sidebar_config import get_config
+
+CFG = get_config(
+    lighting_thresh=55, process_every_n=1, debug_overlay=False,
+    fr_good=163.0, fr_fair=159.0, lat_good=165.0, lat_fair=160.0,
+    enable_posture_alerts=True, posture_seconds=6, good_seconds=3,
+    enable_light_alerts=True, light_seconds=8, good_light_seconds=3,
+    cooldown_seconds=15, enable_desktop_notifications=False, enable_notification_sound=False,
+    checkpoint_sec=1, split_absence_min=0,
+)
+SETTINGS = {"enable_hydration": False, "enable_sitting_tracker": False}
+
+
+def _data(angle=170.0):
+    return {"neck_angle_smooth": angle, "neck_angle_raw": angle, "brightness_smooth": 120.0,
+            "light_metrics": None, "landmarks": None, "media_ts": None}
+
+
+def _monitor(store):
+    monitor = StatusMonitor("side")
+    monitor.configure(CFG, SETTINGS, None, store=store)
+    return monitor
+
+
+def test_failed_close_is_reported_and_retried(tmp_path):
+    db = str(tmp_path / "h.db")
+    fail = {"on": True}
+
+    def store(acc, **kw):
+        if fail["on"]:
+            raise sqlite3.OperationalError("disk I/O error")
+        return sl.store_session(acc, mode="side", db_path=db, **kw)
+
+    monitor = _monitor(store)
+    t0 = time.time() - 60
+    monitor.reset(t0, history=True)
+    for i in range(20):
+        monitor.update(_data(), t0 + i * 0.5)
+    monitor.finish(t0 + 10)
+    assert monitor.store_error and "disk I/O error" in monitor.store_error
+    assert "disk I/O error" in monitor.snapshot()["store_error"]
+
+    fail["on"] = False
+    assert monitor.writer.flush(5.0)  # reintento del cierre pendiente
+    assert monitor.store_error is None and monitor.snapshot()["store_error"] is None
+    con = sl.connection(db)
+    assert con.execute("SELECT status, end_ts FROM sessions").fetchall() == [("closed", pytest.approx(t0 + 10))]
+    sl.close_connections()
+
+
+def test_slow_store_does_not_block_update():
+    release = threading.Event()
+    calls = []
+
+    def store(acc, **kw):
+        calls.append(kw["status"])
+        release.wait(5.0)  # disco lento
+        return 1
+
+    monitor = _monitor(store)
+    t0 = time.time()
+    monitor.reset(t0, history=True)
+    start = time.perf_counter()
+    for i in range(40):  # varios checkpoints (cada 1 s)
+        monitor.update(_data(), t0 + i * 0.25)
+    assert time.perf_counter() - start < 1.0
+    release.set()
+    monitor.finish(t0 + 10)
+    assert calls[-1] == "closed" and monitor.session_id == 1
+
+
+def test_live_and_offline_count_the_same_alerts():
+    from batch_analyze import OfflineSession
+
+    t0 = 1000.0
+    monitor = _monitor(None)
+    monitor.reset(t0, history=True)
+    offline = OfflineSession("side", CFG, t0)
+    # malo 10 s, bueno 5 s, malo 30 s (enfriamiento de por medio), bueno 5 s
+    plan = [(140.0, 10.0, 20.0), (170.0, 5.0, 120.0), (140.0, 30.0, 20.0), (170.0, 5.0, 120.0)]
+    ts = t0
+    for angle, sec, bright in plan:
+        for _ in range(int(sec * 10)):
+            ts += 0.1
+            data = dict(_data(angle), brightness_smooth=bright, media_ts=ts, wrist_mouth_dist=None)
+            monitor.update(data, ts)
+            offline.update(ts, ts, data)
+
+    live = monitor.finish(ts)
+    assert live.posture_alerts_count >= 2 and live.light_alerts_count >= 2
+    assert (offline.acc.posture_alerts_count, offline.acc.light_alerts_count) == \
+        (live.posture_alerts_count, live.light_alerts_count)
+    assert monitor.snapshot()["posture_alert_active"] is False